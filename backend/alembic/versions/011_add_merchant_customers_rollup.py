@@ -0,0 +1,56 @@
+"""add_merchant_customers_rollup
+
+Revision ID: 011
+Revises: 010
+Create Date: 2025-02-10 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Per-merchant customer rollup for the /customers listing
+    op.create_table(
+        'merchant_customers',
+        sa.Column('merchant_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('txn_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('total_spent_cents', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('first_seen', sa.DateTime(), nullable=False),
+        sa.Column('last_seen', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['merchant_id'], ['merchants.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('merchant_id', 'user_id')
+    )
+    op.create_index('idx_merchant_customers_last_seen', 'merchant_customers', ['merchant_id', 'last_seen'])
+    
+    # Backfill from existing transactions with a single aggregate
+    op.execute(
+        """
+        INSERT INTO merchant_customers
+            (merchant_id, user_id, txn_count, total_spent_cents, first_seen, last_seen)
+        SELECT
+            merchant_id,
+            user_id,
+            COUNT(*),
+            COALESCE(SUM(amount_cents) FILTER (WHERE LOWER(status::text) = 'succeeded'), 0),
+            MIN(created_at),
+            MAX(created_at)
+        FROM transactions
+        WHERE user_id IS NOT NULL
+        GROUP BY merchant_id, user_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_merchant_customers_last_seen', 'merchant_customers')
+    op.drop_table('merchant_customers')
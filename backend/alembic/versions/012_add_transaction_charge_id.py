@@ -0,0 +1,41 @@
+"""add_transaction_charge_id
+
+Revision ID: 012
+Revises: 011
+Create Date: 2025-02-10 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '012'
+down_revision = '011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Promote charge_id out of the JSON metadata so pending charge lookups can use an index
+    op.add_column('transactions', sa.Column('charge_id', sa.String(length=64), nullable=True))
+    
+    # Backfill from metadata when that column exists in this database
+    columns = [c['name'] for c in sa.inspect(op.get_bind()).get_columns('transactions')]
+    if 'metadata' in columns:
+        op.execute(
+            """
+            UPDATE transactions
+            SET charge_id = metadata::jsonb ->> 'charge_id'
+            WHERE charge_id IS NULL
+              AND metadata IS NOT NULL
+              AND metadata::jsonb ? 'charge_id'
+            """
+        )
+    
+    op.create_index(op.f('ix_transactions_charge_id'), 'transactions', ['charge_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_transactions_charge_id'), table_name='transactions')
+    op.drop_column('transactions', 'charge_id')
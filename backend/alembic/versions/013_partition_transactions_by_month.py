@@ -0,0 +1,120 @@
+"""partition_transactions_by_month
+
+Revision ID: 013
+Revises: 012
+Create Date: 2025-02-12 09:00:00.000000
+
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '013'
+down_revision = '012'
+branch_labels = None
+depends_on = None
+
+# Partitions created ahead of the current month at migration time
+MONTHS_AHEAD = 3
+
+# Secondary indexes recreated on the (partitioned) transactions table
+INDEXES = [
+    ('ix_transactions_id', ['id'], False),
+    ('ix_transactions_created_at', ['created_at'], False),
+    ('ix_transactions_merchant_id', ['merchant_id'], False),
+    ('ix_transactions_processor_txn_id', ['processor_txn_id'], False),
+    ('ix_transactions_status', ['status'], False),
+    ('ix_transactions_user_id', ['user_id'], False),
+    ('idx_merchant_transactions', ['merchant_id', 'created_at'], False),
+]
+
+
+def _add_months(month: date, count: int) -> date:
+    """Return the first day of the month `count` months after `month`."""
+    index = month.year * 12 + (month.month - 1) + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _move_table_aside() -> None:
+    """Rename transactions so a replacement table can take its name."""
+    op.execute("ALTER TABLE transactions RENAME TO transactions_old")
+
+
+def _adopt_id_sequence() -> None:
+    """Re-own the serial sequence so dropping transactions_old keeps it alive."""
+    op.execute(
+        """
+        DO $$
+        DECLARE seq text := pg_get_serial_sequence('transactions_old', 'id');
+        BEGIN
+            IF seq IS NOT NULL THEN
+                EXECUTE format('ALTER SEQUENCE %s OWNED BY transactions.id', seq);
+            END IF;
+        END $$;
+        """
+    )
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    _move_table_aside()
+
+    # Same columns, defaults and NOT NULLs; range partitioned by created_at
+    op.execute(
+        "CREATE TABLE transactions (LIKE transactions_old INCLUDING DEFAULTS) "
+        "PARTITION BY RANGE (created_at)"
+    )
+    _adopt_id_sequence()
+
+    # One partition per month from the oldest row through MONTHS_AHEAD months out
+    oldest = bind.execute(sa.text("SELECT MIN(created_at) FROM transactions_old")).scalar()
+    current_month = date.today().replace(day=1)
+    month = oldest.date().replace(day=1) if oldest else current_month
+    last_month = _add_months(current_month, MONTHS_AHEAD)
+    while month <= last_month:
+        next_month = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE transactions_y{month.year:04d}m{month.month:02d} "
+            f"PARTITION OF transactions "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month.isoformat()}')"
+        )
+        month = next_month
+
+    # Safety net so inserts never fail if partition maintenance falls behind
+    op.execute("CREATE TABLE transactions_default PARTITION OF transactions DEFAULT")
+
+    # Copy rows before building indexes (much faster than maintaining them row by row)
+    op.execute("INSERT INTO transactions SELECT * FROM transactions_old")
+    op.execute("DROP TABLE transactions_old")
+
+    # The partition key must be part of every unique constraint
+    op.create_primary_key('transactions_pkey', 'transactions', ['id', 'created_at'])
+    op.create_foreign_key('transactions_merchant_id_fkey', 'transactions', 'merchants', ['merchant_id'], ['id'])
+    op.create_foreign_key('transactions_user_id_fkey', 'transactions', 'users', ['user_id'], ['id'])
+    for name, columns, unique in INDEXES:
+        op.create_index(name, 'transactions', columns, unique=unique)
+    op.create_index('ix_transactions_charge_id', 'transactions', ['charge_id', 'created_at'], unique=True)
+
+    op.execute("ANALYZE transactions")
+
+
+def downgrade() -> None:
+    _move_table_aside()
+
+    op.execute("CREATE TABLE transactions (LIKE transactions_old INCLUDING DEFAULTS)")
+    _adopt_id_sequence()
+
+    op.execute("INSERT INTO transactions SELECT * FROM transactions_old")
+    # Dropping the partitioned parent drops every attached partition with it
+    op.execute("DROP TABLE transactions_old")
+
+    op.create_primary_key('transactions_pkey', 'transactions', ['id'])
+    op.create_foreign_key('transactions_merchant_id_fkey', 'transactions', 'merchants', ['merchant_id'], ['id'])
+    op.create_foreign_key('transactions_user_id_fkey', 'transactions', 'users', ['user_id'], ['id'])
+    for name, columns, unique in INDEXES:
+        op.create_index(name, 'transactions', columns, unique=unique)
+    op.create_index('ix_transactions_charge_id', 'transactions', ['charge_id'], unique=True)
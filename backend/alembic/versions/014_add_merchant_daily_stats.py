@@ -0,0 +1,53 @@
+"""add_merchant_daily_stats
+
+Revision ID: 014
+Revises: 013
+Create Date: 2025-02-14 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '014'
+down_revision = '013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Daily volume / fee / status rollup for merchant dashboards
+    op.create_table(
+        'merchant_daily_stats',
+        sa.Column('merchant_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('status', sa.String(length=50), nullable=False),
+        sa.Column('txn_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('amount_cents', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('protega_fee_cents', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.ForeignKeyConstraint(['merchant_id'], ['merchants.id'], ),
+        sa.PrimaryKeyConstraint('merchant_id', 'day', 'status')
+    )
+    
+    # Backfill from existing transactions (pending charges are not final yet)
+    op.execute(
+        """
+        INSERT INTO merchant_daily_stats
+            (merchant_id, day, status, txn_count, amount_cents, protega_fee_cents)
+        SELECT
+            merchant_id,
+            created_at::date,
+            LOWER(status::text),
+            COUNT(*),
+            SUM(amount_cents),
+            SUM(protega_fee_cents)
+        FROM transactions
+        WHERE LOWER(status::text) <> 'pending'
+        GROUP BY merchant_id, created_at::date, LOWER(status::text)
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('merchant_daily_stats')
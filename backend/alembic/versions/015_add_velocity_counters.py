@@ -0,0 +1,35 @@
+"""add_velocity_counters
+
+Revision ID: 015
+Revises: 014
+Create Date: 2025-02-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '015'
+down_revision = '014'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Time-bucketed enrollment velocity counters (shared backend)
+    op.create_table(
+        'velocity_counters',
+        sa.Column('kind', sa.String(length=32), nullable=False),
+        sa.Column('key_hash', sa.String(length=64), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('kind', 'key_hash', 'bucket_start')
+    )
+    # Used to prune expired buckets
+    op.create_index('idx_velocity_counters_bucket_start', 'velocity_counters', ['bucket_start'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_velocity_counters_bucket_start', table_name='velocity_counters')
+    op.drop_table('velocity_counters')
@@ -0,0 +1,43 @@
+"""add_otp_store
+
+Revision ID: 016
+Revises: 015
+Create Date: 2025-02-24 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '016'
+down_revision = '015'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Shared OTP codes and verified phones (postgres OTP store backend)
+    op.create_table(
+        'otp_codes',
+        sa.Column('phone', sa.String(length=32), nullable=False),
+        sa.Column('code', sa.String(length=16), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('phone')
+    )
+    op.create_index('idx_otp_codes_expires_at', 'otp_codes', ['expires_at'])
+
+    op.create_table(
+        'verified_phones',
+        sa.Column('phone', sa.String(length=32), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('phone')
+    )
+    op.create_index('idx_verified_phones_expires_at', 'verified_phones', ['expires_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_verified_phones_expires_at', table_name='verified_phones')
+    op.drop_table('verified_phones')
+    op.drop_index('idx_otp_codes_expires_at', table_name='otp_codes')
+    op.drop_table('otp_codes')
@@ -0,0 +1,35 @@
+"""add_rate_limit_buckets
+
+Revision ID: 017
+Revises: 016
+Create Date: 2025-02-27 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '017'
+down_revision = '016'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Token buckets for the shared rate limit backend
+    op.create_table(
+        'rate_limit_buckets',
+        sa.Column('key', sa.String(length=128), nullable=False),
+        sa.Column('tokens', sa.Float(), nullable=False),
+        sa.Column('allowed', sa.Boolean(), nullable=False, server_default=sa.true()),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('key')
+    )
+    # Used to prune idle buckets
+    op.create_index('idx_rate_limit_buckets_updated_at', 'rate_limit_buckets', ['updated_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_rate_limit_buckets_updated_at', table_name='rate_limit_buckets')
+    op.drop_table('rate_limit_buckets')
@@ -0,0 +1,40 @@
+"""add_transaction_charges
+
+Revision ID: 018
+Revises: 017
+Create Date: 2025-03-03 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '018'
+down_revision = '017'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Unpartitioned charge_id -> (id, created_at) key: keeps charge_id globally
+    # unique (the partitioned index can only cover (charge_id, created_at)) and
+    # gives charge lookups the created_at that prunes them to one partition
+    op.create_table(
+        'transaction_charges',
+        sa.Column('charge_id', sa.String(length=64), nullable=False),
+        sa.Column('transaction_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('charge_id')
+    )
+    # Used to delete keys of detached partitions
+    op.create_index('idx_transaction_charges_created_at', 'transaction_charges', ['created_at'])
+    op.execute(
+        "INSERT INTO transaction_charges (charge_id, transaction_id, created_at) "
+        "SELECT charge_id, id, created_at FROM transactions WHERE charge_id IS NOT NULL"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_transaction_charges_created_at', table_name='transaction_charges')
+    op.drop_table('transaction_charges')
@@ -0,0 +1,32 @@
+"""extend_admin_listing_indexes
+
+Revision ID: 019
+Revises: 018
+Create Date: 2025-03-10 09:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '019'
+down_revision = '018'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Admin listings page by (created_at DESC, id DESC) within one resolved
+    # flag / alert status. Adding id makes the index match the keyset order,
+    # so a cursor seeks straight to its row and no sort is needed.
+    op.drop_index('idx_unresolved_flags', table_name='flagged_enrolls')
+    op.create_index('idx_unresolved_flags', 'flagged_enrolls', ['resolved', 'created_at', 'id'])
+    op.drop_index('idx_pending_alerts', table_name='fraud_alerts')
+    op.create_index('idx_pending_alerts', 'fraud_alerts', ['status', 'created_at', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_pending_alerts', table_name='fraud_alerts')
+    op.create_index('idx_pending_alerts', 'fraud_alerts', ['status', 'created_at'])
+    op.drop_index('idx_unresolved_flags', table_name='flagged_enrolls')
+    op.create_index('idx_unresolved_flags', 'flagged_enrolls', ['resolved', 'created_at'])
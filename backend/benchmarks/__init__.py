@@ -0,0 +1,12 @@
+"""
+Performance benchmarks for Protega CloudPay.
+
+Run from the backend directory (or `make bench` against docker compose):
+
+    python -m benchmarks.e2e --sizes 1k,100k,1M       # API latency per endpoint
+    python -m benchmarks.matcher --sizes 1k,10k       # matcher accuracy and speed
+    python -m benchmarks.report benchmarks/results/e2e-<old>.json benchmarks/results/e2e-<new>.json
+
+Results are JSON files under benchmarks/results/, named after the commit
+they were measured on, so two commits can be compared directly.
+"""
@@ -0,0 +1,426 @@
+"""
+End-to-end latency benchmark.
+
+Seeds a synthetic population (protega_api.sdk.synthetic) of each requested
+size through the bulk importer, then drives the API in-process through an
+ASGI client, with the application lifespan running as it would under
+uvicorn:
+
+- identify-user    POST /identify-user with an enrolled finger
+- pay              POST /pay from a benchmark terminal (charged via Stripe)
+- biometric-login  POST /auth/biometric-login with an enrolled finger
+- enroll           POST /enroll of a new identity (OTP pre-issued, untimed)
+
+Each stage reports p50/p95/p99 latency and throughput; the run is written
+to benchmarks/results/ as JSON (see benchmarks.report for comparing two
+runs).
+
+Stripe calls go to a local stripe-mock (`docker compose --profile bench up
+-d stripe-mock`), never to Stripe: the runner sets STRIPE_API_BASE before
+the application is imported. stripe-mock gives every card the same
+fingerprint, so after each enrollment the runner clears it (untimed) to
+keep the duplicate-card check from rejecting the next one.
+
+Populations are grown in place: sizes run smallest first and each only
+imports identities the database does not have yet. Use a dedicated
+database; any templates already in it count toward every size and are
+reported as `templates` next to the requested size.
+
+    python -m benchmarks.e2e --sizes 1k,100k --requests 200 --concurrency 8
+    python -m benchmarks.e2e --sizes 1M --stages identify-user,pay --max-seconds 300
+"""
+
+import argparse
+import asyncio
+import itertools
+import logging
+import os
+import random
+import re
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.report import StageRecorder, format_table, new_result, parse_size, write_result
+
+logger = logging.getLogger("benchmarks.e2e")
+
+STAGES = ("identify-user", "pay", "biometric-login", "enroll")
+DEFAULT_SIZES = "1k,100k,1M"
+DEFAULT_STRIPE_API_BASE = "http://localhost:12111"
+BENCH_MERCHANT_EMAIL = "bench@example.com"
+
+
+def configure_environment(stripe_api_base: str) -> None:
+    """Settings the application must see before it is imported."""
+    os.environ["STRIPE_API_BASE"] = stripe_api_base
+    os.environ.setdefault("STRIPE_SECRET_KEY", "sk_test_benchmark")
+    # Every in-process request comes from the same client address
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+    # Enrollment dedupe sees the population's feature vectors
+    os.environ["SYNTHETIC_SAMPLES_ENABLED"] = "true"
+
+
+# ============================================================================
+# Seeding
+# ============================================================================
+
+def _synthetic_email_pattern(seed: int) -> str:
+    return f"synthetic+{seed}-%@example.com"
+
+
+def enrolled_identities(seed: int) -> List[int]:
+    """Identities of the seed's synthetic population present in the database."""
+    from sqlalchemy import select
+
+    from protega_api.db import SessionLocal
+    from protega_api.models import User
+
+    email_re = re.compile(rf"synthetic\+{seed}-(\d+)-\d+@example\.com")
+    db = SessionLocal()
+    try:
+        emails = db.execute(select(User.email).where(User.email.like(_synthetic_email_pattern(seed)))).scalars()
+        return sorted({int(m.group(1)) for m in map(email_re.fullmatch, emails) if m})
+    finally:
+        db.close()
+
+
+def attach_benchmark_cards(seed: int) -> int:
+    """
+    Give synthetic users without a card a Stripe customer and default card.
+
+    The bulk importer does not attach cards; these IDs only need to be
+    accepted by stripe-mock. Returns the number of cards added.
+    """
+    from sqlalchemy import text
+
+    from protega_api.db import engine
+
+    pattern = _synthetic_email_pattern(seed)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "UPDATE users SET stripe_customer_id = 'cus_bench_' || id "
+            "WHERE email LIKE :pattern AND stripe_customer_id IS NULL"
+        ), {"pattern": pattern})
+        added = conn.execute(text("""
+            INSERT INTO payment_methods (user_id, provider, provider_payment_method_id, brand, last4,
+                                         exp_month, exp_year, is_default, created_at, updated_at)
+            SELECT u.id, 'STRIPE', 'pm_bench_' || u.id, 'visa', '4242', 12, 2030, true,
+                   timezone('utc', now()), timezone('utc', now())
+            FROM users u
+            WHERE u.email LIKE :pattern
+              AND NOT EXISTS (SELECT 1 FROM payment_methods p WHERE p.user_id = u.id)
+        """), {"pattern": pattern}).rowcount
+    return added
+
+
+def count_templates() -> int:
+    """Templates in the database, whoever enrolled them."""
+    from protega_api.db import SessionLocal
+    from protega_api.models import BiometricTemplate
+
+    db = SessionLocal()
+    try:
+        return db.query(BiometricTemplate).count()
+    finally:
+        db.close()
+
+
+def seed_population(size: int, seed: int, workers: Optional[int]) -> List[int]:
+    """
+    Grow the synthetic population to `size` identities.
+
+    Returns:
+        Enrolled identities below `size` (similarity rejects leave gaps)
+    """
+    from protega_api.sdk.synthetic import SyntheticPopulation
+    from protega_api.tasks.bulk_import import run_import
+
+    existing = enrolled_identities(seed)
+    start = existing[-1] + 1 if existing else 0
+    if start < size:
+        logger.info(f"Seeding identities {start}..{size - 1} (seed {seed})")
+        population = SyntheticPopulation(size=size, seed=seed)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "population.jsonl")
+            population.write_jsonl(path, start=start)
+            stats = run_import(path, os.path.join(tmp, "rejects.jsonl"), workers=workers)
+        logger.info(f"Seeded {stats.imported} identities ({stats.rejected} rejected)\n{stats.report()}")
+        existing = enrolled_identities(seed)
+
+    added = attach_benchmark_cards(seed)
+    if added:
+        logger.info(f"Attached {added} benchmark cards")
+    return [identity for identity in existing if identity < size]
+
+
+def ensure_terminal() -> str:
+    """API key of the benchmark merchant's terminal, creating both if needed."""
+    from protega_api.db import SessionLocal
+    from protega_api.models import Merchant, Terminal
+    from protega_api.routers.merchant import generate_api_key
+    from protega_api.security import hash_password
+
+    db = SessionLocal()
+    try:
+        merchant = db.query(Merchant).filter(Merchant.email == BENCH_MERCHANT_EMAIL).first()
+        if not merchant:
+            merchant = Merchant(email=BENCH_MERCHANT_EMAIL, name="Benchmark Merchant",
+                                password_hash=hash_password(generate_api_key()))
+            db.add(merchant)
+            db.flush()
+        terminal = db.query(Terminal).filter(Terminal.merchant_id == merchant.id).first()
+        if not terminal:
+            terminal = Terminal(merchant_id=merchant.id, label="Benchmark Terminal", api_key=generate_api_key())
+            db.add(terminal)
+        db.commit()
+        return terminal.api_key
+    finally:
+        db.close()
+
+
+# ============================================================================
+# Stages
+# ============================================================================
+
+@dataclass
+class Stage:
+    """One endpoint under test."""
+    name: str
+    path: str
+    body: Callable[[int], dict]  # Request body for request number i
+    ok: Callable[[object], bool]  # Whether an httpx.Response counts as a success
+    before: Optional[Callable[[int], None]] = None  # Untimed setup for request i
+    after: Optional[Callable[[int], None]] = None  # Untimed cleanup for request i
+
+
+def build_stages(names: List[str], identities: List[int], seed: int, terminal_api_key: str) -> List[Stage]:
+    """Stages in `names`, probing with enrollment captures of random enrolled identities."""
+    from protega_api.config import settings
+    from protega_api.sdk.synthetic import SyntheticPopulation
+
+    population = SyntheticPopulation(size=max(identities) + 1, seed=seed)
+    rng = random.Random(seed)
+    probes: Dict[int, str] = {}
+
+    def probe(i: int) -> str:
+        # Captures are exact re-presentations of the enrolled sample: the
+        # hash-based matchers only accept identical samples
+        if i not in probes:
+            probes[i] = population.sample(rng.choice(identities))
+        return probes[i]
+
+    # New identities for /enroll come from a population no earlier run used
+    run_nonce = int(time.time())
+    newcomers = SyntheticPopulation(size=1, seed=run_nonce)
+
+    def enroll_phone(i: int) -> str:
+        return f"+1444{run_nonce % 10**10:010d}{i:05d}"
+
+    def enroll_email(i: int) -> str:
+        return f"bench-enroll+{run_nonce}-{i}@example.com"
+
+    def issue_otp(i: int) -> None:
+        from protega_api.otp_store import get_otp_store
+        get_otp_store().put_code(enroll_phone(i), "000000", settings.otp_ttl_seconds)
+
+    def clear_card_fingerprint(i: int) -> None:
+        from protega_api.db import SessionLocal
+        from protega_api.models import User
+
+        db = SessionLocal()
+        try:
+            db.query(User).filter(User.email == enroll_email(i)).update({"card_fingerprint": None})
+            db.commit()
+        finally:
+            db.close()
+
+    available = {
+        "identify-user": Stage(
+            "identify-user", "/identify-user",
+            body=lambda i: {"fingerprint_sample": probe(i)},
+            ok=lambda r: r.status_code == 200,
+        ),
+        "pay": Stage(
+            "pay", "/pay",
+            body=lambda i: {
+                "terminal_api_key": terminal_api_key,
+                "fingerprint_sample": probe(i),
+                "amount_cents": 500 + (i * 37) % 9500,
+                "merchant_ref": f"bench-{run_nonce}-{i}",
+            },
+            ok=lambda r: r.status_code == 200 and r.json().get("status") == "succeeded",
+        ),
+        "biometric-login": Stage(
+            "biometric-login", "/auth/biometric-login",
+            body=lambda i: {"fingerprint_sample": probe(i)},
+            ok=lambda r: r.status_code == 200,
+        ),
+        "enroll": Stage(
+            "enroll", "/enroll",
+            body=lambda i: {
+                "email": enroll_email(i),
+                "full_name": "Benchmark Enrollee",
+                "phone": enroll_phone(i),
+                "otp_code": "000000",
+                "fingerprint_sample": newcomers.sample(i),
+                "finger_label": "right_index",
+                "consent_text": "Benchmark enrollment consent",
+                "stripe_payment_method_token": "pm_card_visa",
+            },
+            ok=lambda r: r.status_code == 201,
+            before=issue_otp,
+            after=clear_card_fingerprint,
+        ),
+    }
+    return [available[name] for name in names]
+
+
+async def run_stage(client, stage: Stage, requests: int, concurrency: int, warmup: int,
+                    max_seconds: float) -> dict:
+    """
+    Send `requests` requests (after `warmup` unrecorded ones) from
+    `concurrency` concurrent workers, stopping early after `max_seconds`.
+    """
+    recorder = StageRecorder(stage.name)
+
+    async def send(i: int, record: bool = True) -> None:
+        if stage.before:
+            await asyncio.to_thread(stage.before, i)
+        started = time.perf_counter()
+        try:
+            response = await client.post(stage.path, json=stage.body(i))
+            status, ok = response.status_code, stage.ok(response)
+        except Exception as e:
+            logger.error(f"{stage.name} request {i} raised: {e}")
+            status, ok = None, False
+        latency_ms = (time.perf_counter() - started) * 1000
+        if record:
+            recorder.record(latency_ms, status, ok)
+        if stage.after:
+            await asyncio.to_thread(stage.after, i)
+
+    for i in range(warmup):
+        await send(i, record=False)
+
+    numbers = itertools.count(warmup)
+    deadline = time.monotonic() + max_seconds
+
+    async def worker() -> None:
+        while time.monotonic() < deadline:
+            i = next(numbers)
+            if i >= warmup + requests:
+                return
+            await send(i)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    recorder.seconds = time.perf_counter() - started
+
+    summary = recorder.summary()
+    if summary["requests"] < requests:
+        logger.warning(f"{stage.name}: stopped after {max_seconds:.0f}s with {summary['requests']}/{requests} requests")
+    return summary
+
+
+async def drive(stages: List[Stage], requests: int, concurrency: int, warmup: int, max_seconds: float) -> Dict[str, dict]:
+    """Run the stages in order against the app, inside its lifespan."""
+    import httpx
+
+    from protega_api.main import app
+
+    summaries = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            for stage in stages:
+                logger.info(f"Running {stage.name}: {requests} requests, concurrency {concurrency}")
+                summaries[stage.name] = await run_stage(client, stage, requests, concurrency, warmup, max_seconds)
+    return summaries
+
+
+def format_run(run: dict) -> str:
+    rows = [
+        [name, s["requests"], s["errors"], s["p50_ms"], s["p95_ms"], s["p99_ms"], s["throughput_rps"]]
+        for name, s in run["stages"].items()
+    ]
+    header = f"Population {run['size']:,} ({run['templates']:,} templates, seeded in {run['seed_seconds']:.1f}s)"
+    table = format_table(["stage", "requests", "errors", "p50 ms", "p95 ms", "p99 ms", "req/s"], rows)
+    return f"{header}\n{table}"
+
+
+def main() -> None:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="End-to-end API latency benchmark")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES,
+                        help=f"Comma-separated population sizes (default: {DEFAULT_SIZES})")
+    parser.add_argument("--stages", default=",".join(STAGES),
+                        help=f"Comma-separated stages to run (default: {','.join(STAGES)})")
+    parser.add_argument("--requests", type=int, default=200, help="Recorded requests per stage (default: 200)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent requests (default: 4)")
+    parser.add_argument("--warmup", type=int, default=5, help="Unrecorded requests per stage (default: 5)")
+    parser.add_argument("--max-seconds", type=float, default=120.0,
+                        help="Stop a stage after this long (default: 120)")
+    parser.add_argument("--seed", type=int, default=0, help="Synthetic population seed (default: 0)")
+    parser.add_argument("--workers", type=int, help="Bulk import processes (default: CPU count)")
+    parser.add_argument("--stripe-api-base", default=os.getenv("STRIPE_API_BASE") or DEFAULT_STRIPE_API_BASE,
+                        help=f"stripe-mock URL (default: $STRIPE_API_BASE or {DEFAULT_STRIPE_API_BASE})")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/e2e-<commit>.json)")
+    parser.add_argument("--log-level", default="WARNING", help="Application log level (default: WARNING)")
+    args = parser.parse_args()
+
+    try:
+        sizes = sorted(parse_size(size) for size in args.sizes.split(","))
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+    stage_names = [name.strip() for name in args.stages.split(",") if name.strip()]
+    unknown = set(stage_names) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    configure_environment(args.stripe_api_base)
+    import protega_api.main  # noqa: F401 - configures application logging; override it below
+    logging.getLogger().setLevel(args.log_level.upper())
+    logger.setLevel(logging.INFO)
+
+    result = new_result("e2e", {
+        "sizes": sizes,
+        "stages": stage_names,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "warmup": args.warmup,
+        "max_seconds": args.max_seconds,
+        "seed": args.seed,
+        "stripe_api_base": args.stripe_api_base,
+    })
+    terminal_api_key = ensure_terminal()
+
+    for size in sizes:
+        seed_started = time.perf_counter()
+        identities = seed_population(size, args.seed, args.workers)
+        seed_seconds = time.perf_counter() - seed_started
+        if not identities:
+            raise SystemExit(f"No synthetic identities enrolled for size {size}")
+
+        stages = build_stages(stage_names, identities, args.seed, terminal_api_key)
+        summaries = asyncio.run(drive(stages, args.requests, args.concurrency, args.warmup, args.max_seconds))
+        run = {
+            "size": size,
+            "templates": count_templates(),
+            "seed_seconds": round(seed_seconds, 2),
+            "stages": summaries,
+        }
+        result["runs"].append(run)
+        print(format_run(run), flush=True)
+
+    path = write_result(result, args.output)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    main()
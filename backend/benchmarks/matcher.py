@@ -0,0 +1,288 @@
+"""
+Matcher accuracy and speed harness.
+
+Runs each matcher backend over a labelled synthetic population
+(protega_api.sdk.synthetic) and reports, in one table per size:
+
+- recall@k   share of genuine probes whose enrolled finger is in the top k,
+             whatever its score
+- FAR        share of impostor probes (fingers never enrolled) whose best
+             score reaches the threshold
+- FRR        share of genuine probes not matched to their own finger at or
+             above the threshold
+- QPS        probes searched per second
+- memory     bytes allocated while building the gallery (tracemalloc)
+
+FAR/FRR are also swept over `--thresholds` to show where
+SIMILARITY_THRESHOLD sits on the curve.
+
+The gallery holds capture 0 of every finger (what synthetic enrollments
+use); genuine probes are later captures of enrolled fingers, impostor
+probes are captures of identities beyond the gallery.
+
+Backends:
+- matcher        FingerprintMatcher.compare_cosine over (id, vector) pairs,
+                 as /enroll's near-duplicate check does
+- vector-index   bulk_import.VectorIndex: one normalized matrix, searched
+                 with a matrix product per batch of probes
+
+    python -m benchmarks.matcher --sizes 1k,10k
+    python -m benchmarks.matcher --sizes 100k --backends vector-index --intra-noise 0.08 --separation 0.6
+"""
+
+import argparse
+import logging
+import time
+import tracemalloc
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from benchmarks.report import format_table, new_result, parse_size, write_result
+from protega_api.sdk.fingerprint_matcher import SIMILARITY_THRESHOLD, FingerprintMatcher
+from protega_api.sdk.synthetic import SyntheticPopulation
+from protega_api.tasks.bulk_import import VectorIndex
+
+logger = logging.getLogger("benchmarks.matcher")
+
+DEFAULT_SIZES = "1k,10k"
+DEFAULT_K = "1,5,10"
+DEFAULT_THRESHOLDS = "0.80,0.85,0.90,0.93,0.95,0.97,0.99"
+
+
+class MatcherBackend:
+    """FingerprintMatcher comparing the probe against every stored vector."""
+
+    name = "matcher"
+
+    def __init__(self, threshold: float):
+        self.matcher = FingerprintMatcher(threshold=threshold)
+        self.gallery: List[Tuple[int, np.ndarray]] = []
+
+    def build(self, vectors: np.ndarray) -> None:
+        # One array per template, like vectors parsed from the database
+        self.gallery = [(template_id, vector.copy()) for template_id, vector in enumerate(vectors)]
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        ids = np.empty((len(queries), k), dtype=np.int64)
+        scores = np.empty((len(queries), k), dtype=np.float32)
+        for row, query in enumerate(queries):
+            similarities = np.array([self.matcher.compare_cosine(query, vector) for _, vector in self.gallery])
+            ids[row], scores[row] = _top_k(similarities, k)
+        return ids, scores
+
+
+class VectorIndexBackend:
+    """bulk_import.VectorIndex searched in batches of `batch_size` probes."""
+
+    name = "vector-index"
+
+    def __init__(self, threshold: float, batch_size: int = 256):
+        self.index = VectorIndex()
+        self.batch_size = batch_size
+
+    def build(self, vectors: np.ndarray) -> None:
+        self.index.add(vectors)
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        ids = np.empty((len(queries), k), dtype=np.int64)
+        scores = np.empty((len(queries), k), dtype=np.float32)
+        for start in range(0, len(queries), self.batch_size):
+            batch = VectorIndex._normalize(queries[start:start + self.batch_size].astype(np.float32))
+            similarities = batch @ self.index.matrix.T
+            for offset, row in enumerate(similarities):
+                ids[start + offset], scores[start + offset] = _top_k(row, k)
+        return ids, scores
+
+
+BACKENDS = {
+    MatcherBackend.name: MatcherBackend,
+    VectorIndexBackend.name: VectorIndexBackend,
+}
+
+
+def _top_k(similarities: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Indices and scores of the k best similarities, best first."""
+    k = min(k, len(similarities))
+    candidates = np.argpartition(-similarities, k - 1)[:k]
+    order = candidates[np.argsort(-similarities[candidates])]
+    return order, similarities[order]
+
+
+def build_probes(population: SyntheticPopulation, gallery_size: int, genuine: int, impostors: int,
+                 seed: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Labelled probes.
+
+    Returns:
+        (genuine vectors, their gallery template ids, impostor vectors)
+    """
+    rng = np.random.default_rng([seed, 0xBE7C])
+    fingers = population.fingers
+    template_ids = rng.integers(0, gallery_size * fingers, size=genuine)
+    genuine_vectors = np.array([
+        population.capture(int(t) // fingers, int(t) % fingers, capture=1 + n)
+        for n, t in enumerate(template_ids)
+    ], dtype=np.float32)
+    impostor_vectors = np.array([
+        population.capture(gallery_size + n, 0, capture=1) for n in range(impostors)
+    ], dtype=np.float32).reshape(impostors, population.dim)
+    return genuine_vectors, template_ids, impostor_vectors
+
+
+def error_rates(genuine_ids: np.ndarray, genuine_scores: np.ndarray, expected: np.ndarray,
+                impostor_scores: np.ndarray, threshold: float) -> Tuple[float, float]:
+    """(FAR, FRR) at a threshold, from top-1 results."""
+    accepted_correctly = (genuine_ids[:, 0] == expected) & (genuine_scores[:, 0] >= threshold)
+    frr = 1.0 - float(accepted_correctly.mean()) if len(expected) else 0.0
+    far = float((impostor_scores[:, 0] >= threshold).mean()) if len(impostor_scores) else 0.0
+    return far, frr
+
+
+def evaluate(backend_name: str, gallery: np.ndarray, genuine: np.ndarray, expected: np.ndarray,
+             impostors: np.ndarray, ks: List[int], threshold: float, thresholds: List[float],
+             batch_size: int) -> dict:
+    """Build one backend over the gallery and score every probe."""
+    kwargs = {"batch_size": batch_size} if backend_name == VectorIndexBackend.name else {}
+    backend = BACKENDS[backend_name](threshold, **kwargs)
+
+    tracemalloc.start()
+    build_started = time.perf_counter()
+    backend.build(gallery)
+    build_seconds = time.perf_counter() - build_started
+    memory_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    k = min(max(ks), len(gallery))
+    search_started = time.perf_counter()
+    genuine_ids, genuine_scores = backend.search(genuine, k)
+    impostor_ids, impostor_scores = backend.search(impostors, k)
+    search_seconds = time.perf_counter() - search_started
+    queries = len(genuine) + len(impostors)
+
+    far, frr = error_rates(genuine_ids, genuine_scores, expected, impostor_scores, threshold)
+    summary = {
+        "gallery": len(gallery),
+        "genuine_probes": len(genuine),
+        "impostor_probes": len(impostors),
+        "threshold": threshold,
+        "far": round(far, 5),
+        "frr": round(frr, 5),
+        "qps": round(queries / search_seconds, 2) if search_seconds > 0 else 0.0,
+        "build_seconds": round(build_seconds, 3),
+        "memory_bytes": memory_bytes,
+        "curve": [],
+    }
+    for top in ks:
+        summary[f"recall_at_{top}"] = round(float((genuine_ids[:, :top] == expected[:, None]).any(axis=1).mean()), 5)
+    for t in thresholds:
+        t_far, t_frr = error_rates(genuine_ids, genuine_scores, expected, impostor_scores, t)
+        summary["curve"].append({"threshold": t, "far": round(t_far, 5), "frr": round(t_frr, 5)})
+    return summary
+
+
+def format_run(run: dict, ks: List[int]) -> str:
+    headers = ["backend", "gallery"] + [f"recall@{k}" for k in ks] + ["FAR", "FRR", "QPS", "memory MB"]
+    rows = []
+    for name, s in run["stages"].items():
+        rows.append(
+            [name, s["gallery"]] + [f"{s[f'recall_at_{k}']:.4f}" for k in ks]
+            + [f"{s['far']:.4f}", f"{s['frr']:.4f}", s["qps"], f"{s['memory_bytes'] / 2**20:.1f}"]
+        )
+    threshold = next(iter(run["stages"].values()))["threshold"]
+    text = f"Population {run['size']:,} (threshold {threshold})\n" + format_table(headers, rows)
+
+    curve_headers = ["threshold"]
+    curve_rows: Dict[float, list] = {}
+    for name, s in run["stages"].items():
+        curve_headers += [f"{name} FAR", f"{name} FRR"]
+        for point in s["curve"]:
+            curve_rows.setdefault(point["threshold"], [point["threshold"]]).extend(
+                [f"{point['far']:.4f}", f"{point['frr']:.4f}"]
+            )
+    if curve_rows:
+        text += "\n\n" + format_table(curve_headers, list(curve_rows.values()))
+    return text
+
+
+def main() -> None:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Matcher accuracy and speed harness")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES,
+                        help=f"Comma-separated gallery sizes in identities (default: {DEFAULT_SIZES})")
+    parser.add_argument("--backends", default=",".join(BACKENDS),
+                        help=f"Comma-separated backends (default: {','.join(BACKENDS)})")
+    parser.add_argument("--genuine", type=int, default=200, help="Genuine probes per size (default: 200)")
+    parser.add_argument("--impostors", type=int, default=200, help="Impostor probes per size (default: 200)")
+    parser.add_argument("--k", default=DEFAULT_K, help=f"Comma-separated recall@k values (default: {DEFAULT_K})")
+    parser.add_argument("--threshold", type=float, default=SIMILARITY_THRESHOLD,
+                        help=f"Similarity threshold for FAR/FRR (default: SIMILARITY_THRESHOLD = {SIMILARITY_THRESHOLD})")
+    parser.add_argument("--thresholds", default=DEFAULT_THRESHOLDS,
+                        help=f"Comma-separated thresholds for the FAR/FRR curve (default: {DEFAULT_THRESHOLDS})")
+    parser.add_argument("--fingers", type=int, default=1, help="Fingers per identity (default: 1)")
+    parser.add_argument("--seed", type=int, default=0, help="Synthetic population seed (default: 0)")
+    parser.add_argument("--intra-noise", type=float, default=0.05, help="Per-capture noise (default: 0.05)")
+    parser.add_argument("--separation", type=float, default=1.0, help="Finger separation 0-1 (default: 1.0)")
+    parser.add_argument("--batch-size", type=int, default=256, help="vector-index probes per batch (default: 256)")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/matcher-<commit>.json)")
+    args = parser.parse_args()
+
+    try:
+        sizes = sorted(parse_size(size) for size in args.sizes.split(","))
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+    backends = [name.strip() for name in args.backends.split(",") if name.strip()]
+    unknown = set(backends) - set(BACKENDS)
+    if unknown:
+        parser.error(f"unknown backends: {', '.join(sorted(unknown))}")
+    ks = sorted({int(k) for k in args.k.split(",")})
+    thresholds = [float(t) for t in args.thresholds.split(",")]
+
+    result = new_result("matcher", {
+        "sizes": sizes,
+        "backends": backends,
+        "genuine": args.genuine,
+        "impostors": args.impostors,
+        "k": ks,
+        "threshold": args.threshold,
+        "fingers": args.fingers,
+        "seed": args.seed,
+        "intra_noise": args.intra_noise,
+        "separation": args.separation,
+        "batch_size": args.batch_size,
+    })
+
+    for size in sizes:
+        population = SyntheticPopulation(
+            size=size + args.impostors, fingers=args.fingers, seed=args.seed,
+            intra_noise=args.intra_noise, separation=args.separation,
+        )
+        started = time.perf_counter()
+        gallery = np.array([
+            population.capture(identity, finger)
+            for identity in range(size) for finger in range(args.fingers)
+        ], dtype=np.float32)
+        genuine, expected, impostors = build_probes(population, size, args.genuine, args.impostors, args.seed)
+        logger.info(f"Generated {len(gallery):,} templates and {len(genuine) + len(impostors)} probes "
+                    f"in {time.perf_counter() - started:.1f}s")
+
+        run = {"size": size, "stages": {}}
+        for name in backends:
+            logger.info(f"Evaluating {name} over {len(gallery):,} templates")
+            run["stages"][name] = evaluate(
+                name, gallery, genuine, expected, impostors, ks, args.threshold, thresholds, args.batch_size
+            )
+        result["runs"].append(run)
+        print(format_run(run, ks), flush=True)
+        print(flush=True)
+
+    path = write_result(result, args.output)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    main()
@@ -0,0 +1,217 @@
+"""
+Latency summaries, result files and regression comparison shared by the
+benchmark runners.
+
+Compare two result files (exit status 1 if anything regressed):
+
+    python -m benchmarks.report benchmarks/results/e2e-<old>.json benchmarks/results/e2e-<new>.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import re
+import subprocess
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+# Summary fields compared between runs (when both have them); True means higher is better
+COMPARED_METRICS = {
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "throughput_rps": True,
+    "qps": True,
+    "recall_at_1": True,
+}
+
+
+def parse_size(value: str) -> int:
+    """Parse a population size such as 1000, 100k or 1M."""
+    match = re.fullmatch(r"\s*(\d+)\s*([kKmM]?)\s*", value)
+    if not match:
+        raise argparse.ArgumentTypeError(f"invalid size: {value}")
+    multiplier = {"": 1, "k": 1_000, "m": 1_000_000}[match.group(2).lower()]
+    return int(match.group(1)) * multiplier
+
+
+@dataclass
+class StageRecorder:
+    """Latencies and response codes of one benchmark stage."""
+    name: str
+    latencies_ms: List[float] = field(default_factory=list)
+    status_counts: Dict[str, int] = field(default_factory=dict)
+    errors: int = 0
+    seconds: float = 0.0
+
+    def record(self, latency_ms: float, status: Optional[int], ok: bool) -> None:
+        """Record one request (status None means the request raised)."""
+        self.latencies_ms.append(latency_ms)
+        key = str(status) if status is not None else "exception"
+        self.status_counts[key] = self.status_counts.get(key, 0) + 1
+        if not ok:
+            self.errors += 1
+
+    def summary(self) -> dict:
+        """p50/p95/p99, mean, max and throughput over everything recorded."""
+        count = len(self.latencies_ms)
+        latencies = np.asarray(self.latencies_ms, dtype=np.float64)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if count else (0.0, 0.0, 0.0)
+        return {
+            "requests": count,
+            "errors": self.errors,
+            "status_counts": dict(sorted(self.status_counts.items())),
+            "seconds": round(self.seconds, 3),
+            "throughput_rps": round(count / self.seconds, 2) if self.seconds > 0 else 0.0,
+            "p50_ms": round(float(p50), 2),
+            "p95_ms": round(float(p95), 2),
+            "p99_ms": round(float(p99), 2),
+            "mean_ms": round(float(latencies.mean()), 2) if count else 0.0,
+            "max_ms": round(float(latencies.max()), 2) if count else 0.0,
+        }
+
+
+def git_revision() -> Dict[str, object]:
+    """
+    Current commit and whether the tree has uncommitted changes.
+
+    GIT_COMMIT (and GIT_DIRTY=1) from the environment take precedence, for
+    containers without a git checkout (`make bench` passes the host's);
+    otherwise git is asked directly.
+    """
+    commit = os.environ.get("GIT_COMMIT", "").strip()
+    if commit:
+        return {"commit": commit, "dirty": os.environ.get("GIT_DIRTY", "").strip().lower() in ("1", "true")}
+
+    def git(*args: str) -> Optional[str]:
+        try:
+            return subprocess.run(
+                ["git", *args], capture_output=True, text=True, check=True, timeout=10,
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+            ).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return None
+
+    commit = git("rev-parse", "HEAD")
+    status = git("status", "--porcelain")
+    return {"commit": commit or "unknown", "dirty": bool(status)}
+
+
+def new_result(benchmark: str, config: dict) -> dict:
+    """Skeleton of a result file: what ran, where and on which commit."""
+    return {
+        "benchmark": benchmark,
+        **git_revision(),
+        "created_at": datetime.utcnow().isoformat() + "Z",
+        "host": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+        },
+        "config": config,
+        "runs": [],
+    }
+
+
+def write_result(result: dict, path: Optional[str] = None) -> str:
+    """
+    Write a result file.
+
+    Args:
+        result: Result from new_result() with runs filled in
+        path: Output path (default: results/<benchmark>-<commit>[-dirty].json)
+
+    Returns:
+        The path written
+    """
+    if path is None:
+        suffix = "-dirty" if result.get("dirty") else ""
+        path = os.path.join(RESULTS_DIR, f"{result['benchmark']}-{result['commit'][:12]}{suffix}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+        f.write("\n")
+    return path
+
+
+def format_table(headers: List[str], rows: List[List[object]]) -> str:
+    """Plain-text table with right-aligned columns."""
+    cells = [[str(h) for h in headers]] + [[str(c) for c in row] for row in rows]
+    widths = [max(len(row[i]) for row in cells) for i in range(len(headers))]
+    lines = ["  ".join(cell.rjust(width) for cell, width in zip(row, widths)) for row in cells]
+    lines.insert(1, "  ".join("-" * width for width in widths))
+    return "\n".join(lines)
+
+
+def _stage_summaries(result: dict) -> Dict[tuple, dict]:
+    return {
+        (run["size"], stage): summary
+        for run in result.get("runs", [])
+        for stage, summary in run.get("stages", {}).items()
+    }
+
+
+def compare_results(baseline: dict, candidate: dict, tolerance: float = 0.10) -> tuple:
+    """
+    Compare two result files stage by stage.
+
+    A metric regresses when it is worse than the baseline by more than
+    `tolerance` (relative).
+
+    Returns:
+        (table text, list of regression descriptions)
+    """
+    base_stages = _stage_summaries(baseline)
+    rows, regressions = [], []
+    for key, summary in sorted(_stage_summaries(candidate).items()):
+        base = base_stages.get(key)
+        if base is None:
+            continue
+        size, stage = key
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            if metric not in base or metric not in summary:
+                continue
+            old, new = base[metric], summary[metric]
+            change = (new - old) / old if old else 0.0
+            worse = -change if higher_is_better else change
+            flag = ""
+            if worse > tolerance:
+                flag = "REGRESSION"
+                regressions.append(f"{stage} @ {size}: {metric} {old} -> {new} ({change:+.1%})")
+            rows.append([size, stage, metric, old, new, f"{change:+.1%}", flag])
+    table = format_table(["size", "stage", "metric", "baseline", "candidate", "change", ""], rows)
+    return table, regressions
+
+
+def main() -> None:
+    """Command-line entry point: compare two result files."""
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline", help="Result file of the reference commit")
+    parser.add_argument("candidate", help="Result file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="Relative slowdown tolerated before flagging (default: 0.10)")
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.candidate, encoding="utf-8") as f:
+        candidate = json.load(f)
+
+    table, regressions = compare_results(baseline, candidate, args.tolerance)
+    print(f"{baseline.get('commit', '?')[:12]} -> {candidate.get('commit', '?')[:12]}")
+    print(table)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
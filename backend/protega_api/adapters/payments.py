@@ -14,6 +14,8 @@ from protega_api.config import settings
 
 # Initialize Stripe with API key
 stripe.api_key = settings.stripe_secret_key
+if settings.stripe_api_base:
+    stripe.api_base = settings.stripe_api_base
 
 logger = logging.getLogger(__name__)
 
@@ -4,13 +4,15 @@ Anti-fraud utilities for enrollment risk scoring and checks.
 
 import logging
 import os
-from datetime import datetime, timedelta
-from typing import Tuple, List
+from dataclasses import dataclass
+from typing import List
 
 import stripe
+from sqlalchemy import exists, false, select, true
 from sqlalchemy.orm import Session
 
 from protega_api.models import User, BiometricTemplate, FlaggedEnroll
+from protega_api.velocity import VelocityKind, get_velocity_counter
 
 logger = logging.getLogger(__name__)
 
@@ -42,28 +44,70 @@ def get_card_fingerprint_from_token(token: str) -> str | None:
         return None
 
 
-def device_enroll_count(db: Session, device_id: str, window_hours: int = 24) -> int:
+def device_enroll_count(device_id: str, window_hours: int = 24) -> int:
     """
     Count enrollments from a device within the specified time window.
     
+    Served from the velocity counters, so no table scan is involved.
+    
     Args:
-        db: Database session
         device_id: Device identifier
         window_hours: Time window in hours (default: 24)
         
     Returns:
         Count of enrollments
     """
-    if not device_id:
-        return 0
+    return get_velocity_counter().count(VelocityKind.DEVICE, device_id, window_hours * 3600)
+
+
+# Risk score weights
+CARD_REUSE_POINTS = 50
+PHONE_MISSING_POINTS = 20
+FINGERPRINT_REGISTERED_POINTS = 80
+
+
+@dataclass
+class RiskAssessment:
+    """
+    Enrollment risk signals gathered in a single database round trip.
+    
+    Velocity counts are tracked for analytics only and do not add to the score.
+    With the memory velocity backend they are read from process memory
+    rather than the database.
+    """
+    card_reuse: bool = False
+    phone_missing: bool = False
+    device_enrolls_24h: int = 0
+    ip_enrolls_24h: int = 0
+    fingerprint_registered: bool = False
     
-    cutoff = datetime.utcnow() - timedelta(hours=window_hours)
-    count = db.query(BiometricTemplate).filter(
-        BiometricTemplate.device_id == device_id,
-        BiometricTemplate.created_at >= cutoff
-    ).count()
+    @property
+    def score(self) -> int:
+        """Total risk score (higher = riskier)."""
+        score = 0
+        if self.card_reuse:
+            score += CARD_REUSE_POINTS
+        if self.phone_missing:
+            score += PHONE_MISSING_POINTS
+        if self.fingerprint_registered:
+            score += FINGERPRINT_REGISTERED_POINTS
+        return score
     
-    return count
+    @property
+    def reasons(self) -> List[str]:
+        """Reason codes, in the format stored on FlaggedEnroll.reason."""
+        reasons = []
+        if self.card_reuse:
+            reasons.append("card_reuse")
+        if self.phone_missing:
+            reasons.append("phone_missing")
+        if self.device_enrolls_24h > 0:
+            reasons.append(f"device_enrolls_today_{self.device_enrolls_24h}")
+        if self.ip_enrolls_24h > 0:
+            reasons.append(f"ip_enrolls_today_{self.ip_enrolls_24h}")
+        if self.fingerprint_registered:
+            reasons.append("fingerprint_already_registered")
+        return reasons
 
 
 def compute_risk_score(
@@ -73,9 +117,15 @@ def compute_risk_score(
     device_id: str | None,
     ip: str | None,
     fp_hash: str | None,
-) -> Tuple[int, List[str]]:
+) -> RiskAssessment:
     """
-    Compute risk score and reasons for enrollment.
+    Compute the risk assessment for an enrollment.
+    
+    Every database-backed signal is a CTE in one SELECT, so the enrollment
+    path pays a single round trip regardless of how many signals are checked.
+    Signals whose input is missing are replaced by constants and never touch
+    a table. Device and IP velocity are read from the velocity_counters
+    table in the same SELECT (or from process memory with the memory backend).
     
     Args:
         db: Database session
@@ -86,54 +136,54 @@ def compute_risk_score(
         fp_hash: Fingerprint hash
         
     Returns:
-        Tuple of (risk_score, reasons_list)
+        RiskAssessment with every signal and the derived score
     """
-    score = 0
-    reasons = []
-    
-    # Card reuse detection (50 points)
-    if card_fp:
-        existing_user = db.query(User).filter(
-            User.card_fingerprint == card_fp
-        ).first()
-        if existing_user:
-            score += 50
-            reasons.append("card_reuse")
-    
-    # Phone missing (20 points)
-    if not phone:
-        score += 20
-        reasons.append("phone_missing")
-    
-    # Device velocity tracking (no penalty - just for analytics)
-    if device_id:
-        enroll_count = device_enroll_count(db, device_id)
-        # Only add to reasons for tracking, no score impact
-        if enroll_count > 0:
-            reasons.append(f"device_enrolls_today_{enroll_count}")
+    # Card reuse detection
+    card_signal = select(
+        (exists().where(User.card_fingerprint == card_fp) if card_fp else false()).label("hit")
+    ).cte("card_signal")
     
-    # IP velocity tracking (no penalty - just for analytics)
-    if ip:
-        cutoff = datetime.utcnow() - timedelta(hours=24)
-        ip_count = db.query(BiometricTemplate).filter(
-            BiometricTemplate.enroll_ip == ip,
-            BiometricTemplate.created_at >= cutoff
-        ).count()
-        # Only add to reasons for tracking, no score impact
-        if ip_count > 0:
-            reasons.append(f"ip_enrolls_today_{ip_count}")
-    
-    # Fingerprint already registered (80 points - highest risk)
-    if fp_hash:
-        existing_fp = db.query(BiometricTemplate).filter(
+    # Fingerprint already registered
+    fp_signal = select(
+        (exists().where(
             BiometricTemplate.template_hash == fp_hash,
             BiometricTemplate.active == True
-        ).first()
-        if existing_fp:
-            score += 80
-            reasons.append("fingerprint_already_registered")
+        ) if fp_hash else false()).label("hit")
+    ).cte("fp_signal")
+    
+    velocity = get_velocity_counter()
+    device_query = velocity.count_query(VelocityKind.DEVICE, device_id)
+    ip_query = velocity.count_query(VelocityKind.IP, ip)
     
-    return score, reasons
+    if device_query is not None and ip_query is not None:
+        # Enrollment velocity from velocity_counters
+        device_signal = device_query.cte("device_signal")
+        ip_signal = ip_query.cte("ip_signal")
+        stmt = select(
+            card_signal.c.hit,
+            fp_signal.c.hit,
+            device_signal.c.hits,
+            ip_signal.c.hits,
+        ).select_from(
+            card_signal.join(fp_signal, true()).join(device_signal, true()).join(ip_signal, true())
+        )
+        card_reuse, fp_registered, device_enrolls, ip_enrolls = db.execute(stmt).one()
+    else:
+        stmt = select(
+            card_signal.c.hit,
+            fp_signal.c.hit,
+        ).select_from(card_signal.join(fp_signal, true()))
+        card_reuse, fp_registered = db.execute(stmt).one()
+        device_enrolls = velocity.count(VelocityKind.DEVICE, device_id)
+        ip_enrolls = velocity.count(VelocityKind.IP, ip)
+    
+    return RiskAssessment(
+        card_reuse=bool(card_reuse),
+        phone_missing=not phone,
+        device_enrolls_24h=int(device_enrolls),
+        ip_enrolls_24h=int(ip_enrolls),
+        fingerprint_registered=bool(fp_registered),
+    )
 
 
 def create_flagged_enroll(
@@ -0,0 +1,179 @@
+"""
+Cross-worker message broker for WebSocket fan-out.
+
+Each worker only holds its own sockets, so broadcasts are published to a
+broker and every worker delivers what it receives to its local sockets.
+
+Backends:
+- memory: in-process, for single-worker runs (default)
+- postgres: LISTEN/NOTIFY on the primary database, for multiple workers or
+  machines; no extra infrastructure needed
+
+Messages are envelopes of the form
+    {"target": "merchant" | "charge", "key": <merchant_id | charge_id>, "message": {...}}
+or, for batches, "messages": [...] instead of "message". Batches too large
+for one NOTIFY are split into several envelopes.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Awaitable, Callable, List, Optional
+
+from protega_api.config import settings
+
+logger = logging.getLogger(__name__)
+
+Deliver = Callable[[dict], Awaitable[None]]
+
+# NOTIFY payloads must be shorter than 8000 bytes
+MAX_NOTIFY_PAYLOAD_BYTES = 7900
+
+
+def split_envelope(envelope: dict, limit: int = MAX_NOTIFY_PAYLOAD_BYTES) -> List[dict]:
+    """
+    Split a batch envelope into envelopes whose JSON fits in `limit` bytes.
+
+    Messages keep their order. Single-message envelopes, and messages too
+    large on their own, are returned as they are.
+    """
+    messages = envelope.get("messages")
+    if not messages or len(json.dumps(envelope).encode()) <= limit:
+        return [envelope]
+
+    header = {key: value for key, value in envelope.items() if key != "messages"}
+    # Bytes of the envelope without messages, plus the separators between them
+    overhead = len(json.dumps({**header, "messages": []}).encode())
+    chunks, current, size = [], [], overhead
+    for message in messages:
+        message_size = len(json.dumps(message).encode()) + (2 if current else 0)
+        if current and size + message_size > limit:
+            chunks.append({**header, "messages": current})
+            current, size = [], overhead
+            message_size -= 2
+        current.append(message)
+        size += message_size
+    chunks.append({**header, "messages": current})
+    return chunks
+
+
+class InProcessBroker:
+    """Delivers published envelopes straight to this worker's sockets."""
+
+    def __init__(self):
+        self._deliver: Optional[Deliver] = None
+
+    async def start(self, deliver: Deliver) -> None:
+        self._deliver = deliver
+
+    async def publish(self, envelope: dict) -> None:
+        if self._deliver is None:
+            logger.warning("Broker not started; dropping WebSocket message")
+            return
+        await self._deliver(envelope)
+
+    async def stop(self) -> None:
+        self._deliver = None
+
+
+class PostgresBroker:
+    """
+    Publishes with pg_notify and receives with LISTEN on a dedicated connection.
+
+    Every worker, including the publisher, receives each notification once
+    and fans it out to its local sockets. The listener reconnects with
+    backoff; messages published while it is down are not replayed.
+    """
+
+    def __init__(self, conninfo: str, channel: str):
+        self.conninfo = conninfo
+        self.channel = channel
+        self._deliver: Optional[Deliver] = None
+        self._listener: Optional[asyncio.Task] = None
+        self._publish_conn = None
+        self._publish_lock = asyncio.Lock()
+
+    async def start(self, deliver: Deliver) -> None:
+        self._deliver = deliver
+        self._listener = asyncio.create_task(self._listen())
+        logger.info(f"Listening for WebSocket broadcasts on channel {self.channel}")
+
+    async def _listen(self) -> None:
+        import psycopg
+
+        backoff = 1.0
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(self.conninfo, autocommit=True) as conn:
+                    await conn.execute(f"LISTEN {self.channel}")
+                    backoff = 1.0
+                    async for notify in conn.notifies():
+                        await self._dispatch(notify.payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Broker listener failed, reconnecting in {backoff:.0f}s: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+    async def _dispatch(self, payload: str) -> None:
+        try:
+            envelope = json.loads(payload)
+        except json.JSONDecodeError:
+            logger.warning("Ignoring malformed broker notification")
+            return
+        try:
+            await self._deliver(envelope)
+        except Exception as e:
+            logger.error(f"Failed to deliver broker message: {e}")
+
+    async def publish(self, envelope: dict) -> None:
+        for chunk in split_envelope(envelope):
+            payload = json.dumps(chunk)
+            if len(payload.encode()) > MAX_NOTIFY_PAYLOAD_BYTES:
+                # A single message too large for NOTIFY: deliver to this worker's sockets only
+                logger.warning(f"Broker message too large ({len(payload)} bytes); delivering locally only")
+                await self._deliver(chunk)
+                continue
+            await self._notify(payload)
+
+    async def _notify(self, payload: str) -> None:
+        import psycopg
+
+        async with self._publish_lock:
+            for attempt in range(2):
+                try:
+                    if self._publish_conn is None or self._publish_conn.closed:
+                        self._publish_conn = await psycopg.AsyncConnection.connect(self.conninfo, autocommit=True)
+                    await self._publish_conn.execute("SELECT pg_notify(%s, %s)", (self.channel, payload))
+                    return
+                except psycopg.OperationalError as e:
+                    self._publish_conn = None
+                    if attempt:
+                        logger.error(f"Failed to publish WebSocket broadcast: {e}")
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+        if self._publish_conn is not None:
+            await self._publish_conn.close()
+
+
+def _libpq_url(url: str) -> str:
+    """Strip the SQLAlchemy driver suffix so psycopg can use the URL directly."""
+    return url.replace("postgresql+psycopg://", "postgresql://", 1)
+
+
+def create_broker():
+    """Create the broker for the configured backend."""
+    if settings.ws_broker_backend == "postgres":
+        return PostgresBroker(_libpq_url(settings.get_database_url()), settings.ws_broker_channel)
+    return InProcessBroker()
+
+
+# Global broker instance (started in the application lifespan)
+broker = create_broker()
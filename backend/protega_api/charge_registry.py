@@ -0,0 +1,131 @@
+"""
+Short-lived in-memory registry of pending charges.
+
+The customer acceptance page polls charge details while a merchant is still
+editing the amount. Serving those polls from process memory keeps them off
+the transactions table entirely; the database remains the source of truth
+and is consulted on a miss (expired entry, restart, or another worker).
+
+Every worker keeps its own registry, so changes are invalidated on all of
+them through the broker (invalidate_pending_charge). The short TTL bounds
+staleness if an invalidation is lost while a broker listener reconnects.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import anyio
+from sqlalchemy.orm import Session
+
+from protega_api.broker import broker
+from protega_api.config import settings
+from protega_api.models import Transaction, TransactionCharge
+
+logger = logging.getLogger(__name__)
+
+
+class PendingChargeRegistry:
+    """
+    Thread-safe TTL cache of pending charge snapshots keyed by charge_id.
+
+    Entries expire after `ttl_seconds` and the oldest entries are evicted
+    once `max_entries` is exceeded.
+    """
+
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple[float, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, charge_id: str, snapshot: dict) -> None:
+        """Store (or replace) the snapshot for a pending charge."""
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._entries[charge_id] = (expires_at, dict(snapshot))
+            self._entries.move_to_end(charge_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, charge_id: str) -> Optional[dict]:
+        """Return a copy of the snapshot, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(charge_id)
+            if entry is None:
+                return None
+            expires_at, snapshot = entry
+            if time.monotonic() > expires_at:
+                del self._entries[charge_id]
+                return None
+            return dict(snapshot)
+
+    def discard(self, charge_id: str) -> None:
+        """Forget a charge once it is no longer pending."""
+        with self._lock:
+            self._entries.pop(charge_id, None)
+
+
+def find_pending_transaction(
+    db: Session,
+    charge_id: str,
+    merchant_id: Optional[int] = None,
+    for_update: bool = False,
+) -> Optional[Transaction]:
+    """
+    Pending transaction of a charge, read from its monthly partition only.
+    
+    Args:
+        db: Database session
+        charge_id: Charge to look up
+        merchant_id: Only match charges of this merchant
+        for_update: Lock the transaction row until commit
+        
+    Returns:
+        The transaction, or None if unknown or no longer pending
+    """
+    key = db.query(TransactionCharge).filter(TransactionCharge.charge_id == charge_id).first()
+    if key is None:
+        return None
+    query = db.query(Transaction).filter(
+        Transaction.id == key.transaction_id,
+        Transaction.created_at == key.created_at,
+        Transaction.status == 'pending',
+    )
+    if merchant_id is not None:
+        query = query.filter(Transaction.merchant_id == merchant_id)
+    if for_update:
+        query = query.with_for_update()
+    return query.first()
+
+
+# Global registry instance
+pending_charges = PendingChargeRegistry(
+    ttl_seconds=settings.pending_charge_ttl_seconds,
+    max_entries=settings.pending_charge_registry_size,
+)
+
+
+async def invalidate_pending_charge(charge_id: str) -> None:
+    """Drop a charge from the registry on every worker."""
+    pending_charges.discard(charge_id)
+    try:
+        await broker.publish({"target": "charge_registry", "key": charge_id})
+    except Exception as e:
+        logger.error(f"Failed to publish pending charge invalidation for {charge_id}: {e}")
+
+
+def invalidate_pending_charge_from_thread(charge_id: str) -> None:
+    """
+    invalidate_pending_charge() for sync endpoints running in the threadpool.
+
+    Outside a worker thread of the event loop (scripts, tasks) only this
+    process's entry is dropped.
+    """
+    pending_charges.discard(charge_id)
+    try:
+        anyio.from_thread.run(invalidate_pending_charge, charge_id)
+    except RuntimeError:
+        pass
@@ -9,14 +9,22 @@ Implements BIPA, CCPA, and GDPR compliance requirements:
 - Biometric data audit trail
 """
 
+import json
 import logging
 from datetime import datetime
-from typing import Annotated
+from typing import Annotated, Dict, Iterator, List
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, select, update
 from sqlalchemy.orm import Session
 
-from protega_api.db import get_db
-from protega_api.models import Consent, BiometricTemplate, User, PaymentMethod
+from protega_api.config import settings
+from protega_api.db import get_db, get_read_db, new_read_session
+from protega_api.deps import authorize_user_access
+from protega_api.models import Consent, BiometricTemplate, FraudAlert, User, PaymentMethod, Transaction
+
+# Rows fetched per round trip while streaming an export
+EXPORT_BATCH_SIZE = 500
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/privacy", tags=["compliance"])
@@ -46,42 +54,70 @@ def record_user_consent(user_id: int, consent_text: str, db: Session):
         raise
 
 
+def _detach_fraud_alerts(user_ids: List[int], db: Session) -> None:
+    """Clear fraud alert references to the users' templates so the templates can be deleted."""
+    template_ids = select(BiometricTemplate.id).where(BiometricTemplate.user_id.in_(user_ids))
+    db.execute(
+        update(FraudAlert)
+        .where(FraudAlert.template_id.in_(template_ids))
+        .values(template_id=None)
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(
+        update(FraudAlert)
+        .where(FraudAlert.match_template_id.in_(template_ids))
+        .values(match_template_id=None)
+        .execution_options(synchronize_session=False)
+    )
+
+
 def delete_biometric_data(user_id: int, db: Session):
     """
-    Delete all biometric data for a user (Right to Erasure - GDPR).
+    Erase one user's biometric, payment and consent data (see erase_users).
+    
+    Does not commit.
     
     Args:
         user_id: ID of the user whose data should be deleted
         db: Database session
         
     Returns:
-        Number of records deleted
+        Number of biometric templates deleted
     """
-    try:
-        # Delete biometric templates
-        templates_deleted = db.query(BiometricTemplate).filter(
-            BiometricTemplate.user_id == user_id
-        ).delete()
-        
-        logger.info(f"Deleted {templates_deleted} biometric templates for user: {user_id}")
-        
-        # Delete payment methods (removes saved card references)
-        payment_methods_deleted = db.query(PaymentMethod).filter(
-            PaymentMethod.user_id == user_id
-        ).delete()
-        
-        logger.info(f"Deleted {payment_methods_deleted} payment methods for user: {user_id}")
-        
-        # Note: We keep the User record with email/phone for fraud prevention
-        # but remove all biometric and payment data
-        
-        db.commit()
+    return erase_users([user_id], db)["biometric_templates"]
+
+
+def erase_users(user_ids: List[int], db: Session) -> Dict[str, int]:
+    """
+    Erase biometric, payment and consent data for a set of users.
+    
+    One set-based statement per table regardless of how many users are
+    passed. User records and transactions are kept (see delete_user_data).
+    Does not commit.
+    
+    Args:
+        user_ids: IDs of the users to erase
+        db: Database session
         
-        return templates_deleted
-    except Exception as e:
-        logger.error(f"Failed to delete biometric data: {e}")
-        db.rollback()
-        raise
+    Returns:
+        Rows deleted per table
+    """
+    if not user_ids:
+        return {"biometric_templates": 0, "payment_methods": 0, "consents": 0}
+    
+    _detach_fraud_alerts(user_ids, db)
+    counts = {}
+    for name, model in (
+        ("biometric_templates", BiometricTemplate),
+        ("payment_methods", PaymentMethod),
+        ("consents", Consent),
+    ):
+        counts[name] = db.execute(
+            delete(model)
+            .where(model.user_id.in_(user_ids))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+    return counts
 
 
 @router.post("/consent/{user_id}", status_code=status.HTTP_201_CREATED)
@@ -146,16 +182,12 @@ def delete_user_data(
                 detail="User not found"
             )
         
-        # Delete all biometric data
-        templates_deleted = delete_biometric_data(user_id, db)
-        
-        # Delete consent records
-        consent_deleted = db.query(Consent).filter(
-            Consent.user_id == user_id
-        ).delete()
-        
+        # Delete biometric data, payment methods and consents in one transaction
+        deleted = erase_users([user_id], db)
         db.commit()
         
+        templates_deleted = deleted["biometric_templates"]
+        consent_deleted = deleted["consents"]
         logger.info(f"GDPR deletion completed for user {user_id}: {templates_deleted} templates, {consent_deleted} consents")
         
         return {
@@ -186,7 +218,7 @@ def delete_user_data(
 @router.get("/status/{user_id}")
 def get_privacy_status(
     user_id: int,
-    db: Annotated[Session, Depends(get_db)]
+    db: Annotated[Session, Depends(get_read_db)]
 ):
     """
     Get privacy and consent status for a user (GDPR transparency requirement).
@@ -227,12 +259,17 @@ def get_privacy_status(
                 "phone": "✓ (masked)" if user.phone else None
             },
             "retention_policy": {
-                "biometric_data": "Indefinite (until user deletion request)",
-                "transaction_data": "7 years (legal requirement)",
+                "biometric_data": (
+                    f"{settings.biometric_retention_days} days after last use "
+                    f"(or until user deletion request)"
+                ),
+                "biometric_retention_days": settings.biometric_retention_days,
+                "transaction_data": f"{settings.transactions_retention_months} months (legal requirement)",
                 "consent_records": "Indefinite (audit trail)"
             },
             "rights": {
                 "right_to_access": "/privacy/status/{user_id}",
+                "right_to_portability": "/privacy/export/{user_id}",
                 "right_to_erasure": "/privacy/data/{user_id}",
                 "right_to_deletion": "/privacy/data/{user_id}"
             }
@@ -246,3 +283,116 @@ def get_privacy_status(
             detail=f"Failed to retrieve privacy status: {str(e)}"
         )
 
+
+
+def _iso(value: datetime | None) -> str | None:
+    return value.isoformat() if value else None
+
+
+def export_user_records(user_id: int, db: Session) -> Iterator[dict]:
+    """
+    Yield every record held about a user, one at a time.
+    
+    Biometric templates are described (finger, dates, device) but their
+    encrypted contents, hashes and feature vectors are never exported.
+    Collections are read with yield_per so a long transaction history is
+    never loaded at once.
+    
+    Args:
+        user_id: ID of the user to export
+        db: Database session
+        
+    Yields:
+        {"type": ..., "data": {...}} records
+    """
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        return
+    yield {"type": "user", "data": {
+        "id": user.id,
+        "email": user.email,
+        "phone": user.phone,
+        "full_name": user.full_name,
+        "phone_verified": user.phone_verified,
+        "created_at": _iso(user.created_at),
+    }}
+    
+    for consent in db.query(Consent).filter(Consent.user_id == user_id).yield_per(EXPORT_BATCH_SIZE):
+        yield {"type": "consent", "data": {
+            "id": consent.id,
+            "consent_text": consent.consent_text,
+            "accepted_at": _iso(consent.accepted_at),
+        }}
+    
+    for pm in db.query(PaymentMethod).filter(PaymentMethod.user_id == user_id).yield_per(EXPORT_BATCH_SIZE):
+        yield {"type": "payment_method", "data": {
+            "id": pm.id,
+            "brand": pm.brand,
+            "last4": pm.last4,
+            "exp_month": pm.exp_month,
+            "exp_year": pm.exp_year,
+            "is_default": pm.is_default,
+            "created_at": _iso(pm.created_at),
+        }}
+    
+    templates = db.query(BiometricTemplate).filter(BiometricTemplate.user_id == user_id)
+    for template in templates.yield_per(EXPORT_BATCH_SIZE):
+        yield {"type": "biometric_template", "data": {
+            "id": template.id,
+            "finger_label": template.finger_label,
+            "active": template.active,
+            "device_id": template.device_id,
+            "enroll_ip": template.enroll_ip,
+            "created_at": _iso(template.created_at),
+            "last_used_at": _iso(template.last_used_at),
+        }}
+    
+    transactions = db.query(Transaction).filter(Transaction.user_id == user_id).order_by(Transaction.created_at)
+    for txn in transactions.yield_per(EXPORT_BATCH_SIZE):
+        yield {"type": "transaction", "data": {
+            "id": txn.id,
+            "merchant_id": txn.merchant_id,
+            "amount_cents": txn.amount_cents,
+            "protega_fee_cents": txn.protega_fee_cents,
+            "currency": txn.currency,
+            "status": getattr(txn.status, "value", txn.status),
+            "merchant_ref": txn.merchant_ref,
+            "description": txn.description,
+            "created_at": _iso(txn.created_at),
+        }}
+
+
+@router.get("/export/{user_id}")
+def export_user_data(
+    user_id: Annotated[int, Depends(authorize_user_access)],
+    db: Annotated[Session, Depends(get_read_db)]
+):
+    """
+    Export all data held about a user as NDJSON (GDPR/CCPA right of access).
+    
+    Requires the user's own token (biometric login) or the admin key.
+    Unknown users get a 404 before anything is streamed.
+    
+    One JSON record per line: the user, then consents, payment methods,
+    biometric template metadata and transactions. The body is streamed from
+    its own read session, so exports of any size use constant memory.
+    """
+    if not db.query(User.id).filter(User.id == user_id).first():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    
+    def lines():
+        export_db = new_read_session()
+        try:
+            for record in export_user_records(user_id, export_db):
+                yield json.dumps(record) + "\n"
+        finally:
+            export_db.close()
+    
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="protega-user-{user_id}.ndjson"'}
+    )
@@ -13,6 +13,11 @@ class Settings(BaseSettings):
     postgres_db: str = "protega"
     postgres_host: str = "db"
     postgres_port: int = 5432
+    
+    # Read replica (optional) for reporting and admin endpoints
+    database_replica_url: str | None = None
+    replica_max_lag_seconds: float = 5.0  # Fall back to primary when replica lags more than this
+    replica_lag_check_interval_seconds: float = 5.0
 
     # API
     api_port: int = 8000
@@ -20,11 +25,13 @@ class Settings(BaseSettings):
     # Stripe
     stripe_secret_key: str
     stripe_publishable_key: str = ""
+    stripe_api_base: str = ""  # Override the API host, e.g. http://localhost:12111 for stripe-mock
 
     # JWT
     jwt_secret: str
     jwt_expires_min: int = 43200  # 30 days
     jwt_algorithm: str = "HS256"
+    admin_api_key: str = ""  # X-Admin-Key for admin access to user data (empty = disabled)
 
     # CORS
     frontend_url: str = "http://localhost:3000"  # Updated by production env
@@ -36,6 +43,77 @@ class Settings(BaseSettings):
     protega_device_enroll_limit: int = 3  # Per device per 24h
     protega_risk_otp_threshold: int = 30  # Score >= this -> require OTP
     protega_risk_kyc_threshold: int = 60  # Score >= this -> require KYC/manual review
+    velocity_backend: str = "postgres"  # "postgres" (shared) or "memory" (per process)
+    velocity_bucket_seconds: int = 300  # Counter bucket size; bounds window over-count
+    
+    # Transaction partitioning (monthly on created_at)
+    transactions_partition_months_ahead: int = 3
+    transactions_retention_months: int = 84  # 7 years (legal requirement)
+    transaction_list_default_days: int = 90  # Listings without created_after cover this window (partition pruning)
+    
+    # Biometric retention (BIPA: destroy within 3 years of last interaction)
+    biometric_retention_days: int = 1095
+    erasure_chunk_size: int = 500  # Users erased per transaction by the retention job
+    
+    # Pending charges
+    pending_charge_ttl_seconds: int = 30  # In-memory registry entry lifetime (backstop for lost invalidations)
+    pending_charge_registry_size: int = 10000
+    
+    # WebSocket fan-out
+    ws_send_queue_size: int = 100  # Outbound messages buffered per connection
+    ws_slow_consumer_policy: str = "drop_oldest"  # "drop_oldest" or "disconnect" when the queue is full
+    ws_send_timeout_seconds: float = 10.0  # A send slower than this drops the connection
+    ws_reap_interval_seconds: float = 30.0  # How often stale connections are evicted
+    ws_idle_timeout_seconds: float = 0.0  # Evict connections that sent no frame for this long (0 = off)
+    ws_broker_backend: str = "memory"  # "memory" (single worker) or "postgres" (LISTEN/NOTIFY across workers)
+    ws_broker_channel: str = "protega_ws"
+    charge_update_debounce_ms: float = 150.0  # Rapid charge edits within this window broadcast once (0 = off)
+    transaction_event_batch_window_ms: float = 5.0  # Events arriving within this window share one broadcast
+    transaction_event_max_batch: int = 200
+    transaction_event_queue_size: int = 10000
+    sse_buffer_size: int = 500  # Recent events kept per merchant for Last-Event-ID replay
+    sse_keepalive_seconds: float = 15.0  # Comment line sent on idle streams so proxies keep them open
+    sse_retry_ms: int = 3000  # Reconnect delay suggested to EventSource clients
+    
+    # OTP codes and verified phones
+    otp_store_backend: str = "memory"  # "memory" (per process) or "postgres" (shared across workers)
+    otp_ttl_seconds: int = 300
+    otp_verified_ttl_seconds: int = 3600  # How long a verified phone may be used to enroll
+    otp_store_max_entries: int = 100000  # Memory backend cap per table
+    
+    # Proxies in front of the app that append to X-Forwarded-For (Fly's edge: 1);
+    # 0 uses the socket peer. Client IPs are read this many hops from the right.
+    trusted_proxy_hops: int = 1
+
+    # Rate limits (token buckets: burst size, then a steady refill rate)
+    rate_limit_enabled: bool = True
+    rate_limit_backend: str = "memory"  # "memory" (per process) or "postgres" (shared across workers)
+    rate_limit_max_keys: int = 100000  # Memory backend bucket cap
+    rate_limit_pay_per_minute: float = 60.0  # Per terminal API key
+    rate_limit_pay_burst: int = 20
+    rate_limit_identify_per_minute: float = 30.0  # Per client IP
+    rate_limit_identify_burst: int = 10
+    rate_limit_otp_phone_per_hour: float = 5.0  # Per phone number
+    rate_limit_otp_phone_burst: int = 3
+    rate_limit_otp_ip_per_hour: float = 30.0  # Per client IP
+    rate_limit_otp_ip_burst: int = 10
+    
+    # SMS dispatch (OTP sends are queued and sent by background workers)
+    sms_concurrency: int = 4  # Concurrent Twilio calls per process
+    sms_max_attempts: int = 3
+    sms_retry_backoff_seconds: float = 1.0  # Doubles after each failed attempt
+    sms_dedupe_seconds: float = 30.0  # Resends to the same phone within this window reuse the pending code
+    sms_queue_size: int = 1000
+    sms_delivery_history_size: int = 10000  # Delivery statuses kept for polling
+    
+    # Decode synthetic population samples (sdk/synthetic.py) to their feature vectors.
+    # Benchmarks and the simulated driver only: never enable in production.
+    synthetic_samples_enabled: bool = False
+    
+    # Prometheus metrics (GET /metrics)
+    metrics_enabled: bool = True  # In production only served once metrics_token is set
+    metrics_token: str = ""  # If set, scrapes must send "Authorization: Bearer <token>"
+    fraud_scanner_metrics_port: int = 0  # Standalone fraud scanner serves /metrics on this port (0 = off)
     
     # Twilio (for OTP)
     twilio_account_sid: str = ""
@@ -57,12 +135,7 @@ class Settings(BaseSettings):
         """
         if self.database_url:
             # Railway/Production provides DATABASE_URL
-            # Convert postgres:// to postgresql+psycopg:// if needed
-            if self.database_url.startswith("postgres://"):
-                return self.database_url.replace("postgres://", "postgresql+psycopg://", 1)
-            elif self.database_url.startswith("postgresql://"):
-                return self.database_url.replace("postgresql://", "postgresql+psycopg://", 1)
-            return self.database_url
+            return self._with_psycopg_driver(self.database_url)
         
         # Local development
         return (
@@ -70,6 +143,26 @@ class Settings(BaseSettings):
             f"@{self.postgres_host}:{self.postgres_port}/{self.postgres_db}"
         )
 
+    def get_replica_database_url(self) -> str | None:
+        """
+        Get read replica connection URL, if a replica is configured.
+        
+        Returns:
+            Replica URL using the psycopg driver, or None
+        """
+        if not self.database_replica_url:
+            return None
+        return self._with_psycopg_driver(self.database_replica_url)
+
+    @staticmethod
+    def _with_psycopg_driver(url: str) -> str:
+        """Convert postgres:// or postgresql:// URLs to postgresql+psycopg://."""
+        if url.startswith("postgres://"):
+            return url.replace("postgres://", "postgresql+psycopg://", 1)
+        elif url.startswith("postgresql://"):
+            return url.replace("postgresql://", "postgresql+psycopg://", 1)
+        return url
+
     @property
     def is_development(self) -> bool:
         """Check if running in development mode."""
@@ -79,6 +172,11 @@ class Settings(BaseSettings):
     def is_production(self) -> bool:
         """Check if running in production mode."""
         return self.env == "production"
+    
+    @property
+    def metrics_endpoint_enabled(self) -> bool:
+        """Whether /metrics is served: never without a token in production."""
+        return self.metrics_enabled and (bool(self.metrics_token) or not self.is_production)
 
 
 settings = Settings()
@@ -1,18 +1,22 @@
 """Database connection and session management."""
 
 import logging
+import threading
+import time
 from typing import Generator
 
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import declarative_base, sessionmaker, Session
 
 from protega_api.config import settings
+from protega_api.metrics import timed_pool_class
 
 logger = logging.getLogger(__name__)
 
 # Create database engine
 engine = create_engine(
     settings.get_database_url(),  # Supports both local and Railway DATABASE_URL
+    poolclass=timed_pool_class("primary"),  # Records checkout wait for /metrics
     pool_pre_ping=True,
     pool_size=5,
     max_overflow=10,
@@ -22,6 +26,34 @@ engine = create_engine(
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Optional read replica for reporting/admin reads (falls back to primary)
+_replica_url = settings.get_replica_database_url()
+read_engine = create_engine(
+    _replica_url,
+    poolclass=timed_pool_class("replica"),
+    pool_pre_ping=True,
+    pool_size=5,
+    max_overflow=10,
+    echo=settings.is_development,
+) if _replica_url else None
+
+ReadSessionLocal = (
+    sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+    if read_engine is not None else None
+)
+
+# Cached replica health: (checked_at_monotonic, usable)
+_replica_state = {"checked_at": 0.0, "usable": False}
+_replica_lock = threading.Lock()
+
+_REPLICA_LAG_SQL = text(
+    "SELECT CASE "
+    "WHEN NOT pg_is_in_recovery() THEN 0 "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) "
+    "END"
+)
+
 # Create declarative base for models
 Base = declarative_base()
 
@@ -40,6 +72,75 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+def replica_is_usable() -> bool:
+    """
+    Check whether the read replica is reachable and within the staleness tolerance.
+    
+    The lag probe is cached for `replica_lag_check_interval_seconds`, so at most
+    one probe query runs per interval per process.
+    
+    Returns:
+        True if reads may be routed to the replica, False otherwise
+    """
+    if read_engine is None:
+        return False
+    
+    now = time.monotonic()
+    if now - _replica_state["checked_at"] < settings.replica_lag_check_interval_seconds:
+        return _replica_state["usable"]
+    
+    with _replica_lock:
+        # Another thread may have refreshed the state while we waited
+        if now - _replica_state["checked_at"] < settings.replica_lag_check_interval_seconds:
+            return _replica_state["usable"]
+        
+        try:
+            with read_engine.connect() as conn:
+                lag_seconds = float(conn.execute(_REPLICA_LAG_SQL).scalar() or 0)
+            usable = lag_seconds <= settings.replica_max_lag_seconds
+            if not usable:
+                logger.warning(f"Read replica lag {lag_seconds:.1f}s exceeds tolerance, using primary")
+        except Exception as e:
+            logger.error(f"Read replica health check failed: {e}")
+            usable = False
+        
+        _replica_state["checked_at"] = time.monotonic()
+        _replica_state["usable"] = usable
+        return usable
+
+
+def new_read_session() -> Session:
+    """
+    Open a session for read-only work.
+    
+    Uses the read replica when configured and fresh enough, otherwise the primary.
+    The caller is responsible for closing the session.
+    
+    Returns:
+        Database session
+    """
+    if ReadSessionLocal is not None and replica_is_usable():
+        return ReadSessionLocal()
+    return SessionLocal()
+
+
+def get_read_db() -> Generator[Session, None, None]:
+    """
+    Dependency that provides a session for read-only endpoints.
+    
+    Reporting and admin listings use this so they do not compete with the
+    payment path for primary connections. Never use it for writes.
+    
+    Yields:
+        Database session (replica when available, primary otherwise)
+    """
+    db = new_read_session()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
 def check_db_connection() -> bool:
     """
     Check if database connection is healthy.
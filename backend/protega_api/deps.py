@@ -1,17 +1,23 @@
 """FastAPI dependencies."""
 
-from typing import Annotated
+import hmac
+import logging
+from typing import Annotated, Optional
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy.orm import Session
 
-from protega_api.db import get_db
+from protega_api.config import settings
+from protega_api.db import get_db, get_read_db
 from protega_api.models import Merchant
 from protega_api.security import verify_jwt
 
+logger = logging.getLogger(__name__)
+
 # Security scheme for Bearer token
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 
 def get_current_merchant(
@@ -79,3 +85,39 @@ def get_current_merchant(
     logger.info(f"Merchant authenticated: {merchant.id} ({merchant.name})")
     return merchant
 
+
+
+def authorize_user_access(
+    user_id: int,
+    credentials: Annotated[Optional[HTTPAuthorizationCredentials], Depends(optional_security)],
+    x_admin_key: Annotated[Optional[str], Header()] = None,
+) -> int:
+    """
+    Dependency allowing access to a user's own data (path parameter user_id).
+    
+    Accepts the user's token from biometric login for that same user, or the
+    admin key (X-Admin-Key, when ADMIN_API_KEY is configured).
+    
+    Returns:
+        The authorized user ID
+        
+    Raises:
+        HTTPException: 401 without valid credentials, 403 for another user's data
+    """
+    if settings.admin_api_key and x_admin_key and hmac.compare_digest(x_admin_key, settings.admin_api_key):
+        logger.info(f"Admin access to data of user {user_id}")
+        return user_id
+    
+    payload = verify_jwt(credentials.credentials) if credentials else None
+    if not payload or payload.get("typ") != "user":
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if payload.get("sub") != str(user_id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not allowed to access this user's data",
+        )
+    return user_id
@@ -0,0 +1,132 @@
+"""
+In-process transaction event bus.
+
+The payment endpoints are sync handlers running in the threadpool, so they
+cannot await WebSocket broadcasts. They publish here instead:
+`publish()` hands the event to the event loop with call_soon_threadsafe and
+returns immediately. A single drain task collects events that arrive within
+a short window and broadcasts them per merchant, so a burst of payments
+costs one broker publish per merchant rather than one per transaction.
+"""
+
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from protega_api.config import settings
+from protega_api.schemas import RealTimeTransactionEvent
+
+logger = logging.getLogger(__name__)
+
+
+class TransactionEventBus:
+    """
+    Thread-safe, non-blocking publisher drained by an asyncio task.
+
+    Events published before start() (or after stop()) are dropped: real-time
+    updates are best effort and the transaction itself is already committed.
+    """
+
+    def __init__(self, batch_window_seconds: float, max_batch: int, max_pending: int):
+        self.batch_window_seconds = batch_window_seconds
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Bind to the running loop and start draining."""
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._task = asyncio.create_task(self._drain())
+
+    async def stop(self) -> None:
+        """Stop draining; queued events are discarded."""
+        self._loop = None
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def publish(self, event: dict) -> bool:
+        """
+        Queue an event from any thread without blocking.
+
+        Returns:
+            False if the bus is not running
+        """
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return False
+        try:
+            loop.call_soon_threadsafe(self._enqueue, event)
+        except RuntimeError:
+            return False  # Loop closed between the check and the call
+        return True
+
+    def _enqueue(self, event: dict) -> None:
+        # Runs on the event loop thread
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            logger.warning("Transaction event queue full; dropping event")
+
+    async def _drain(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_window_seconds
+            while len(batch) < self.max_batch:
+                # Take whatever is already queued, then wait out the window
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._deliver(batch)
+            except Exception as e:
+                logger.error(f"Failed to deliver {len(batch)} transaction events: {e}")
+
+    async def _deliver(self, batch: List[dict]) -> None:
+        from protega_api.routers.websocket import broadcast_merchant_events
+
+        by_merchant: Dict[int, List[dict]] = defaultdict(list)
+        for event in batch:
+            by_merchant[event["merchant_id"]].append(event)
+        for merchant_id, events in by_merchant.items():
+            await broadcast_merchant_events(merchant_id, events)
+
+
+# Global event bus (started in the application lifespan)
+transaction_events = TransactionEventBus(
+    batch_window_seconds=settings.transaction_event_batch_window_ms / 1000,
+    max_batch=settings.transaction_event_max_batch,
+    max_pending=settings.transaction_event_queue_size,
+)
+
+
+def publish_transaction_created(transaction) -> None:
+    """Publish a transaction_created event for a committed transaction (never blocks or raises)."""
+    try:
+        event = RealTimeTransactionEvent(
+            event_type="transaction_created",
+            transaction_id=transaction.id,
+            amount_cents=transaction.amount_cents,
+            merchant_id=transaction.merchant_id,
+            timestamp=datetime.utcnow(),
+        )
+        transaction_events.publish(event.model_dump(mode="json"))
+    except Exception as e:
+        logger.error(f"Failed to publish transaction event: {e}")
@@ -6,9 +6,15 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from protega_api.broker import broker
 from protega_api.config import settings
 from protega_api.db import check_db_connection
-from protega_api.routers import enroll, health, merchant, pay, payment_methods, websocket, customers, auth, charges
+from protega_api.events import transaction_events
+from protega_api.metrics import MetricsMiddleware
+from protega_api.pagination import NEXT_CURSOR_HEADER
+from protega_api.rate_limit import RateLimitMiddleware
+from protega_api.routers import enroll, health, merchant, pay, payment_methods, websocket, customers, auth, charges, sse
+from protega_api.routers import metrics
 from protega_api import otp
 from protega_api.routers import admin
 from protega_api import compliance
@@ -32,9 +38,19 @@ async def lifespan(app: FastAPI):
     if not check_db_connection():
         logger.error("Failed to connect to database!")
     
+    # Cross-worker WebSocket broadcasts
+    await broker.start(websocket.deliver_local)
+    await transaction_events.start()
+    websocket.manager.start_reaper(settings.ws_reap_interval_seconds, settings.ws_idle_timeout_seconds)
+    await otp.sms_dispatcher.start()
+    
     yield
     
     # Shutdown
+    await otp.sms_dispatcher.stop()
+    await websocket.manager.stop_reaper()
+    await transaction_events.stop()
+    await broker.stop()
     logger.info("👋 Shutting down Protega CloudPay API")
 
 
@@ -72,6 +88,16 @@ def check_origin(origin: str) -> bool:
         return True
     return False
 
+# Rate limits run inside CORS so browsers can read the 429
+if settings.rate_limit_enabled:
+    app.add_middleware(RateLimitMiddleware)
+
+# Outside the rate limiter so rejected requests are timed too
+if settings.metrics_endpoint_enabled:
+    app.add_middleware(MetricsMiddleware)
+elif settings.metrics_enabled:
+    logger.warning("METRICS_TOKEN is not set; /metrics is disabled in production")
+
 app.add_middleware(
     CORSMiddleware,
     allow_origin_regex=r"https://.*\.vercel\.app",  # Allow all Vercel deployments
@@ -79,6 +105,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],  # Paginated admin listings
 )
 
 # Include routers
@@ -91,9 +118,12 @@ app.include_router(charges.router)
 app.include_router(payment_methods.router, tags=["payment-methods"])
 app.include_router(customers.router)
 app.include_router(websocket.router)
+app.include_router(sse.router)
 app.include_router(otp.router)
 app.include_router(admin.router)
 app.include_router(compliance.router)  # Privacy and compliance endpoints
+if settings.metrics_endpoint_enabled:
+    app.include_router(metrics.router)
 
 
 @app.get("/")
@@ -0,0 +1,225 @@
+"""
+Prometheus metrics.
+
+Exposed at GET /metrics (see routers/metrics.py). Every label has a fixed,
+small set of values so the number of series cannot grow with traffic:
+
+- route: the matched route template ("/customer/charge/{charge_id}"),
+  never the raw path; requests matching no route share "unmatched"
+  (rate-limited requests, rejected before routing, use their policy path)
+- method: standard HTTP methods, anything else is "OTHER"
+- stage, operation, pool: enumerated in this module
+
+Metrics are per process, like /ws/stats: with several workers, scrape each
+one.
+"""
+
+import time
+from typing import Optional
+
+from prometheus_client import REGISTRY, Gauge, Histogram
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy.pool import QueuePool
+
+# Seconds; the tail covers full-table PBKDF2 matching on large populations
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+CANDIDATE_BUCKETS = (1, 10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+HTTP_METHODS = {"GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS"}
+UNMATCHED_ROUTE = "unmatched"
+
+PAY_STAGES = ("terminal_auth", "normalize", "match", "pm_lookup", "stripe_charge", "commit")
+MATCH_OPERATIONS = ("pay", "identify", "enroll_dedupe", "fraud_scan")
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "protega_http_request_duration_seconds",
+    "Time from request start until response headers are sent, by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+PAY_STAGE_SECONDS = Histogram(
+    "protega_pay_stage_duration_seconds",
+    "Time spent in each stage of POST /pay",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "protega_db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the SQLAlchemy pool",
+    ["pool"],
+    buckets=POOL_WAIT_BUCKETS,
+)
+
+MATCHER_CANDIDATES = Histogram(
+    "protega_matcher_candidates",
+    "Templates compared against a probe per match operation",
+    ["operation"],
+    buckets=CANDIDATE_BUCKETS,
+)
+
+FRAUD_SCAN_SECONDS = Histogram(
+    "protega_fraud_scan_duration_seconds",
+    "Duration of background fraud scans",
+    ["result"],
+    buckets=LATENCY_BUCKETS + (300.0, 900.0, 3600.0),
+)
+
+FRAUD_SCAN_TEMPLATES = Gauge(
+    "protega_fraud_scan_templates",
+    "Templates loaded by the most recent fraud scan",
+)
+
+# Export every known series from the first scrape, not only after first use
+for _stage in PAY_STAGES:
+    PAY_STAGE_SECONDS.labels(stage=_stage)
+for _operation in MATCH_OPERATIONS:
+    MATCHER_CANDIDATES.labels(operation=_operation)
+
+
+class PayStageTimer:
+    """
+    Records consecutive stages of one payment.
+
+    Each lap() observes the time since the previous lap (or creation) under
+    the given stage, so early returns record only the stages they reached.
+    """
+
+    def __init__(self):
+        self._last = time.perf_counter()
+
+    def lap(self, stage: str) -> None:
+        now = time.perf_counter()
+        PAY_STAGE_SECONDS.labels(stage=stage).observe(now - self._last)
+        self._last = now
+
+
+def observe_candidates(operation: str, count: int) -> None:
+    """Record how many templates a match operation had to consider."""
+    MATCHER_CANDIDATES.labels(operation=operation).observe(count)
+
+
+def timed_pool_class(name: str):
+    """
+    QueuePool subclass recording checkout wait under pool=`name`.
+
+    Pass as create_engine(poolclass=...); waits include time blocked on an
+    exhausted pool and failed checkouts (pool timeouts).
+    """
+
+    class TimedQueuePool(QueuePool):
+        def _do_get(self):
+            started = time.perf_counter()
+            try:
+                return super()._do_get()
+            finally:
+                DB_POOL_CHECKOUT_SECONDS.labels(pool=name).observe(time.perf_counter() - started)
+
+    TimedQueuePool.__name__ = f"TimedQueuePool[{name}]"
+    return TimedQueuePool
+
+
+class RuntimeCollector:
+    """
+    Gauges read at scrape time: database pool usage and WebSocket connections.
+
+    Imports are deferred to scrape time so this module can be imported by
+    db.py.
+    """
+
+    @staticmethod
+    def _families() -> dict:
+        return {
+            "pool_size": GaugeMetricFamily("protega_db_pool_size", "Configured pool size", labels=["pool"]),
+            "pool_checked_out": GaugeMetricFamily(
+                "protega_db_pool_checked_out", "Connections currently checked out", labels=["pool"]
+            ),
+            "pool_overflow": GaugeMetricFamily(
+                "protega_db_pool_overflow", "Connections open beyond the pool size", labels=["pool"]
+            ),
+            "ws_connections": GaugeMetricFamily(
+                "protega_ws_connections", "Open WebSocket connections on this worker", labels=["kind"]
+            ),
+            "ws_merchants": GaugeMetricFamily("protega_ws_subscribed_merchants", "Merchants with an open socket"),
+            "ws_charges": GaugeMetricFamily("protega_ws_subscribed_charges", "Charges with an open socket"),
+            "ws_queued": GaugeMetricFamily("protega_ws_queued_messages", "Outbound messages queued across sockets"),
+        }
+
+    def describe(self):
+        # Lets the registry learn the names without calling collect() at import
+        return list(self._families().values())
+
+    def collect(self):
+        from protega_api.db import engine, read_engine
+        from protega_api.routers.websocket import manager
+
+        families = self._families()
+        for name, db_engine in (("primary", engine), ("replica", read_engine)):
+            pool = getattr(db_engine, "pool", None)
+            if not isinstance(pool, QueuePool):
+                continue
+            families["pool_size"].add_metric([name], pool.size())
+            families["pool_checked_out"].add_metric([name], pool.checkedout())
+            families["pool_overflow"].add_metric([name], max(0, pool.overflow()))
+
+        stats = manager.stats()
+        families["ws_connections"].add_metric(["merchant"], stats["merchant_connections"])
+        families["ws_connections"].add_metric(["charge"], stats["charge_connections"])
+        families["ws_merchants"].add_metric([], stats["merchants"])
+        families["ws_charges"].add_metric([], stats["charges"])
+        families["ws_queued"].add_metric([], stats["queued_messages"])
+        return list(families.values())
+
+
+REGISTRY.register(RuntimeCollector())
+
+
+def _route_template(scope) -> str:
+    """Template of the route that handled the request."""
+    route = scope.get("route")
+    if route is None and scope.get("rate_limited"):
+        # Rejected before routing; rate limit policies are keyed by exact route paths
+        return scope["path"]
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware observing request latency per route template.
+
+    Latency ends when the response headers are sent: the full handler time
+    for ordinary endpoints, time-to-open for streaming ones (SSE), which
+    would otherwise be recorded as their whole connection time.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        observed = False
+
+        def observe(status: Optional[int]) -> None:
+            nonlocal observed
+            observed = True
+            method = scope["method"] if scope["method"] in HTTP_METHODS else "OTHER"
+            HTTP_REQUEST_SECONDS.labels(
+                method=method, route=_route_template(scope), status=str(status or 500)
+            ).observe(time.perf_counter() - started)
+
+        async def send_with_metrics(message):
+            if message["type"] == "http.response.start" and not observed:
+                observe(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            if not observed:
+                observe(None)  # Raised (or disconnected) before responding
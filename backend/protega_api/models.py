@@ -4,8 +4,10 @@ from datetime import datetime
 from enum import Enum as PyEnum
 
 from sqlalchemy import (
+    BigInteger,
     Boolean,
     Column,
+    Date,
     DateTime,
     Enum,
     Float,
@@ -196,7 +198,13 @@ class PaymentMethod(Base):
 
 
 class Transaction(Base):
-    """Payment transaction record."""
+    """
+    Payment transaction record.
+    
+    The table is range partitioned by month on created_at (migration 013), so
+    the database primary key is (id, created_at). Filter on created_at
+    wherever possible so queries only touch the relevant partitions.
+    """
     
     __tablename__ = "transactions"
 
@@ -211,6 +219,7 @@ class Transaction(Base):
     merchant_ref = Column(String(255))  # Optional merchant reference
     description = Column(String(500))  # Transaction description
     metadata = Column(JSON, nullable=True)  # Flexible metadata for additional data
+    charge_id = Column(String(64), nullable=True)  # Pending charge lookup key
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
 
     # Relationships
@@ -219,6 +228,27 @@ class Transaction(Base):
 
     __table_args__ = (
         Index("idx_merchant_transactions", "merchant_id", "created_at"),
+        Index("ix_transactions_charge_id", "charge_id", "created_at", unique=True),
+    )
+
+
+class TransactionCharge(Base):
+    """
+    Global key of a charge: charge_id -> (transaction id, created_at).
+    
+    Unique indexes on the partitioned transactions table must include
+    created_at, so this unpartitioned table is what keeps charge_id unique.
+    Lookups read created_at here first so the transaction query touches a
+    single partition (see charge_registry.find_pending_transaction).
+    """
+    __tablename__ = "transaction_charges"
+    
+    charge_id = Column(String(64), primary_key=True)
+    transaction_id = Column(Integer, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    
+    __table_args__ = (
+        Index("idx_transaction_charges_created_at", "created_at"),  # Cleanup of detached partitions
     )
 
 
@@ -241,7 +271,7 @@ class FlaggedEnroll(Base):
     resolved_at = Column(DateTime, nullable=True)
     
     __table_args__ = (
-        Index("idx_unresolved_flags", "resolved", "created_at"),
+        Index("idx_unresolved_flags", "resolved", "created_at", "id"),  # Keyset pages
         Index("idx_risk_score", "risk_score", "created_at"),
     )
 
@@ -280,6 +310,116 @@ class FraudAlert(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
     
     __table_args__ = (
-        Index("idx_pending_alerts", "status", "created_at"),
+        Index("idx_pending_alerts", "status", "created_at", "id"),  # Keyset pages
         Index("idx_user_alerts", "user_id", "created_at"),
     )
+
+
+class MerchantCustomer(Base):
+    """
+    Per-merchant customer rollup.
+    
+    One row per (merchant, customer) pair, maintained incrementally whenever a
+    transaction is recorded (see protega_api.rollups) so the merchant customer
+    list can be served without scanning the transactions table.
+    """
+    __tablename__ = "merchant_customers"
+    
+    merchant_id = Column(Integer, ForeignKey("merchants.id"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    txn_count = Column(Integer, default=0, nullable=False)
+    total_spent_cents = Column(Integer, default=0, nullable=False)  # Succeeded transactions only
+    first_seen = Column(DateTime, nullable=False)
+    last_seen = Column(DateTime, nullable=False)
+    
+    # Relationships
+    user = relationship("User")
+    
+    __table_args__ = (
+        Index("idx_merchant_customers_last_seen", "merchant_id", "last_seen"),
+    )
+
+
+class MerchantDailyStats(Base):
+    """
+    Per-merchant daily revenue rollup, one row per (merchant, day, status).
+    
+    Maintained incrementally when transactions are recorded (see
+    protega_api.rollups) and repairable from source with
+    protega_api.tasks.rollup_repair.
+    """
+    __tablename__ = "merchant_daily_stats"
+    
+    merchant_id = Column(Integer, ForeignKey("merchants.id"), primary_key=True)
+    day = Column(Date, primary_key=True)  # UTC day of transaction created_at
+    status = Column(String(50), primary_key=True)  # Lowercase transaction status
+    txn_count = Column(Integer, default=0, nullable=False)
+    amount_cents = Column(BigInteger, default=0, nullable=False)
+    protega_fee_cents = Column(BigInteger, default=0, nullable=False)
+
+
+class VelocityCounter(Base):
+    """
+    Shared time-bucketed event counts for enrollment velocity limits.
+    
+    Used by the default VELOCITY_BACKEND=postgres (see
+    protega_api.velocity). Keys are SHA-256 hashes of the raw value.
+    """
+    __tablename__ = "velocity_counters"
+    
+    kind = Column(String(32), primary_key=True)  # device_id, enroll_ip, card_fingerprint, phone
+    key_hash = Column(String(64), primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)  # UTC start of the bucket
+    count = Column(Integer, default=0, nullable=False)
+    
+    __table_args__ = (
+        Index("idx_velocity_counters_bucket_start", "bucket_start"),
+    )
+
+
+class OtpCode(Base):
+    """
+    Pending phone verification code (one per phone).
+    
+    Only used when OTP_STORE_BACKEND=postgres (see protega_api.otp_store).
+    """
+    __tablename__ = "otp_codes"
+    
+    phone = Column(String(32), primary_key=True)
+    code = Column(String(16), nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    
+    __table_args__ = (
+        Index("idx_otp_codes_expires_at", "expires_at"),
+    )
+
+
+class VerifiedPhone(Base):
+    """Phone verified by OTP, valid until expires_at (OTP_STORE_BACKEND=postgres)."""
+    __tablename__ = "verified_phones"
+    
+    phone = Column(String(32), primary_key=True)
+    expires_at = Column(DateTime, nullable=False)
+    
+    __table_args__ = (
+        Index("idx_verified_phones_expires_at", "expires_at"),
+    )
+
+
+class RateLimitBucket(Base):
+    """
+    Shared token bucket for request rate limits.
+    
+    Only used when RATE_LIMIT_BACKEND=postgres (see protega_api.rate_limit).
+    Keys are "<limit name>:<sha256 of terminal key, phone or IP>".
+    """
+    __tablename__ = "rate_limit_buckets"
+    
+    key = Column(String(128), primary_key=True)
+    tokens = Column(Float, nullable=False)
+    allowed = Column(Boolean, nullable=False, default=True)  # Outcome of the latest check
+    updated_at = Column(DateTime, nullable=False)  # UTC
+    
+    __table_args__ = (
+        Index("idx_rate_limit_buckets_updated_at", "updated_at"),
+    )
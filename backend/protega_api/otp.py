@@ -4,12 +4,12 @@ OTP (One-Time Password) utility for phone verification.
 Sends OTP via Twilio SMS and provides verification endpoint.
 """
 
+import asyncio
 import logging
 import os
 import random
-import time
 from datetime import datetime
-from typing import Annotated, Dict, Optional
+from typing import Annotated, Optional, Tuple
 
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.orm import Session
@@ -17,6 +17,8 @@ from sqlalchemy.orm import Session
 from protega_api.config import settings
 from protega_api.db import get_db
 from protega_api.models import FlaggedEnroll, User, BiometricTemplate, ProtegaIdentity
+from protega_api.otp_store import OtpCheck, get_otp_store
+from protega_api.sms import SmsDelivery, SmsQueueFull, create_dispatcher
 
 logger = logging.getLogger(__name__)
 
@@ -36,77 +38,104 @@ except ImportError:
     twilio_client = None
     TW_FROM = None
 
-# In-memory OTP store for dev
-# In production, store in Redis or database with TTL
-OTP_STORE: Dict[str, tuple[str, int]] = {}  # {phone: (code, expires_at_timestamp)}
-VERIFIED_PHONES: Dict[str, bool] = {}  # {phone: True} - Track verified phones temporarily
-
 router = APIRouter(prefix="/otp", tags=["otp"])
 
 
-def send_otp(phone: str) -> str:
+def deliver_sms(phone: str, body: str) -> None:
     """
-    Send OTP to phone number.
+    Send one SMS (blocking). Runs on the dispatcher's worker threads.
     
-    Args:
-        phone: Phone number in E.164 format (e.g., +1234567890)
-        
-    Returns:
-        OTP code (for dev purposes)
+    Without Twilio credentials the message is printed to the console.
     """
-    code = f"{random.randint(100000, 999999)}"
-    expires = int(time.time()) + 300  # 5 minutes
-    
-    OTP_STORE[phone] = (code, expires)
-    
     if twilio_client and TW_FROM:
-        try:
-            twilio_client.messages.create(
-                body=f"Your Protega verification code is: {code}. Valid for 5 minutes.",
-                from_=TW_FROM,
-                to=phone
-            )
-            logger.info(f"OTP sent to {phone} via Twilio")
-        except Exception as e:
-            logger.error(f"Failed to send OTP via Twilio: {e}")
-            raise HTTPException(status_code=500, detail="Failed to send SMS")
+        twilio_client.messages.create(body=body, from_=TW_FROM, to=phone)
+        logger.info(f"OTP sent to {phone} via Twilio")
     else:
         # Development mode - print to console
-        logger.info(f"[DEV OTP] {phone} -> {code}")
+        logger.info(f"[DEV OTP] {phone}: {body}")
         print(f"\n{'='*60}")
-        print(f"OTP CODE: {code}")
+        print(body)
         print(f"Phone: {phone}")
-        print(f"Valid for 5 minutes")
         print(f"{'='*60}\n")
+
+
+# SMS dispatcher (started in the application lifespan)
+sms_dispatcher = create_dispatcher(deliver_sms)
+
+
+async def send_otp(phone: str) -> Tuple[Optional[str], SmsDelivery]:
+    """
+    Generate an OTP and queue it for delivery.
+    
+    A resend within SMS_DEDUPE_SECONDS of a pending or sent code returns
+    that delivery and keeps the existing code.
     
-    return code
+    Args:
+        phone: Phone number in E.164 format (e.g., +1234567890)
+        
+    Returns:
+        (code, delivery): code is None when an earlier delivery was reused
+    """
+    recent = sms_dispatcher.recent(phone)
+    if recent is not None:
+        logger.info(f"OTP for {phone} already sent recently; reusing delivery {recent.id}")
+        return None, recent
+    
+    code = f"{random.randint(100000, 999999)}"
+    # The store may be Postgres; keep the blocking write off the event loop
+    await asyncio.to_thread(get_otp_store().put_code, phone, code, settings.otp_ttl_seconds)
+    
+    minutes = max(1, settings.otp_ttl_seconds // 60)
+    body = f"Your Protega verification code is: {code}. Valid for {minutes} minutes."
+    try:
+        delivery = sms_dispatcher.submit(phone, body)
+    except SmsQueueFull as e:
+        logger.error(f"Failed to queue OTP for {phone}: {e}")
+        raise HTTPException(status_code=503, detail="SMS service busy. Please try again shortly.")
+    return code, delivery
 
 
-@router.post("/send")
+@router.post("/send", status_code=202)
 async def send_otp_endpoint(data: dict):
     """
-    Send OTP code to phone number for verification.
+    Queue an OTP code for the phone number and return immediately.
     
     Args:
         data: JSON body with 'phone'
         
     Returns:
-        Success message
+        Delivery handle; poll /otp/deliveries/{delivery_id} for its status
     """
     phone = data.get("phone")
     
     if not phone:
         raise HTTPException(status_code=400, detail="phone is required")
     
-    # Send OTP
-    code = send_otp(phone)
+    code, delivery = await send_otp(phone)
     
-    return {
-        "status": "sent",
-        "message": f"Verification code sent to {phone}",
+    response = {
+        "status": delivery.status,
+        "message": f"Verification code queued for {phone}",
         "phone": phone,
-        "code_preview": f"***{code[-2:]}" if twilio_client else code  # Only show in dev
+        "delivery_id": delivery.id,
+        "deduplicated": code is None,
     }
+    if code and not twilio_client:
+        response["code_preview"] = code  # Only show in dev
+    return response
+
+
+@router.get("/deliveries/{delivery_id}")
+async def get_delivery_status(delivery_id: str):
+    """
+    Status of a queued OTP SMS (queued, sending, sent or failed).
+    
+    Deliveries are tracked by the worker that accepted them.
+    """
+    delivery = sms_dispatcher.get(delivery_id)
+    if delivery is None:
+        raise HTTPException(status_code=404, detail="Delivery not found")
+    return delivery.to_dict()
 
 
 @router.post("/verify")
@@ -126,25 +155,17 @@ async def verify_otp(data: dict, db: Annotated[Session, Depends(get_db)]):
     if not phone or not code:
         raise HTTPException(status_code=400, detail="phone and code are required")
     
-    rec = OTP_STORE.get(phone)
-    if not rec:
+    # Consume the code and mark the phone verified (atomic across workers; off the event loop)
+    check = await asyncio.to_thread(
+        get_otp_store().consume_code, phone, code, settings.otp_verified_ttl_seconds
+    )
+    if check == OtpCheck.MISSING:
         raise HTTPException(status_code=400, detail="No OTP requested for this phone number")
-    
-    real_code, expires = rec
-    
-    # Check if expired
-    if int(time.time()) > expires:
-        del OTP_STORE[phone]
+    if check == OtpCheck.EXPIRED:
         raise HTTPException(status_code=400, detail="OTP expired. Please request a new one.")
-    
-    # Verify code
-    if code != real_code:
+    if check == OtpCheck.INVALID:
         raise HTTPException(status_code=400, detail="Invalid OTP code")
     
-    # OTP verified - remove from store and mark as verified
-    del OTP_STORE[phone]
-    VERIFIED_PHONES[phone] = True
-    
     # Find flagged enrollment(s) for this phone pending OTP
     flagged = db.query(FlaggedEnroll).filter(
         FlaggedEnroll.phone == phone,
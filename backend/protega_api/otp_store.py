@@ -0,0 +1,227 @@
+"""
+Expiring storage for OTP codes and recently verified phones.
+
+`/otp/send` and `/enroll` may be served by different workers, so the codes
+they share must live somewhere both can see.
+
+Backends:
+- memory: per-process, TTL-swept and size-capped (default, single worker)
+- postgres: otp_codes / verified_phones tables, shared across workers
+
+Verification is atomic: a code can be consumed at most once, even when two
+requests race with it.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from enum import Enum as PyEnum
+from typing import Optional, Protocol
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+
+from protega_api.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class OtpCheck(str, PyEnum):
+    """Outcome of consuming an OTP code."""
+    VERIFIED = "verified"
+    MISSING = "missing"
+    EXPIRED = "expired"
+    INVALID = "invalid"
+
+
+class OtpStore(Protocol):
+    """Storage for pending codes and verified phones."""
+
+    def put_code(self, phone: str, code: str, ttl_seconds: int) -> None:
+        """Store (or replace) the pending code for a phone."""
+        ...
+
+    def consume_code(self, phone: str, code: str, verified_ttl_seconds: int) -> OtpCheck:
+        """Check a code; on success delete it and mark the phone verified."""
+        ...
+
+    def is_verified(self, phone: str) -> bool:
+        """Whether the phone was verified within its verified TTL."""
+        ...
+
+
+class InMemoryOtpStore:
+    """
+    Per-process OTP store.
+
+    Expired entries are swept at most every `sweep_interval_seconds` (on
+    access, no background thread) and the oldest entries are evicted beyond
+    `max_entries` per table.
+    """
+
+    def __init__(self, max_entries: int, sweep_interval_seconds: float = 60.0):
+        self.max_entries = max_entries
+        self.sweep_interval_seconds = sweep_interval_seconds
+        self._codes: "OrderedDict[str, tuple[str, float]]" = OrderedDict()  # phone -> (code, expires_at)
+        self._verified: "OrderedDict[str, float]" = OrderedDict()  # phone -> expires_at
+        self._next_sweep = 0.0
+        self._lock = threading.Lock()
+
+    def _sweep(self, now: float) -> None:
+        # Caller holds the lock
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + self.sweep_interval_seconds
+        for phone in [p for p, (_, expires_at) in self._codes.items() if expires_at <= now]:
+            del self._codes[phone]
+        for phone in [p for p, expires_at in self._verified.items() if expires_at <= now]:
+            del self._verified[phone]
+
+    def _cap(self, entries: OrderedDict) -> None:
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    def put_code(self, phone: str, code: str, ttl_seconds: int) -> None:
+        now = time.time()
+        with self._lock:
+            self._sweep(now)
+            self._codes[phone] = (code, now + ttl_seconds)
+            self._codes.move_to_end(phone)
+            self._cap(self._codes)
+
+    def consume_code(self, phone: str, code: str, verified_ttl_seconds: int) -> OtpCheck:
+        now = time.time()
+        with self._lock:
+            self._sweep(now)
+            entry = self._codes.get(phone)
+            if entry is None:
+                return OtpCheck.MISSING
+            real_code, expires_at = entry
+            if now > expires_at:
+                del self._codes[phone]
+                return OtpCheck.EXPIRED
+            if code != real_code:
+                return OtpCheck.INVALID
+            del self._codes[phone]
+            self._verified[phone] = now + verified_ttl_seconds
+            self._verified.move_to_end(phone)
+            self._cap(self._verified)
+            return OtpCheck.VERIFIED
+
+    def is_verified(self, phone: str) -> bool:
+        now = time.time()
+        with self._lock:
+            self._sweep(now)
+            expires_at = self._verified.get(phone)
+            return expires_at is not None and now <= expires_at
+
+
+class PostgresOtpStore:
+    """
+    Shared OTP store in the otp_codes and verified_phones tables.
+
+    Codes are consumed with DELETE ... RETURNING, so only one request can
+    succeed with a given code. Expired rows are pruned every `prune_every`
+    writes using the expires_at indexes.
+    """
+
+    def __init__(self, prune_every: int = 500):
+        self.prune_every = prune_every
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def _maybe_prune(self) -> None:
+        with self._lock:
+            self._writes += 1
+            should_prune = self._writes % self.prune_every == 0
+        if should_prune:
+            self.prune()
+
+    def put_code(self, phone: str, code: str, ttl_seconds: int) -> None:
+        from protega_api.db import engine
+        from protega_api.models import OtpCode
+
+        expires_at = datetime.utcnow() + timedelta(seconds=ttl_seconds)
+        stmt = insert(OtpCode).values(phone=phone, code=code, expires_at=expires_at)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[OtpCode.phone],
+            set_={"code": code, "expires_at": expires_at},
+        )
+        with engine.begin() as conn:
+            conn.execute(stmt)
+        self._maybe_prune()
+
+    def consume_code(self, phone: str, code: str, verified_ttl_seconds: int) -> OtpCheck:
+        from protega_api.db import engine
+        from protega_api.models import OtpCode, VerifiedPhone
+
+        now = datetime.utcnow()
+        with engine.begin() as conn:
+            consumed = conn.execute(
+                delete(OtpCode)
+                .where(OtpCode.phone == phone, OtpCode.code == code, OtpCode.expires_at >= now)
+                .returning(OtpCode.phone)
+            ).first()
+
+            if consumed is None:
+                expires_at = conn.execute(
+                    select(OtpCode.expires_at).where(OtpCode.phone == phone)
+                ).scalar()
+                if expires_at is None:
+                    return OtpCheck.MISSING
+                if expires_at < now:
+                    conn.execute(delete(OtpCode).where(OtpCode.phone == phone, OtpCode.expires_at < now))
+                    return OtpCheck.EXPIRED
+                return OtpCheck.INVALID
+
+            verified_until = now + timedelta(seconds=verified_ttl_seconds)
+            stmt = insert(VerifiedPhone).values(phone=phone, expires_at=verified_until)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[VerifiedPhone.phone],
+                set_={"expires_at": verified_until},
+            )
+            conn.execute(stmt)
+
+        self._maybe_prune()
+        return OtpCheck.VERIFIED
+
+    def is_verified(self, phone: str) -> bool:
+        from protega_api.db import engine
+        from protega_api.models import VerifiedPhone
+
+        stmt = select(VerifiedPhone.phone).where(
+            VerifiedPhone.phone == phone,
+            VerifiedPhone.expires_at >= datetime.utcnow(),
+        )
+        with engine.connect() as conn:
+            return conn.execute(stmt).first() is not None
+
+    def prune(self) -> None:
+        """Delete expired codes and verifications."""
+        from protega_api.db import engine
+        from protega_api.models import OtpCode, VerifiedPhone
+
+        now = datetime.utcnow()
+        try:
+            with engine.begin() as conn:
+                conn.execute(delete(OtpCode).where(OtpCode.expires_at < now))
+                conn.execute(delete(VerifiedPhone).where(VerifiedPhone.expires_at < now))
+        except Exception as e:
+            logger.error(f"Failed to prune OTP store: {e}")
+
+
+# Global instance
+_otp_store_instance: Optional[OtpStore] = None
+
+def get_otp_store() -> OtpStore:
+    """Get or create the global OTP store for the configured backend."""
+    global _otp_store_instance
+    if _otp_store_instance is None:
+        if settings.otp_store_backend == "postgres":
+            _otp_store_instance = PostgresOtpStore()
+        else:
+            _otp_store_instance = InMemoryOtpStore(max_entries=settings.otp_store_max_entries)
+        logger.info(f"OTP store using {settings.otp_store_backend} backend")
+    return _otp_store_instance
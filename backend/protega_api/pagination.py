@@ -0,0 +1,74 @@
+"""
+Keyset (cursor) pagination helpers.
+
+Listings ordered by (created_at DESC, id DESC) page with
+`WHERE (created_at, id) < (:created_at, :id)` instead of OFFSET, so every
+page costs the same index range scan no matter how deep the client reads.
+The response body stays a plain list; the cursor for the next page is sent
+in the X-Next-Cursor header.
+"""
+
+import base64
+from datetime import datetime
+from typing import Tuple
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Encode the sort key of the last row on a page as an opaque cursor."""
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Raises:
+        HTTPException: 400 if the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded).decode().split("|", 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+
+
+def keyset_page(query, model, cursor: str | None, limit: int):
+    """
+    Apply newest-first keyset ordering and the cursor to a query.
+
+    Fetches one extra row so the caller can tell whether another page exists.
+
+    Args:
+        query: SQLAlchemy ORM query over `model`
+        model: Mapped class with created_at and id columns
+        cursor: Cursor from the previous page, or None for the first page
+        limit: Page size
+
+    Returns:
+        (rows, next_cursor) where next_cursor is None on the last page
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(tuple_(model.created_at, model.id) < tuple_(created_at, row_id))
+    rows = query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1).all()
+
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].created_at, rows[-1].id)
+
+
+def set_next_cursor(response: Response, next_cursor: str | None) -> None:
+    """Send the next page's cursor in the X-Next-Cursor header (omitted on the last page)."""
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
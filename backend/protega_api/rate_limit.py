@@ -0,0 +1,345 @@
+"""
+Token-bucket rate limiting for expensive endpoints.
+
+/pay and /identify-user run PBKDF2 over candidate templates and /otp/send
+costs a paid SMS, so they are limited before the request reaches FastAPI:
+no dependency injection, database session or body validation happens for a
+rejected request.
+
+Each policy names a path and the keys it is limited by (terminal API key,
+phone number or client IP). A request must have a token in every bucket it
+maps to, and tokens are only taken when it does: a request rejected by one
+bucket (say its IP) costs nothing in the others (the target phone). Client IPs are taken from X-Forwarded-For only as far as the
+configured number of trusted proxies (TRUSTED_PROXY_HOPS).
+
+Backends:
+- memory: per-process buckets (default)
+- postgres: rate_limit_buckets table, shared across workers; one atomic
+  upsert for single-bucket checks, one locking transaction for several
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from protega_api.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Bodies larger than this are not parsed for keys (IP limits still apply)
+MAX_INSPECTED_BODY_BYTES = 64 * 1024
+
+
+@dataclass(frozen=True)
+class Limit:
+    """A bucket: `burst` tokens, refilled at `per_second`."""
+    name: str
+    burst: int
+    per_second: float
+    # Extracts the bucket key from (client_ip, json_body); None skips this limit
+    key: Callable[[Optional[str], dict], Optional[str]]
+
+
+def by_ip(client_ip: Optional[str], body: dict) -> Optional[str]:
+    return client_ip
+
+
+def by_body_field(field: str, fallback_to_ip: bool = False):
+    """Key by a string field of the JSON body."""
+    def key(client_ip: Optional[str], body: dict) -> Optional[str]:
+        value = body.get(field)
+        if isinstance(value, str) and value.strip():
+            return value.strip()
+        return client_ip if fallback_to_ip else None
+    return key
+
+
+def normalize_phone(phone: str) -> str:
+    """Digits of a phone number, so "+1 (555) 010-0000" and "+15550100000" share a bucket."""
+    return "".join(ch for ch in phone if ch.isdigit())
+
+
+def by_phone(client_ip: Optional[str], body: dict) -> Optional[str]:
+    value = body.get("phone")
+    if not isinstance(value, str):
+        return None
+    return normalize_phone(value) or None
+
+
+def default_policies() -> Dict[str, List[Limit]]:
+    """Per-path limits from settings (POST requests only)."""
+    return {
+        "/pay": [
+            Limit("pay_terminal", settings.rate_limit_pay_burst, settings.rate_limit_pay_per_minute / 60,
+                  by_body_field("terminal_api_key", fallback_to_ip=True)),
+        ],
+        "/identify-user": [
+            Limit("identify_ip", settings.rate_limit_identify_burst, settings.rate_limit_identify_per_minute / 60,
+                  by_ip),
+        ],
+        "/otp/send": [
+            Limit("otp_ip", settings.rate_limit_otp_ip_burst, settings.rate_limit_otp_ip_per_hour / 3600,
+                  by_ip),
+            Limit("otp_phone", settings.rate_limit_otp_phone_burst, settings.rate_limit_otp_phone_per_hour / 3600,
+                  by_phone),
+        ],
+    }
+
+
+# (key, burst, per_second) of one bucket a request must take a token from
+Bucket = Tuple[str, int, float]
+
+
+def _waits(buckets: List[Bucket], tokens: List[float]) -> List[float]:
+    """Seconds until each bucket has a token again (0 for those that had one)."""
+    return [
+        0.0 if available >= 1 else (1 - available) / per_second
+        for (_, _, per_second), available in zip(buckets, tokens)
+    ]
+
+
+class InMemoryRateLimitBackend:
+    """Per-process buckets; least recently used keys are evicted beyond `max_keys`."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()  # key -> (tokens, updated)
+        self._lock = threading.Lock()
+
+    async def take_all(self, buckets: List[Bucket]) -> List[float]:
+        now = time.monotonic()
+        with self._lock:
+            refilled = []
+            for key, burst, per_second in buckets:
+                tokens, updated = self._buckets.get(key, (float(burst), now))
+                refilled.append(min(float(burst), tokens + (now - updated) * per_second))
+            allowed = all(tokens >= 1 for tokens in refilled)
+            for (key, _, _), tokens in zip(buckets, refilled):
+                self._buckets[key] = (tokens - 1 if allowed else tokens, now)
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return _waits(buckets, refilled)
+
+
+# Refill, then take a token if one is available, in a single statement.
+# Timestamps are UTC on the database clock so every worker agrees.
+_REFILLED = "LEAST(:burst, b.tokens + EXTRACT(EPOCH FROM timezone('utc', now()) - b.updated_at) * :rate)"
+_TAKE_SQL = text(f"""
+    INSERT INTO rate_limit_buckets AS b (key, tokens, allowed, updated_at)
+    VALUES (:key, :burst - 1, true, timezone('utc', now()))
+    ON CONFLICT (key) DO UPDATE SET
+        tokens = {_REFILLED} - CASE WHEN {_REFILLED} >= 1 THEN 1 ELSE 0 END,
+        allowed = {_REFILLED} >= 1,
+        updated_at = timezone('utc', now())
+    RETURNING tokens, allowed
+""")
+
+# Several buckets at once: create missing rows, lock all of them, then decide
+_ENSURE_SQL = text("""
+    INSERT INTO rate_limit_buckets (key, tokens, allowed, updated_at)
+    VALUES (:key, :burst, true, timezone('utc', now()))
+    ON CONFLICT (key) DO NOTHING
+""")
+_LOCK_SQL = text(f"SELECT {_REFILLED} FROM rate_limit_buckets AS b WHERE b.key = :key FOR UPDATE")
+_SET_SQL = text("""
+    UPDATE rate_limit_buckets
+    SET tokens = :tokens, allowed = :allowed, updated_at = timezone('utc', now())
+    WHERE key = :key
+""")
+
+
+class PostgresRateLimitBackend:
+    """
+    Shared buckets in the rate_limit_buckets table.
+
+    Checks run in a worker thread so the event loop never waits on the
+    database. Idle buckets are pruned every `prune_every` checks.
+    """
+
+    def __init__(self, prune_every: int = 5000, idle_seconds: int = 86400):
+        self.prune_every = prune_every
+        self.idle_seconds = idle_seconds
+        self._checks = 0
+        self._lock = threading.Lock()
+
+    def _take_all(self, buckets: List[Bucket]) -> List[float]:
+        from protega_api.db import engine
+
+        with engine.begin() as conn:
+            if len(buckets) == 1:
+                key, burst, per_second = buckets[0]
+                tokens, allowed = conn.execute(_TAKE_SQL, {"key": key, "burst": burst, "rate": per_second}).one()
+                refilled = [float(tokens) + 1 if allowed else float(tokens)]
+            else:
+                # Lock in key order so concurrent checks of the same buckets cannot deadlock
+                refilled_by_key = {}
+                for key, burst, per_second in sorted(buckets):
+                    conn.execute(_ENSURE_SQL, {"key": key, "burst": burst})
+                    refilled_by_key[key] = float(conn.execute(
+                        _LOCK_SQL, {"key": key, "burst": burst, "rate": per_second}
+                    ).scalar_one())
+                refilled = [refilled_by_key[key] for key, _, _ in buckets]
+                allowed = all(tokens >= 1 for tokens in refilled)
+                for (key, _, _), tokens in zip(buckets, refilled):
+                    conn.execute(_SET_SQL, {"key": key, "tokens": tokens - 1 if allowed else tokens, "allowed": allowed})
+
+        with self._lock:
+            self._checks += 1
+            should_prune = self._checks % self.prune_every == 0
+        if should_prune:
+            self.prune()
+        return _waits(buckets, refilled)
+
+    async def take_all(self, buckets: List[Bucket]) -> List[float]:
+        return await asyncio.to_thread(self._take_all, buckets)
+
+    def prune(self) -> None:
+        """Delete buckets idle long enough to have refilled completely."""
+        from protega_api.db import engine
+        from protega_api.models import RateLimitBucket
+
+        cutoff = datetime.utcnow() - timedelta(seconds=self.idle_seconds)
+        try:
+            with engine.begin() as conn:
+                conn.execute(RateLimitBucket.__table__.delete().where(RateLimitBucket.updated_at < cutoff))
+        except Exception as e:
+            logger.error(f"Failed to prune rate limit buckets: {e}")
+
+
+def create_backend():
+    """Create the backend for the configured RATE_LIMIT_BACKEND."""
+    if settings.rate_limit_backend == "postgres":
+        return PostgresRateLimitBackend()
+    return InMemoryRateLimitBackend(max_keys=settings.rate_limit_max_keys)
+
+
+def client_ip(scope) -> Optional[str]:
+    """
+    Client IP as seen by the outermost trusted proxy.
+
+    Each of the TRUSTED_PROXY_HOPS proxies in front of the app appends the
+    address it received the request from to X-Forwarded-For, so the client
+    address is that many hops from the right; anything further left was
+    sent by the client and can be forged. With 0 hops, or no header, the
+    socket peer is used.
+    """
+    hops = settings.trusted_proxy_hops
+    if hops > 0:
+        for name, value in scope.get("headers", ()):
+            if name == b"x-forwarded-for":
+                addresses = [a.strip() for a in value.decode("latin-1").split(",") if a.strip()]
+                if addresses:
+                    return addresses[-min(hops, len(addresses))][:45]
+                break
+    client = scope.get("client")
+    return client[0] if client else None
+
+
+def _bucket_key(limit: Limit, raw_key: str) -> str:
+    # Terminal keys and phone numbers are never stored in the clear
+    return f"{limit.name}:{hashlib.sha256(raw_key.encode()).hexdigest()}"
+
+
+class RateLimitMiddleware:
+    """
+    Pure ASGI middleware applying token-bucket policies to POST requests.
+
+    The request body is read (up to MAX_INSPECTED_BODY_BYTES) to find key
+    fields and then replayed to the application unchanged. Backend errors
+    fail open.
+    """
+
+    def __init__(self, app, policies: Optional[Dict[str, List[Limit]]] = None, backend=None):
+        self.app = app
+        self.policies = policies if policies is not None else default_policies()
+        self.backend = backend if backend is not None else create_backend()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+        limits = self.policies.get(scope["path"])
+        if not limits:
+            await self.app(scope, receive, send)
+            return
+
+        # Buffer the body so key fields can be read, then replay it
+        buffered = []
+        body = b""
+        while len(body) <= MAX_INSPECTED_BODY_BYTES:
+            message = await receive()
+            buffered.append(message)
+            if message["type"] != "http.request":
+                break
+            body += message.get("body", b"")
+            if not message.get("more_body", False):
+                break
+
+        async def replay():
+            if buffered:
+                return buffered.pop(0)
+            return await receive()
+
+        retry_after = await self._check(limits, client_ip(scope), body)
+        if retry_after is not None:
+            scope["rate_limited"] = True  # Lets outer middleware (metrics) label the rejection
+            await self._reject(send, retry_after)
+            return
+        await self.app(scope, replay, send)
+
+    async def _check(self, limits: List[Limit], client_ip: Optional[str], body: bytes) -> Optional[float]:
+        """
+        Take a token from every bucket, or from none if any is empty.
+
+        Returns:
+            Retry-After seconds if the request is rejected, else None
+        """
+        try:
+            payload = json.loads(body) if body and len(body) <= MAX_INSPECTED_BODY_BYTES else {}
+        except (ValueError, UnicodeDecodeError):
+            payload = {}
+        if not isinstance(payload, dict):
+            payload = {}
+
+        applied, buckets = [], []
+        for limit in limits:
+            raw_key = limit.key(client_ip, payload)
+            if raw_key:
+                applied.append(limit)
+                buckets.append((_bucket_key(limit, raw_key), limit.burst, limit.per_second))
+        if not buckets:
+            return None
+        try:
+            waits = await self.backend.take_all(buckets)
+        except Exception as e:
+            logger.error(f"Rate limit check failed, allowing request: {e}")
+            return None
+        exceeded = [limit.name for limit, wait in zip(applied, waits) if wait > 0]
+        if not exceeded:
+            return None
+        logger.warning(f"Rate limit {', '.join(exceeded)} exceeded")
+        return max(waits)
+
+    async def _reject(self, send, retry_after: float) -> None:
+        body = json.dumps({"detail": "Too many requests. Please try again later."}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
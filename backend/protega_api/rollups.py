@@ -0,0 +1,217 @@
+"""
+Incrementally maintained reporting rollups.
+
+Merchant-facing reports read from small rollup tables instead of scanning
+the transactions table. Every code path that records a final transaction
+calls record_transaction() in the same database transaction, so the rollups
+commit (or roll back) together with the transaction row itself.
+"""
+
+import logging
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import Date, String, case, cast, func, literal, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from protega_api.models import (
+    MerchantCustomer,
+    MerchantDailyStats,
+    Transaction,
+    TransactionStatus,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _status_value(status) -> str:
+    """Normalize a transaction status (enum or plain string) to its lowercase value."""
+    return str(getattr(status, "value", status)).lower()
+
+
+def _is_succeeded(status) -> bool:
+    """Check a transaction status (enum or plain string) for success."""
+    return _status_value(status) == TransactionStatus.SUCCEEDED.value
+
+
+def record_customer_transaction(db: Session, txn: Transaction) -> None:
+    """
+    Fold a single transaction into the merchant customer rollup.
+
+    Uses an upsert so concurrent payments for the same customer never race
+    on a read-modify-write cycle.
+
+    Args:
+        db: Database session (not committed)
+        txn: Transaction being recorded
+    """
+    if not txn.user_id:
+        return
+
+    seen_at = txn.created_at or datetime.utcnow()
+    spent_cents = txn.amount_cents if _is_succeeded(txn.status) else 0
+
+    stmt = insert(MerchantCustomer).values(
+        merchant_id=txn.merchant_id,
+        user_id=txn.user_id,
+        txn_count=1,
+        total_spent_cents=spent_cents,
+        first_seen=seen_at,
+        last_seen=seen_at,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[MerchantCustomer.merchant_id, MerchantCustomer.user_id],
+        set_={
+            "txn_count": MerchantCustomer.txn_count + 1,
+            "total_spent_cents": MerchantCustomer.total_spent_cents + spent_cents,
+            "first_seen": func.least(MerchantCustomer.first_seen, stmt.excluded.first_seen),
+            "last_seen": func.greatest(MerchantCustomer.last_seen, stmt.excluded.last_seen),
+        },
+    )
+    db.execute(stmt)
+
+
+def record_daily_transaction(db: Session, txn: Transaction) -> None:
+    """
+    Fold a single transaction into the merchant daily stats rollup.
+
+    Args:
+        db: Database session (not committed)
+        txn: Transaction being recorded
+    """
+    status = _status_value(txn.status)
+    if status == "pending":
+        return
+
+    day = (txn.created_at or datetime.utcnow()).date()
+    fee_cents = txn.protega_fee_cents or 0
+
+    stmt = insert(MerchantDailyStats).values(
+        merchant_id=txn.merchant_id,
+        day=day,
+        status=status,
+        txn_count=1,
+        amount_cents=txn.amount_cents,
+        protega_fee_cents=fee_cents,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[MerchantDailyStats.merchant_id, MerchantDailyStats.day, MerchantDailyStats.status],
+        set_={
+            "txn_count": MerchantDailyStats.txn_count + 1,
+            "amount_cents": MerchantDailyStats.amount_cents + txn.amount_cents,
+            "protega_fee_cents": MerchantDailyStats.protega_fee_cents + fee_cents,
+        },
+    )
+    db.execute(stmt)
+
+
+def record_transaction(db: Session, txn: Transaction) -> None:
+    """
+    Update every reporting rollup for a newly recorded transaction.
+
+    Call this right after the transaction is added (or finalized) and before
+    the session is committed.
+
+    Args:
+        db: Database session (not committed)
+        txn: Transaction being recorded
+    """
+    record_customer_transaction(db, txn)
+    record_daily_transaction(db, txn)
+
+
+def rebuild_customer_rollup(db: Session, merchant_id: int) -> int:
+    """
+    Rebuild the customer rollup for one merchant from the transactions table.
+
+    Runs a single GROUP BY aggregate and rewrites the merchant's rows from it,
+    replacing any drifted counters. Intended for repair and backfill, not the request path.
+
+    Args:
+        db: Database session (not committed)
+        merchant_id: Merchant whose rollup should be rebuilt
+
+    Returns:
+        Number of customer rows written
+    """
+    succeeded = func.lower(cast(Transaction.status, String)) == TransactionStatus.SUCCEEDED.value
+    aggregate = (
+        select(
+            Transaction.merchant_id,
+            Transaction.user_id,
+            func.count().label("txn_count"),
+            func.coalesce(
+                func.sum(case((succeeded, Transaction.amount_cents), else_=0)), 0
+            ).label("total_spent_cents"),
+            func.min(Transaction.created_at).label("first_seen"),
+            func.max(Transaction.created_at).label("last_seen"),
+        )
+        .where(
+            Transaction.merchant_id == merchant_id,
+            Transaction.user_id.isnot(None),
+        )
+        .group_by(Transaction.merchant_id, Transaction.user_id)
+    )
+
+    db.query(MerchantCustomer).filter(MerchantCustomer.merchant_id == merchant_id).delete()
+    result = db.execute(
+        insert(MerchantCustomer).from_select(
+            ["merchant_id", "user_id", "txn_count", "total_spent_cents", "first_seen", "last_seen"],
+            aggregate,
+        )
+    )
+
+    logger.info(f"Rebuilt customer rollup for merchant {merchant_id}: {result.rowcount} customers")
+    return result.rowcount
+
+
+def rebuild_merchant_day(db: Session, merchant_id: int, day: date) -> int:
+    """
+    Rebuild one merchant's daily stats for a single day from source.
+
+    The created_at range predicate keeps the aggregate on a single
+    transactions partition.
+
+    Args:
+        db: Database session (not committed)
+        merchant_id: Merchant whose day should be rebuilt
+        day: UTC day to rebuild
+
+    Returns:
+        Number of status rows written
+    """
+    start = datetime.combine(day, datetime.min.time())
+    end = start + timedelta(days=1)
+    status = func.lower(cast(Transaction.status, String))
+
+    aggregate = (
+        select(
+            Transaction.merchant_id,
+            literal(day, Date).label("day"),
+            status.label("status"),
+            func.count().label("txn_count"),
+            func.sum(Transaction.amount_cents).label("amount_cents"),
+            func.sum(Transaction.protega_fee_cents).label("protega_fee_cents"),
+        )
+        .where(
+            Transaction.merchant_id == merchant_id,
+            Transaction.created_at >= start,
+            Transaction.created_at < end,
+            status != "pending",
+        )
+        .group_by(Transaction.merchant_id, status)
+    )
+
+    db.query(MerchantDailyStats).filter(
+        MerchantDailyStats.merchant_id == merchant_id,
+        MerchantDailyStats.day == day,
+    ).delete()
+    result = db.execute(
+        insert(MerchantDailyStats).from_select(
+            ["merchant_id", "day", "status", "txn_count", "amount_cents", "protega_fee_cents"],
+            aggregate,
+        )
+    )
+
+    logger.info(f"Rebuilt daily stats for merchant {merchant_id} on {day}: {result.rowcount} rows")
+    return result.rowcount
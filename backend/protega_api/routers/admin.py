@@ -1,18 +1,24 @@
 """Admin endpoints for reviewing flagged enrollments."""
 
+import json
 import logging
 from datetime import datetime
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
-from protega_api.db import get_db
+from protega_api.db import get_db, get_read_db, new_read_session
 from protega_api.models import FlaggedEnroll, User, BiometricTemplate, ProtegaIdentity, FraudAlert
+from protega_api.pagination import keyset_page, set_next_cursor
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/admin", tags=["admin"])
 
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 1000  # Rows fetched per server-side cursor round trip
+
 
 def is_admin(request=None):
     """Check if request is from admin (implement real auth in production)."""
@@ -20,32 +26,97 @@ def is_admin(request=None):
     return True
 
 
+def _flag_to_dict(r: FlaggedEnroll) -> dict:
+    """Serialize a flagged enrollment for admin listings."""
+    return {
+        "id": r.id,
+        "email": r.email,
+        "phone": r.phone,
+        "risk_score": r.risk_score,
+        "reason": r.reason,
+        "card_fingerprint": r.card_fingerprint,
+        "device_id": r.device_id,
+        "enroll_ip": r.enroll_ip,
+        "created_at": r.created_at.isoformat(),
+    }
+
+
+def _flagged_query(db: Session, min_risk: int | None, max_risk: int | None):
+    """
+    Unresolved flags, optionally bounded by risk score.
+    
+    Pages walk idx_unresolved_flags (resolved, created_at, id) in keyset
+    order; risk bounds are checked against the rows it returns.
+    """
+    query = db.query(FlaggedEnroll).filter(FlaggedEnroll.resolved == False)
+    if min_risk is not None:
+        query = query.filter(FlaggedEnroll.risk_score >= min_risk)
+    if max_risk is not None:
+        query = query.filter(FlaggedEnroll.risk_score <= max_risk)
+    return query
+
+
+def _stream_ndjson(build_query, serialize) -> StreamingResponse:
+    """
+    Stream every row of a query as newline-delimited JSON.
+    
+    The generator owns its read session, because request-scoped dependencies
+    are closed before a streaming body is sent. yield_per fetches through a
+    server-side cursor, so memory stays flat however many rows match.
+    """
+    def rows():
+        db = new_read_session()
+        try:
+            for row in build_query(db).yield_per(STREAM_BATCH_SIZE):
+                yield json.dumps(serialize(row)) + "\n"
+        finally:
+            db.close()
+    
+    return StreamingResponse(rows(), media_type="application/x-ndjson")
+
+
 @router.get("/flagged")
-def list_flagged(db: Annotated[Session, Depends(get_db)]):
+def list_flagged(
+    response: Response,
+    db: Annotated[Session, Depends(get_read_db)],
+    cursor: str | None = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    min_risk: int | None = None,
+    max_risk: int | None = None
+):
     """
-    List all unresolved flagged enrollments.
+    List unresolved flagged enrollments, newest first.
+    
+    Args:
+        cursor: X-Next-Cursor header of the previous page (omit for the first page)
+        limit: Page size
+        min_risk: Only include flags with risk_score >= min_risk
+        max_risk: Only include flags with risk_score <= max_risk
     
     Returns:
-        List of flagged enrollment records
+        List of flagged enrollment records; the X-Next-Cursor response header
+        is set when another page exists
     """
-    rows = db.query(FlaggedEnroll).filter(
-        FlaggedEnroll.resolved == False
-    ).order_by(FlaggedEnroll.created_at.desc()).all()
+    rows, next_cursor = keyset_page(_flagged_query(db, min_risk, max_risk), FlaggedEnroll, cursor, limit)
+    set_next_cursor(response, next_cursor)
+    return [_flag_to_dict(r) for r in rows]
+
+
+@router.get("/flagged/stream")
+def stream_flagged(min_risk: int | None = None, max_risk: int | None = None):
+    """
+    Stream all unresolved flagged enrollments as NDJSON, newest first.
     
-    return [
-        {
-            "id": r.id,
-            "email": r.email,
-            "phone": r.phone,
-            "risk_score": r.risk_score,
-            "reason": r.reason,
-            "card_fingerprint": r.card_fingerprint,
-            "device_id": r.device_id,
-            "enroll_ip": r.enroll_ip,
-            "created_at": r.created_at.isoformat(),
-        }
-        for r in rows
-    ]
+    Args:
+        min_risk: Only include flags with risk_score >= min_risk
+        max_risk: Only include flags with risk_score <= max_risk
+    """
+    return _stream_ndjson(
+        lambda db: _flagged_query(db, min_risk, max_risk).order_by(
+            FlaggedEnroll.created_at.desc(), FlaggedEnroll.id.desc()
+        ),
+        _flag_to_dict,
+    )
 
 
 @router.post("/flagged/{flag_id}/resolve")
@@ -196,40 +267,89 @@ async def resolve_flag(
 
 
 
+def _alert_to_dict(alert: FraudAlert) -> dict:
+    """Serialize a fraud alert for admin listings."""
+    return {
+        "id": alert.id,
+        "user_id": alert.user_id,
+        "template_id": alert.template_id,
+        "match_user_id": alert.match_user_id,
+        "match_template_id": alert.match_template_id,
+        "match_score": alert.match_score,
+        "status": alert.status,
+        "notes": alert.notes,
+        "reviewed_by": alert.reviewed_by,
+        "reviewed_at": alert.reviewed_at.isoformat() if alert.reviewed_at else None,
+        "created_at": alert.created_at.isoformat(),
+    }
+
+
+def _fraud_alerts_query(db: Session, status: str, min_score: float | None, max_score: float | None):
+    """
+    Alerts in one status, optionally bounded by match score.
+    
+    Pages walk idx_pending_alerts (status, created_at, id) in keyset order;
+    score bounds are checked against the rows it returns.
+    """
+    query = db.query(FraudAlert).filter(FraudAlert.status == status)
+    if min_score is not None:
+        query = query.filter(FraudAlert.match_score >= min_score)
+    if max_score is not None:
+        query = query.filter(FraudAlert.match_score <= max_score)
+    return query
+
+
 @router.get("/fraud-alerts")
 def list_fraud_alerts(
+    response: Response,
     status: str = "pending_review",
-    db: Annotated[Session, Depends(get_db)] = None
+    cursor: str | None = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    min_score: float | None = None,
+    max_score: float | None = None,
+    db: Annotated[Session, Depends(get_read_db)] = None
 ):
     """
-    List all fraud alerts detected by background scanner.
+    List fraud alerts detected by background scanner, newest first.
     
     Args:
         status: Filter by alert status (pending_review, verified_false, confirmed_duplicate, dismissed)
+        cursor: X-Next-Cursor header of the previous page (omit for the first page)
+        limit: Page size
+        min_score: Only include alerts with match_score >= min_score
+        max_score: Only include alerts with match_score <= max_score
         
     Returns:
-        List of fraud alert records
+        List of fraud alert records; the X-Next-Cursor response header is set
+        when another page exists
+    """
+    alerts, next_cursor = keyset_page(
+        _fraud_alerts_query(db, status, min_score, max_score), FraudAlert, cursor, limit
+    )
+    set_next_cursor(response, next_cursor)
+    return [_alert_to_dict(a) for a in alerts]
+
+
+@router.get("/fraud-alerts/stream")
+def stream_fraud_alerts(
+    status: str = "pending_review",
+    min_score: float | None = None,
+    max_score: float | None = None
+):
     """
-    alerts = db.query(FraudAlert).filter(
-        FraudAlert.status == status
-    ).order_by(FraudAlert.created_at.desc()).all()
+    Stream all fraud alerts in a status as NDJSON, newest first.
     
-    return [
-        {
-            "id": alert.id,
-            "user_id": alert.user_id,
-            "template_id": alert.template_id,
-            "match_user_id": alert.match_user_id,
-            "match_template_id": alert.match_template_id,
-            "match_score": alert.match_score,
-            "status": alert.status,
-            "notes": alert.notes,
-            "reviewed_by": alert.reviewed_by,
-            "reviewed_at": alert.reviewed_at.isoformat() if alert.reviewed_at else None,
-            "created_at": alert.created_at.isoformat(),
-        }
-        for alert in alerts
-    ]
+    Args:
+        status: Filter by alert status
+        min_score: Only include alerts with match_score >= min_score
+        max_score: Only include alerts with match_score <= max_score
+    """
+    return _stream_ndjson(
+        lambda db: _fraud_alerts_query(db, status, min_score, max_score).order_by(
+            FraudAlert.created_at.desc(), FraudAlert.id.desc()
+        ),
+        _alert_to_dict,
+    )
 
 
 @router.post("/fraud-alerts/{alert_id}/review")
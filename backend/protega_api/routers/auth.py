@@ -4,7 +4,7 @@ import logging
 from datetime import datetime, timedelta
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from jose import jwt
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
@@ -36,6 +36,7 @@ class BiometricLoginResponse(BaseModel):
 @router.post("/biometric-login", response_model=BiometricLoginResponse)
 async def biometric_login(
     request: BiometricLoginRequest,
+    http_request: Request,
     db: Annotated[Session, Depends(get_db)]
 ):
     """
@@ -55,9 +56,9 @@ async def biometric_login(
         fingerprint_sample = request.fingerprint_sample
         logger.info("Using provided fingerprint sample (development mode)")
     else:
-        # Capture from hardware
+        # Capture from hardware without blocking the event loop; abandoned if the client leaves
         logger.info("Capturing fingerprint from hardware SDK")
-        fingerprint_sample = reader.capture_sample()
+        fingerprint_sample = await reader.capture_sample_async(is_disconnected=http_request.is_disconnected)
         if not fingerprint_sample:
             raise HTTPException(
                 status_code=400,
@@ -105,6 +106,7 @@ async def biometric_login(
     expire = datetime.utcnow() + timedelta(minutes=15)  # 15 minute expiration
     payload = {
         "sub": str(user.id),
+        "typ": "user",  # Distinguishes user tokens from merchant tokens (same "sub" space)
         "email": user.email or "",
         "exp": expire
     }
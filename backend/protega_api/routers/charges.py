@@ -11,8 +11,9 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
+from protega_api.charge_registry import find_pending_transaction, invalidate_pending_charge, pending_charges
 from protega_api.db import get_db
-from protega_api.models import Transaction, User, PaymentMethod
+from protega_api.models import Transaction, TransactionCharge, User, PaymentMethod
 from protega_api.deps import get_current_merchant
 from protega_api.routers.websocket import broadcast_charge_update
 
@@ -64,6 +65,7 @@ def create_charge(
         description=request.description,
         status="pending",
         merchant_id=merchant.id,
+        charge_id=charge_id,
         customer_ref=f"CHARGE_{charge_id}",  # Temporary customer reference
         metadata={
             "charge_id": charge_id,
@@ -73,9 +75,24 @@ def create_charge(
     )
     
     db.add(transaction)
+    db.flush()
+    # Global uniqueness of charge_id and the partition key for later lookups
+    db.add(TransactionCharge(
+        charge_id=charge_id,
+        transaction_id=transaction.id,
+        created_at=transaction.created_at,
+    ))
     db.commit()
     db.refresh(transaction)
     
+    pending_charges.put(charge_id, {
+        "merchant_id": merchant.id,
+        "merchant_name": merchant.name,
+        "amount_cents": transaction.amount_cents,
+        "description": transaction.description,
+        "status": "pending",
+    })
+    
     logger.info(f"Created pending charge {charge_id} for merchant {merchant.id}")
     
     return CreateChargeResponse(
@@ -100,15 +117,7 @@ async def update_charge(
     Update a pending charge. Broadcasts changes to all connected customers.
     """
     # Find the pending transaction
-    transaction = (
-        db.query(Transaction)
-        .filter(
-            Transaction.metadata['charge_id'].astext == charge_id,
-            Transaction.merchant_id == merchant.id,
-            Transaction.status == 'pending'
-        )
-        .first()
-    )
+    transaction = find_pending_transaction(db, charge_id, merchant_id=merchant.id)
     
     if not transaction:
         raise HTTPException(
@@ -124,6 +133,8 @@ async def update_charge(
     
     db.commit()
     
+    await invalidate_pending_charge(charge_id)
+    
     # Broadcast update to all connected customers
     update_data = {
         "amount": f"{transaction.amount_cents / 100:.2f}",
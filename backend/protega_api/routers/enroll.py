@@ -6,7 +6,7 @@ import logging
 from typing import Annotated
 
 import numpy as np
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 
 from protega_api.adapters.hashing import derive_template_hash
@@ -14,10 +14,15 @@ from protega_api.adapters.payments import (
     attach_payment_method_and_get_details,
     create_customer,
 )
+from protega_api.anti_fraud import PROTEGA_DEVICE_LIMIT
+from protega_api.config import settings
 from protega_api.sdk import get_fingerprint_reader
 from protega_api.db import get_db
+from protega_api.metrics import observe_candidates
 from protega_api.models import BiometricTemplate, Consent, PaymentMethod, User, PaymentProvider
+from protega_api.rate_limit import client_ip
 from protega_api.schemas import EnrollRequest, EnrollResponse
+from protega_api.velocity import VelocityKind, get_velocity_counter
 
 router = APIRouter(tags=["enrollment"])
 logger = logging.getLogger(__name__)
@@ -36,6 +41,7 @@ def mask_email(email: str) -> str:
 @router.post("/enroll", response_model=EnrollResponse, status_code=status.HTTP_201_CREATED)
 def enroll_user(
     request: EnrollRequest,
+    http_request: Request,
     db: Annotated[Session, Depends(get_db)]
 ):
     """
@@ -52,6 +58,21 @@ def enroll_user(
     Returns:
         Enrollment confirmation with masked email and payment details
     """
+    velocity = get_velocity_counter()
+    enroll_ip = client_ip(http_request.scope)
+    
+    # Device velocity limit: the attempt is counted and checked in one step,
+    # before any other work, so concurrent enrollments cannot all slip under it
+    device_enrolls = velocity.record_and_count(VelocityKind.DEVICE, request.device_id)
+    if device_enrolls > PROTEGA_DEVICE_LIMIT:
+        # Rejected attempts give their slot back
+        velocity.record(VelocityKind.DEVICE, request.device_id, amount=-1)
+        logger.warning(f"Device {request.device_id} exceeded enrollment limit ({PROTEGA_DEVICE_LIMIT}/24h)")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many enrollments from this device. Please try again later."
+        )
+    
     # Normalize phone number for consistency
     normalized_phone = request.phone.strip() if request.phone else None
     logger.info(f"Enrollment request for email: {request.email}, phone: {normalized_phone}")
@@ -59,41 +80,33 @@ def enroll_user(
     
     # Phone verification check
     if normalized_phone:
-        from protega_api.otp import OTP_STORE, VERIFIED_PHONES, send_otp
-        import time
+        from protega_api.otp_store import OtpCheck, get_otp_store
+        otp_store = get_otp_store()
         
         # Check if phone is already verified
-        is_already_verified = VERIFIED_PHONES.get(normalized_phone, False)
+        is_already_verified = otp_store.is_verified(normalized_phone)
         
         if is_already_verified:
             # Phone already verified, no need to check OTP again
             logger.info(f"Phone {normalized_phone} already verified, skipping OTP check")
         elif request.otp_code:
-            # OTP code provided - verify it
-            otp_record = OTP_STORE.get(normalized_phone)
-            if not otp_record:
+            # OTP code provided - consume it and mark the phone verified
+            check = otp_store.consume_code(normalized_phone, request.otp_code, settings.otp_verified_ttl_seconds)
+            if check == OtpCheck.MISSING:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="No verification code requested for this phone number. Please request a code first."
                 )
-            
-            code, expires = otp_record
-            if int(time.time()) > expires:
-                del OTP_STORE[normalized_phone]
+            if check == OtpCheck.EXPIRED:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="Verification code expired. Please request a new one."
                 )
-            
-            if request.otp_code != code:
+            if check == OtpCheck.INVALID:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="Invalid verification code. Please try again."
                 )
-            
-            # OTP verified - remove from store and mark as verified
-            del OTP_STORE[normalized_phone]
-            VERIFIED_PHONES[normalized_phone] = True
             logger.info(f"Phone {normalized_phone} verified with OTP")
         else:
             # No OTP provided and not verified - require verification
@@ -228,6 +241,7 @@ def enroll_user(
                 continue
         
         # Check for similar fingerprints
+        observe_candidates("enroll_dedupe", len(existing_vectors))
         is_duplicate, match_info = matcher.is_duplicate(new_feature_vector, existing_vectors)
         
         if is_duplicate and match_info:
@@ -306,6 +320,8 @@ def enroll_user(
             encrypted_template=encrypted_template,  # NEW: AES-256-GCM encrypted
             feature_vector=feature_vector_json,  # Biometric similarity scoring
             finger_label=request.finger_label,  # Multi-finger support
+            device_id=request.device_id,
+            enroll_ip=enroll_ip,
             active=True
         )
         db.add(template)
@@ -403,6 +419,12 @@ def enroll_user(
     # Commit all changes
     db.commit()
     
+    # Count the enrollment only once it has actually been stored (the device
+    # was counted when it passed the limit check)
+    velocity.record(VelocityKind.IP, enroll_ip)
+    velocity.record(VelocityKind.CARD, card_fingerprint)
+    velocity.record(VelocityKind.PHONE, normalized_phone)
+    
     return EnrollResponse(
         user_id=user.id,
         masked_email=mask_email(user.email),
@@ -2,14 +2,16 @@
 
 import logging
 import secrets
+from datetime import datetime, timedelta
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
-from protega_api.db import get_db
+from protega_api.config import settings
+from protega_api.db import get_db, get_read_db
 from protega_api.deps import get_current_merchant
-from protega_api.models import Merchant, Terminal, Transaction
+from protega_api.models import Merchant, MerchantDailyStats, Terminal, Transaction
 from protega_api.schemas import (
     MerchantLoginRequest,
     MerchantLoginResponse,
@@ -17,6 +19,8 @@ from protega_api.schemas import (
     MerchantSignupResponse,
     AutoMerchantRequest,
     AutoMerchantResponse,
+    MerchantDailySummary,
+    MerchantSummaryResponse,
     TransactionItem,
     TransactionsListResponse,
 )
@@ -217,27 +221,42 @@ def login_merchant(
 @router.get("/transactions", response_model=TransactionsListResponse)
 def list_transactions(
     merchant: Annotated[Merchant, Depends(get_current_merchant)],
-    db: Annotated[Session, Depends(get_db)],
+    db: Annotated[Session, Depends(get_read_db)],
     limit: int = 100,
-    offset: int = 0
+    offset: int = 0,
+    created_after: datetime | None = None,
+    created_before: datetime | None = None
 ):
     """
     List transactions for the authenticated merchant.
     
+    The created_at bounds let Postgres prune monthly partitions. Without
+    created_after, only the last TRANSACTION_LIST_DEFAULT_DAYS (before
+    created_before, or now) are listed and counted; pass an earlier
+    created_after for older history.
+    
     Args:
         merchant: Current authenticated merchant
         limit: Maximum number of transactions to return
         offset: Number of transactions to skip
+        created_after: Only include transactions created at or after this time
+        created_before: Only include transactions created before this time
         
     Returns:
         List of transactions with user details
     """
     logger.info(f"Fetching transactions for merchant: {merchant.id}")
     
+    if created_after is None:
+        created_after = (created_before or datetime.utcnow()) - timedelta(days=settings.transaction_list_default_days)
+    filters = [Transaction.merchant_id == merchant.id, Transaction.created_at >= created_after]
+    if created_before is not None:
+        filters.append(Transaction.created_at < created_before)
+    
     # Query transactions with user join
     transactions_query = (
         db.query(Transaction)
-        .filter(Transaction.merchant_id == merchant.id)
+        .filter(*filters)
         .order_by(Transaction.created_at.desc())
         .offset(offset)
         .limit(limit)
@@ -246,7 +265,7 @@ def list_transactions(
     transactions = transactions_query.all()
     
     # Get total count
-    total = db.query(Transaction).filter(Transaction.merchant_id == merchant.id).count()
+    total = db.query(Transaction).filter(*filters).count()
     
     # Build response items
     items = []
@@ -278,3 +297,75 @@ def list_transactions(
     
     return TransactionsListResponse(items=items, total=total)
 
+
+
+def _success_rate(succeeded: int, failed: int) -> float | None:
+    """Share of final transactions that succeeded, or None if there were none."""
+    final = succeeded + failed
+    return round(succeeded / final, 4) if final else None
+
+
+@router.get("/summary", response_model=MerchantSummaryResponse)
+def merchant_summary(
+    merchant: Annotated[Merchant, Depends(get_current_merchant)],
+    db: Annotated[Session, Depends(get_read_db)],
+    days: int = Query(30, ge=1, le=366)
+):
+    """
+    Daily volume, Protega fees and success rate for the dashboard.
+    
+    Served entirely from the merchant_daily_stats rollup, so the cost depends
+    only on the number of days requested, never on transaction volume.
+    
+    Args:
+        merchant: Current authenticated merchant
+        days: Number of UTC days to include, ending today
+        
+    Returns:
+        Per-day breakdown (oldest first) and totals for the window
+    """
+    first_day = datetime.utcnow().date() - timedelta(days=days - 1)
+    
+    rows = (
+        db.query(MerchantDailyStats)
+        .filter(
+            MerchantDailyStats.merchant_id == merchant.id,
+            MerchantDailyStats.day >= first_day
+        )
+        .all()
+    )
+    
+    by_day: dict = {}
+    for row in rows:
+        day = by_day.setdefault(row.day, {"volume": 0, "fees": 0, "succeeded": 0, "failed": 0})
+        if row.status == "succeeded":
+            day["volume"] += row.amount_cents
+            day["fees"] += row.protega_fee_cents
+            day["succeeded"] += row.txn_count
+        else:
+            day["failed"] += row.txn_count
+    
+    items = []
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        totals = by_day.get(day, {"volume": 0, "fees": 0, "succeeded": 0, "failed": 0})
+        items.append(MerchantDailySummary(
+            day=day,
+            volume_cents=totals["volume"],
+            protega_fee_cents=totals["fees"],
+            succeeded_count=totals["succeeded"],
+            failed_count=totals["failed"],
+            success_rate=_success_rate(totals["succeeded"], totals["failed"])
+        ))
+    
+    succeeded = sum(item.succeeded_count for item in items)
+    failed = sum(item.failed_count for item in items)
+    
+    return MerchantSummaryResponse(
+        days=items,
+        volume_cents=sum(item.volume_cents for item in items),
+        protega_fee_cents=sum(item.protega_fee_cents for item in items),
+        succeeded_count=succeeded,
+        failed_count=failed,
+        success_rate=_success_rate(succeeded, failed)
+    )
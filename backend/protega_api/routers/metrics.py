@@ -0,0 +1,26 @@
+"""Prometheus metrics endpoint."""
+
+import hmac
+
+from fastapi import APIRouter, Header, HTTPException, Response, status
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from protega_api.config import settings
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics(authorization: str | None = Header(None)):
+    """
+    Prometheus exposition of this worker's metrics (see protega_api.metrics).
+    
+    Requires "Authorization: Bearer <METRICS_TOKEN>" when a token is configured;
+    in production the endpoint is only mounted with one (see
+    Settings.metrics_endpoint_enabled).
+    """
+    if settings.metrics_token:
+        expected = f"Bearer {settings.metrics_token}"
+        if not authorization or not hmac.compare_digest(authorization, expected):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -11,6 +11,8 @@ from protega_api.adapters.hashing import verify_template_hash
 from protega_api.adapters.hardware import get_hardware_adapter
 from protega_api.adapters.payments import charge
 from protega_api.db import get_db
+from protega_api.events import publish_transaction_created
+from protega_api.metrics import PayStageTimer, observe_candidates
 from protega_api.models import (
     BiometricTemplate,
     PaymentMethod,
@@ -20,6 +22,7 @@ from protega_api.models import (
     User,
     PaymentProvider,
 )
+from protega_api.rollups import record_transaction
 from protega_api.schemas import PayRequest, PayResponse, IdentifyUserRequest
 
 router = APIRouter(tags=["payments"])
@@ -57,6 +60,7 @@ def identify_user_by_fingerprint(
     
     # Match against all biometric templates
     templates = db.query(BiometricTemplate).all()
+    observe_candidates("identify", len(templates))
     
     matched_user_id = None
     for template in templates:
@@ -108,6 +112,7 @@ def process_payment(
         Payment result with transaction ID and status
     """
     logger.info("Payment request received")
+    stages = PayStageTimer()
     
     # Step 1: Authenticate terminal
     terminal = db.query(Terminal).filter(
@@ -123,6 +128,7 @@ def process_payment(
     
     merchant_id = terminal.merchant_id
     logger.info(f"Authenticated terminal for merchant: {merchant_id}")
+    stages.lap("terminal_auth")
     
     # Step 2: Normalize fingerprint sample
     try:
@@ -134,12 +140,14 @@ def process_payment(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid fingerprint sample"
         )
+    stages.lap("normalize")
     
     # Step 3: Find matching biometric template
     # Retrieve all active templates
     active_templates = db.query(BiometricTemplate).filter(
         BiometricTemplate.active == True
     ).all()
+    observe_candidates("pay", len(active_templates))
     
     matched_template = None
     for template in active_templates:
@@ -150,6 +158,7 @@ def process_payment(
         ):
             matched_template = template
             break
+    stages.lap("match")
     
     if not matched_template:
         logger.warning("No matching biometric template found")
@@ -164,7 +173,10 @@ def process_payment(
             merchant_ref=request.merchant_ref
         )
         db.add(transaction)
+        record_transaction(db, transaction)
         db.commit()
+        stages.lap("commit")
+        publish_transaction_created(transaction)
         
         return PayResponse(
             status="failed",
@@ -184,6 +196,7 @@ def process_payment(
             PaymentMethod.provider == PaymentProvider.STRIPE,
             PaymentMethod.provider_payment_method_id == request.payment_method_provider_ref
         ).first()
+        stages.lap("pm_lookup")
         
         if not payment_method:
             logger.error(f"Specified payment method not found: {request.payment_method_provider_ref}")
@@ -197,7 +210,10 @@ def process_payment(
                 merchant_ref=request.merchant_ref
             )
             db.add(transaction)
+            record_transaction(db, transaction)
             db.commit()
+            stages.lap("commit")
+            publish_transaction_created(transaction)
             
             return PayResponse(
                 status="failed",
@@ -211,6 +227,7 @@ def process_payment(
             PaymentMethod.provider == PaymentProvider.STRIPE,
             PaymentMethod.is_default == True
         ).first()
+        stages.lap("pm_lookup")
         
         if not payment_method:
             logger.error(f"No default payment method for user: {user.id}")
@@ -224,7 +241,10 @@ def process_payment(
                 merchant_ref=request.merchant_ref
             )
             db.add(transaction)
+            record_transaction(db, transaction)
             db.commit()
+            stages.lap("commit")
+            publish_transaction_created(transaction)
             
             return PayResponse(
                 status="failed",
@@ -267,6 +287,7 @@ def process_payment(
         payment_status = "failed"
         intent_id = None
         protega_fee_cents = 0  # Don't charge fee if payment fails
+    stages.lap("stripe_charge")
     
     # Step 7: Record transaction (with Protega fee tracked)
     transaction = Transaction(
@@ -280,8 +301,11 @@ def process_payment(
         merchant_ref=request.merchant_ref
     )
     db.add(transaction)
+    record_transaction(db, transaction)
     db.commit()
     db.refresh(transaction)
+    stages.lap("commit")
+    publish_transaction_created(transaction)
     
     if payment_status == "succeeded":
         return PayResponse(
@@ -2,14 +2,21 @@
 
 import logging
 from typing import Annotated, List
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
 from protega_api import models, schemas
 from protega_api.adapters import payments
+from protega_api.charge_registry import (
+    find_pending_transaction,
+    invalidate_pending_charge_from_thread,
+    pending_charges,
+)
+from protega_api.config import settings
 from protega_api.deps import get_db
+from protega_api.rollups import record_transaction
 
 logger = logging.getLogger(__name__)
 
@@ -25,13 +32,20 @@ def list_user_transactions(
     user_id: int,
     db: Annotated[Session, Depends(get_db)],
     limit: int = 100,
-    offset: int = 0
+    offset: int = 0,
+    created_after: datetime | None = None,
+    created_before: datetime | None = None
 ):
     """
     Retrieve all transactions for a specific user.
     
     Returns list of transactions with details like amount, date, and status.
     Only shows non-sensitive information.
+    
+    created_after/created_before restrict the scan to the matching monthly
+    partitions of the transactions table. Without created_after, only the
+    last TRANSACTION_LIST_DEFAULT_DAYS are listed; pass an earlier bound for
+    older history.
     """
     # Verify user exists
     user = db.query(models.User).filter(models.User.id == user_id).first()
@@ -41,19 +55,23 @@ def list_user_transactions(
             detail=f"User {user_id} not found"
         )
     
+    if created_after is None:
+        created_after = (created_before or datetime.utcnow()) - timedelta(days=settings.transaction_list_default_days)
+    filters = [models.Transaction.user_id == user_id, models.Transaction.created_at >= created_after]
+    if created_before is not None:
+        filters.append(models.Transaction.created_at < created_before)
+    
     # Get all transactions for user
     transactions = (
         db.query(models.Transaction)
-        .filter(models.Transaction.user_id == user_id)
+        .filter(*filters)
         .order_by(models.Transaction.created_at.desc())
         .limit(limit)
         .offset(offset)
         .all()
     )
     
-    total = db.query(models.Transaction).filter(
-        models.Transaction.user_id == user_id
-    ).count()
+    total = db.query(models.Transaction).filter(*filters).count()
     
     items = []
     for txn in transactions:
@@ -345,25 +363,33 @@ def get_charge_details(
     """
     Get charge details and user's payment methods.
     Used by customer acceptance terminal.
-    """
-    # Find the pending transaction by charge_id
-    transaction = (
-        db.query(models.Transaction)
-        .filter(
-            models.Transaction.metadata['charge_id'].astext == charge_id,
-            models.Transaction.status == 'pending'
-        )
-        .first()
-    )
     
-    if not transaction:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Charge not found or already processed"
-        )
+    Charge details are served from the in-memory pending charge registry
+    when possible; on a miss the charge key gives the transaction's partition.
+    """
+    charge = pending_charges.get(charge_id)
     
-    # Get merchant info
-    merchant = db.query(models.Merchant).filter(models.Merchant.id == transaction.merchant_id).first()
+    if charge is None:
+        # Find the pending transaction by charge_id
+        transaction = find_pending_transaction(db, charge_id)
+        
+        if not transaction:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Charge not found or already processed"
+            )
+        
+        # Get merchant info
+        merchant = db.query(models.Merchant).filter(models.Merchant.id == transaction.merchant_id).first()
+        
+        charge = {
+            "merchant_id": transaction.merchant_id,
+            "merchant_name": merchant.name if merchant else "Unknown Merchant",
+            "amount_cents": transaction.amount_cents,
+            "description": transaction.description,
+            "status": transaction.status,
+        }
+        pending_charges.put(charge_id, charge)
     
     # For now, return all payment methods (in real scenario, you'd identify user first)
     # This is a placeholder - you'd want to get user from session or charge metadata
@@ -384,10 +410,10 @@ def get_charge_details(
     
     return {
         "charge_id": charge_id,
-        "amount_cents": transaction.amount_cents,
-        "description": transaction.description,
-        "merchant_name": merchant.name if merchant else "Unknown Merchant",
-        "status": transaction.status,
+        "amount_cents": charge["amount_cents"],
+        "description": charge["description"],
+        "merchant_name": charge["merchant_name"],
+        "status": charge["status"],
         "payment_methods": payment_methods_list
     }
 
@@ -395,11 +421,15 @@ def get_charge_details(
 @router.post("/customer/charge/{charge_id}/accept")
 def accept_charge(
     charge_id: str,
-    request: dict,  # {"payment_method_id": int}
+    request: dict,  # {"payment_method_id": int, "amount_cents": int}
     db: Annotated[Session, Depends(get_db)]
 ):
     """
     Accept a charge and process payment.
+    
+    amount_cents is the amount the customer was shown and confirmed; it must
+    match the pending transaction, so a charge the merchant changed after
+    the page loaded (or a stale cached snapshot) is never paid unseen.
     """
     payment_method_id = request.get("payment_method_id")
     if not payment_method_id:
@@ -407,23 +437,30 @@ def accept_charge(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="payment_method_id is required"
         )
-    
-    # Find the pending transaction
-    transaction = (
-        db.query(models.Transaction)
-        .filter(
-            models.Transaction.metadata['charge_id'].astext == charge_id,
-            models.Transaction.status == 'pending'
+    confirmed_amount_cents = request.get("amount_cents")
+    if not isinstance(confirmed_amount_cents, int) or isinstance(confirmed_amount_cents, bool):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="amount_cents is required"
         )
-        .first()
-    )
+    
+    # Find the pending transaction, locked so the amount cannot change until commit
+    transaction = find_pending_transaction(db, charge_id, for_update=True)
     
     if not transaction:
+        invalidate_pending_charge_from_thread(charge_id)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Charge not found or already processed"
         )
     
+    if transaction.amount_cents != confirmed_amount_cents:
+        invalidate_pending_charge_from_thread(charge_id)
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Charge amount has changed; please review the updated amount"
+        )
+    
     # Get payment method
     payment_method = db.query(models.PaymentMethod).filter(models.PaymentMethod.id == payment_method_id).first()
     if not payment_method:
@@ -454,8 +491,10 @@ def accept_charge(
             "accepted_at": datetime.utcnow().isoformat(),
             "payment_intent_id": result.payment_intent_id
         }
+        record_transaction(db, transaction)
         
         db.commit()
+        invalidate_pending_charge_from_thread(charge_id)
         
         logger.info(f"Charge {charge_id} accepted and paid with payment method {payment_method_id}")
         
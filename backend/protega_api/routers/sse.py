@@ -0,0 +1,148 @@
+"""Server-Sent Events feed for merchant dashboards."""
+
+import asyncio
+import json
+import logging
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, Header, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+
+from protega_api.config import settings
+from protega_api.security import verify_jwt
+
+router = APIRouter(prefix="/merchant", tags=["merchant"])
+logger = logging.getLogger(__name__)
+
+# (event_id, event_type, serialized data)
+BufferedEvent = Tuple[str, str, str]
+
+
+class MerchantEventBuffer:
+    """
+    Bounded per-merchant ring buffer of recent transaction events.
+
+    Every worker receives every broker message in the same order, so any
+    worker can resume a client from the Last-Event-ID it saw on another.
+    Event IDs are transaction IDs.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._events: Dict[int, Deque[BufferedEvent]] = {}
+        self._changed: Dict[int, asyncio.Event] = {}
+
+    def append(self, merchant_id: int, message: dict) -> None:
+        """Buffer a transaction event and wake the merchant's streams."""
+        transaction_id = message.get("transaction_id")
+        if transaction_id is None:
+            return
+        events = self._events.setdefault(merchant_id, deque(maxlen=self.size))
+        events.append((
+            str(transaction_id),
+            message.get("event_type", "message"),
+            json.dumps(message),
+        ))
+        # Wake current waiters; later waiters get a fresh event
+        changed = self._changed.pop(merchant_id, None)
+        if changed is not None:
+            changed.set()
+
+    def changed(self, merchant_id: int) -> asyncio.Event:
+        """Event set on the next append for this merchant."""
+        return self._changed.setdefault(merchant_id, asyncio.Event())
+
+    def latest_id(self, merchant_id: int) -> Optional[str]:
+        """ID of the newest buffered event, or None if nothing is buffered."""
+        events = self._events.get(merchant_id)
+        return events[-1][0] if events else None
+
+    def since(self, merchant_id: int, last_event_id: Optional[str]) -> List[BufferedEvent]:
+        """
+        Events after `last_event_id` (None: every buffered event).
+
+        Resumes from the position of that ID in the buffer. If it has already
+        been evicted, falls back to every buffered event with a higher ID.
+        """
+        events = list(self._events.get(merchant_id, ()))
+        if last_event_id is None:
+            return events
+        for index, (event_id, _, _) in enumerate(events):
+            if event_id == last_event_id:
+                return events[index + 1:]
+        try:
+            last = int(last_event_id)
+        except ValueError:
+            return events
+        return [event for event in events if int(event[0]) > last]
+
+
+# Global buffer (fed by websocket.deliver_local on every worker)
+merchant_events = MerchantEventBuffer(settings.sse_buffer_size)
+
+
+def _merchant_id_from_token(token: Optional[str]) -> int:
+    payload = verify_jwt(token) if token else None
+    try:
+        return int(payload["sub"])
+    except (TypeError, KeyError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+def _format(event: BufferedEvent) -> str:
+    event_id, event_type, data = event
+    return f"id: {event_id}\nevent: {event_type}\ndata: {data}\n\n"
+
+
+@router.get("/events")
+async def merchant_event_stream(
+    request: Request,
+    token: Optional[str] = Query(None, description="JWT (EventSource cannot send headers)"),
+    last_event_id: Optional[str] = Query(None, description="Resume after this event ID on first connect"),
+    authorization: Optional[str] = Header(None),
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID"),
+):
+    """
+    Stream the authenticated merchant's transaction events as Server-Sent Events.
+
+    Browsers resend Last-Event-ID automatically when they reconnect, and the
+    events missed in between are replayed from the in-memory buffer
+    (SSE_BUFFER_SIZE per merchant) before live events resume.
+
+    Args:
+        token: JWT, if not sent as an Authorization header
+        last_event_id: Initial resume point (the Last-Event-ID header wins)
+    """
+    if authorization and authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    merchant_id = _merchant_id_from_token(token)
+    resume_from = last_event_id_header or last_event_id
+
+    # A new client starts after the newest buffered event: live events only
+    start_after = resume_from or merchant_events.latest_id(merchant_id)
+
+    async def stream():
+        cursor = start_after
+        yield f"retry: {settings.sse_retry_ms}\n\n"
+        while not await request.is_disconnected():
+            # Grab the wakeup before reading so an append in between is not missed
+            changed = merchant_events.changed(merchant_id)
+            for event in merchant_events.since(merchant_id, cursor):
+                yield _format(event)
+                cursor = event[0]
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=settings.sse_keepalive_seconds)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+
+    logger.debug(f"SSE stream opened for merchant {merchant_id} (resume from {resume_from})")
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
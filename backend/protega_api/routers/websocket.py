@@ -1,81 +1,318 @@
 """WebSocket endpoints for real-time updates."""
 
+import asyncio
 import json
 import logging
-from typing import List
+import time
+from typing import Callable, List
 from datetime import datetime
 
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, status
+from starlette.websockets import WebSocketState
 from sqlalchemy.orm import Session
 
+from protega_api.broker import broker
+from protega_api.charge_registry import pending_charges
+from protega_api.config import settings
 from protega_api.db import get_db
+from protega_api.routers.sse import merchant_events
 from protega_api.schemas import RealTimeTransactionEvent
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+class ClientConnection:
+    """
+    One subscribed WebSocket with its own bounded outbound queue.
+    
+    Broadcasts only enqueue; a dedicated writer task drains the queue, so a
+    slow or stalled client never delays anyone else. When the queue is full
+    the slow-consumer policy applies:
+    - drop_oldest: discard the oldest queued message to make room
+    - disconnect: close the socket (the client reconnects and resyncs)
+    A failed or timed-out send closes the connection and removes it from
+    the manager.
+    """
+    
+    def __init__(
+        self,
+        websocket: WebSocket,
+        on_failed: Callable[["ClientConnection"], None],
+        queue_size: int,
+        policy: str,
+        send_timeout: float,
+    ):
+        self.websocket = websocket
+        self.on_failed = on_failed
+        self.policy = policy
+        self.send_timeout = send_timeout
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.closed = False
+        self.last_activity = time.monotonic()  # Connect time or last frame received from the client
+        self._writer: asyncio.Task | None = None
+        self._closer: asyncio.Task | None = None
+    
+    def start(self) -> None:
+        """Start the writer task."""
+        self._writer = asyncio.create_task(self._run())
+    
+    def touch(self) -> None:
+        """Record a frame received from the client (sends do not count: a dead peer still accepts them)."""
+        self.last_activity = time.monotonic()
+    
+    @property
+    def is_stale(self) -> bool:
+        """True if the socket is gone but the entry is still registered."""
+        return (
+            self.closed
+            or (self._writer is not None and self._writer.done())
+            or self.websocket.client_state == WebSocketState.DISCONNECTED
+        )
+    
+    def enqueue(self, message: dict | str) -> bool:
+        """
+        Queue a message without waiting.
+        
+        Broadcasts pass pre-serialized JSON text so it is encoded once for
+        all subscribers rather than once per socket.
+        
+        Returns:
+            False if the connection is closed or was closed by the policy
+        """
+        if self.closed:
+            return False
+        if self.queue.full():
+            if self.policy == "disconnect":
+                logger.warning("Closing slow WebSocket consumer (send queue full)")
+                self._fail()
+                self.evict(status.WS_1013_TRY_AGAIN_LATER)
+                return False
+            self.queue.get_nowait()
+            logger.debug("Dropped oldest queued WebSocket message for slow consumer")
+        self.queue.put_nowait(message)
+        return True
+    
+    async def _run(self) -> None:
+        try:
+            while True:
+                message = await self.queue.get()
+                if isinstance(message, str):
+                    send = self.websocket.send_text(message)
+                else:
+                    send = self.websocket.send_json(message)
+                await asyncio.wait_for(send, timeout=self.send_timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"WebSocket send failed, dropping connection: {e}")
+            self._fail()
+            await self._close_socket(status.WS_1011_INTERNAL_ERROR)
+    
+    def _fail(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self.on_failed(self)
+    
+    async def _close_socket(self, code: int) -> None:
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass  # Already gone
+    
+    def stop(self) -> None:
+        """Mark closed and stop the writer task."""
+        self.closed = True
+        if self._writer is not None and not self._writer.done():
+            self._writer.cancel()
+    
+    def evict(self, code: int) -> None:
+        """Stop the connection and close its socket in the background."""
+        self.stop()
+        self._closer = asyncio.create_task(self._close_socket(code))
+
+
 # Connection manager for WebSocket clients
 class ConnectionManager:
-    def __init__(self):
+    def __init__(
+        self,
+        queue_size: int = settings.ws_send_queue_size,
+        policy: str = settings.ws_slow_consumer_policy,
+        send_timeout: float = settings.ws_send_timeout_seconds,
+    ):
         # Dictionary to store active connections by merchant_id
-        self.active_connections: dict[int, List[WebSocket]] = {}
+        self.active_connections: dict[int, List[ClientConnection]] = {}
         # Dictionary to store connections by charge_id (for customer views)
-        self.charge_connections: dict[str, List[WebSocket]] = {}
+        self.charge_connections: dict[str, List[ClientConnection]] = {}
+        self.queue_size = queue_size
+        self.policy = policy
+        self.send_timeout = send_timeout
+        self._reaper: asyncio.Task | None = None
     
-    async def connect(self, websocket: WebSocket, merchant_id: int):
-        """Accept a new WebSocket connection for a merchant."""
+    @staticmethod
+    def _remove(groups: dict, key, connection: ClientConnection) -> bool:
+        """Remove a connection from a group; returns False if it was already gone."""
+        members = groups.get(key)
+        if not members or connection not in members:
+            return False
+        members.remove(connection)
+        if not members:
+            del groups[key]
+        return True
+    
+    @staticmethod
+    def _find(groups: dict, key, websocket: WebSocket) -> ClientConnection | None:
+        for connection in groups.get(key, []):
+            if connection.websocket is websocket:
+                return connection
+        return None
+    
+    async def _accept(self, websocket: WebSocket, groups: dict, key) -> ClientConnection:
         await websocket.accept()
-        if merchant_id not in self.active_connections:
-            self.active_connections[merchant_id] = []
-        self.active_connections[merchant_id].append(websocket)
+        connection = ClientConnection(
+            websocket,
+            on_failed=lambda conn: self._remove(groups, key, conn),
+            queue_size=self.queue_size,
+            policy=self.policy,
+            send_timeout=self.send_timeout,
+        )
+        groups.setdefault(key, []).append(connection)
+        connection.start()
+        return connection
+    
+    async def connect(self, websocket: WebSocket, merchant_id: int) -> ClientConnection:
+        """Accept a new WebSocket connection for a merchant."""
+        connection = await self._accept(websocket, self.active_connections, merchant_id)
         logger.info(f"WebSocket connected for merchant {merchant_id}")
+        return connection
     
-    async def connect_to_charge(self, websocket: WebSocket, charge_id: str):
+    async def connect_to_charge(self, websocket: WebSocket, charge_id: str) -> ClientConnection:
         """Accept a new WebSocket connection for a customer viewing a charge."""
-        await websocket.accept()
-        if charge_id not in self.charge_connections:
-            self.charge_connections[charge_id] = []
-        self.charge_connections[charge_id].append(websocket)
+        connection = await self._accept(websocket, self.charge_connections, charge_id)
         logger.info(f"WebSocket connected for charge {charge_id}")
+        return connection
     
     def disconnect(self, websocket: WebSocket, merchant_id: int):
-        """Remove a WebSocket connection."""
-        if merchant_id in self.active_connections:
-            self.active_connections[merchant_id].remove(websocket)
-            if not self.active_connections[merchant_id]:
-                del self.active_connections[merchant_id]
+        """Remove a WebSocket connection (safe to call more than once)."""
+        connection = self._find(self.active_connections, merchant_id, websocket)
+        if connection:
+            connection.stop()
+            self._remove(self.active_connections, merchant_id, connection)
         logger.info(f"WebSocket disconnected for merchant {merchant_id}")
     
     def disconnect_from_charge(self, websocket: WebSocket, charge_id: str):
-        """Remove a WebSocket connection for a charge."""
-        if charge_id in self.charge_connections:
-            self.charge_connections[charge_id].remove(websocket)
-            if not self.charge_connections[charge_id]:
-                del self.charge_connections[charge_id]
+        """Remove a WebSocket connection for a charge (safe to call more than once)."""
+        connection = self._find(self.charge_connections, charge_id, websocket)
+        if connection:
+            connection.stop()
+            self._remove(self.charge_connections, charge_id, connection)
         logger.info(f"WebSocket disconnected for charge {charge_id}")
     
+    @staticmethod
+    def _fan_out(connections: List[ClientConnection], message: dict) -> int:
+        """Serialize a message once and queue it on every connection; returns how many accepted it."""
+        if not connections:
+            return 0
+        text = json.dumps(message)
+        # Copy: a full queue under the disconnect policy removes members mid-loop
+        return sum(1 for connection in list(connections) if connection.enqueue(text))
+    
     async def send_to_merchant(self, merchant_id: int, message: dict):
         """Send a message to all connections for a merchant."""
-        if merchant_id in self.active_connections:
-            for connection in self.active_connections[merchant_id]:
-                try:
-                    await connection.send_json(message)
-                except Exception as e:
-                    logger.error(f"Error sending to merchant {merchant_id}: {e}")
+        return self._fan_out(self.active_connections.get(merchant_id, []), message)
     
     async def send_to_charge(self, charge_id: str, message: dict):
         """Send a message to all customer connections viewing a charge."""
-        if charge_id in self.charge_connections:
-            for connection in self.charge_connections[charge_id]:
-                try:
-                    await connection.send_json(message)
-                except Exception as e:
-                    logger.error(f"Error sending to charge {charge_id}: {e}")
-
-# Global connection manager
+        return self._fan_out(self.charge_connections.get(charge_id, []), message)
+    
+    def reap(self, idle_timeout: float = 0) -> int:
+        """
+        Evict stale connections, and idle ones if `idle_timeout` > 0.
+        
+        Returns:
+            Number of connections evicted
+        """
+        now = time.monotonic()
+        evicted = 0
+        for groups in (self.active_connections, self.charge_connections):
+            for key in list(groups):
+                for connection in list(groups.get(key, [])):
+                    idle = idle_timeout > 0 and now - connection.last_activity > idle_timeout
+                    if connection.is_stale or idle:
+                        self._remove(groups, key, connection)
+                        connection.evict(status.WS_1001_GOING_AWAY)
+                        evicted += 1
+        return evicted
+    
+    async def _reap_forever(self, interval: float, idle_timeout: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                evicted = self.reap(idle_timeout)
+                if evicted:
+                    logger.info(f"Reaped {evicted} stale WebSocket connections")
+            except Exception as e:
+                logger.error(f"WebSocket reaper failed: {e}")
+    
+    def start_reaper(self, interval: float, idle_timeout: float) -> None:
+        """Start the background reaper (called from the application lifespan)."""
+        self._reaper = asyncio.create_task(self._reap_forever(interval, idle_timeout))
+    
+    async def stop_reaper(self) -> None:
+        """Stop the background reaper."""
+        if self._reaper is not None:
+            self._reaper.cancel()
+            try:
+                await self._reaper
+            except asyncio.CancelledError:
+                pass
+            self._reaper = None
+    
+    def stats(self) -> dict:
+        """Connection gauges for this worker."""
+        merchant_conns = [c for conns in self.active_connections.values() for c in conns]
+        charge_conns = [c for conns in self.charge_connections.values() for c in conns]
+        return {
+            "merchant_connections": len(merchant_conns),
+            "charge_connections": len(charge_conns),
+            "merchants": len(self.active_connections),
+            "charges": len(self.charge_connections),
+            "queued_messages": sum(c.queue.qsize() for c in merchant_conns + charge_conns),
+        }
+
+# Global connection manager (this worker's sockets only)
 manager = ConnectionManager()
 
 
+@router.get("/ws/stats")
+def websocket_stats():
+    """WebSocket connection gauges for this worker."""
+    return manager.stats()
+
+
+async def deliver_local(envelope: dict) -> None:
+    """
+    Fan a broker envelope out to the matching sockets on this worker.
+    
+    An envelope carries either one "message" or a batch of "messages";
+    sockets always receive individual messages. "charge_registry" envelopes
+    carry no message and invalidate a cached pending charge.
+    """
+    target = envelope.get("target")
+    if target == "charge_registry":
+        pending_charges.discard(str(envelope["key"]))
+        return
+    messages = envelope["messages"] if "messages" in envelope else [envelope["message"]]
+    for message in messages:
+        if target == "merchant":
+            merchant_events.append(int(envelope["key"]), message)
+            await manager.send_to_merchant(int(envelope["key"]), message)
+        elif target == "charge":
+            await manager.send_to_charge(str(envelope["key"]), message)
+        else:
+            logger.warning(f"Ignoring broker envelope with unknown target: {target}")
+            return
+
+
 @router.websocket("/ws/merchant/{merchant_id}")
 async def websocket_merchant_updates(websocket: WebSocket, merchant_id: int):
     """
@@ -87,20 +324,24 @@ async def websocket_merchant_updates(websocket: WebSocket, merchant_id: int):
     - Balance updates
     - System notifications
     """
-    await manager.connect(websocket, merchant_id)
+    connection = await manager.connect(websocket, merchant_id)
     
     try:
         while True:
             # Keep connection alive and handle any incoming messages
             data = await websocket.receive_text()
-            logger.info(f"Received from merchant {merchant_id}: {data}")
+            connection.touch()
+            logger.debug(f"Received from merchant {merchant_id}: {data}")
             
-            # Echo back for heartbeat/ping
-            await websocket.send_json({"type": "pong", "data": data})
+            # Echo back for heartbeat/ping (through the queue: one writer per socket)
+            connection.enqueue({"type": "pong", "data": data})
             
     except WebSocketDisconnect:
-        manager.disconnect(websocket, merchant_id)
         logger.info(f"Merchant {merchant_id} disconnected")
+    except RuntimeError:
+        pass  # Socket already closed by the send path
+    finally:
+        manager.disconnect(websocket, merchant_id)
 
 
 async def broadcast_transaction_event(
@@ -112,7 +353,8 @@ async def broadcast_transaction_event(
     """
     Broadcast a transaction event to all WebSocket connections for a merchant.
     
-    Called from other routers when transactions complete.
+    Called from other routers when transactions complete. Published through
+    the broker so sockets on every worker receive it.
     """
     event = RealTimeTransactionEvent(
         event_type=event_type,
@@ -122,14 +364,25 @@ async def broadcast_transaction_event(
         timestamp=datetime.utcnow()
     )
     
-    await manager.send_to_merchant(
-        merchant_id,
-        event.model_dump()
-    )
+    await broker.publish({
+        "target": "merchant",
+        "key": merchant_id,
+        "message": event.model_dump(mode="json"),
+    })
     
     logger.info(f"Broadcast {event_type} event to merchant {merchant_id}")
 
 
+async def broadcast_merchant_events(merchant_id: int, events: List[dict]):
+    """
+    Broadcast a batch of already-serialized events to a merchant in one publish.
+    
+    Used by the transaction event bus (protega_api.events).
+    """
+    await broker.publish({"target": "merchant", "key": merchant_id, "messages": events})
+    logger.info(f"Broadcast {len(events)} events to merchant {merchant_id}")
+
+
 @router.websocket("/ws/charge/{charge_id}")
 async def websocket_charge_updates(websocket: WebSocket, charge_id: str):
     """
@@ -137,28 +390,65 @@ async def websocket_charge_updates(websocket: WebSocket, charge_id: str):
     
     Customers connect here to receive live updates when merchant changes amount/description.
     """
-    await manager.connect_to_charge(websocket, charge_id)
+    connection = await manager.connect_to_charge(websocket, charge_id)
     
     try:
         while True:
             # Keep connection alive
             data = await websocket.receive_text()
-            logger.info(f"Received from charge {charge_id}: {data}")
+            connection.touch()
+            logger.debug(f"Received from charge {charge_id}: {data}")
             
             # Echo back for heartbeat
-            await websocket.send_json({"type": "pong", "data": data})
+            connection.enqueue({"type": "pong", "data": data})
             
     except WebSocketDisconnect:
-        manager.disconnect_from_charge(websocket, charge_id)
         logger.info(f"Charge {charge_id} disconnected")
+    except RuntimeError:
+        pass  # Socket already closed by the send path
+    finally:
+        manager.disconnect_from_charge(websocket, charge_id)
 
 
-async def broadcast_charge_update(charge_id: str, update_data: dict):
+class ChargeUpdateCoalescer:
     """
-    Broadcast charge updates to all customer connections viewing this charge.
+    Collapses rapid updates to the same charge into one broadcast.
     
-    Called when merchant updates the amount or description.
+    The first update for a charge starts a window of `window_seconds`; later
+    updates within it only replace the pending state. When the window ends,
+    the latest state is broadcast once. Customers therefore see at most one
+    update per window per charge, never a stale one. A window of 0 disables
+    coalescing.
     """
+    
+    def __init__(self, window_seconds: float):
+        self.window_seconds = window_seconds
+        self._pending: dict[str, dict] = {}
+        self._tasks: set[asyncio.Task] = set()
+    
+    async def submit(self, charge_id: str, update_data: dict) -> None:
+        """Record the latest state of a charge and schedule its broadcast."""
+        if self.window_seconds <= 0:
+            await _publish_charge_update(charge_id, update_data)
+            return
+        first_in_window = charge_id not in self._pending
+        self._pending[charge_id] = update_data
+        if first_in_window:
+            asyncio.get_running_loop().call_later(self.window_seconds, self._flush, charge_id)
+    
+    def _flush(self, charge_id: str) -> None:
+        update_data = self._pending.pop(charge_id, None)
+        if update_data is None:
+            return
+        task = asyncio.create_task(_publish_charge_update(charge_id, update_data))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+charge_updates = ChargeUpdateCoalescer(settings.charge_update_debounce_ms / 1000)
+
+
+async def _publish_charge_update(charge_id: str, update_data: dict) -> None:
     message = {
         "type": "charge_update",
         "charge_id": charge_id,
@@ -166,6 +456,21 @@ async def broadcast_charge_update(charge_id: str, update_data: dict):
         "timestamp": datetime.utcnow().isoformat()
     }
     
-    await manager.send_to_charge(charge_id, message)
+    try:
+        await broker.publish({"target": "charge", "key": charge_id, "message": message})
+    except Exception as e:
+        logger.error(f"Failed to broadcast charge update for {charge_id}: {e}")
+        return
     logger.info(f"Broadcast charge update for {charge_id}: {update_data}")
 
+
+async def broadcast_charge_update(charge_id: str, update_data: dict):
+    """
+    Broadcast charge updates to all customer connections viewing this charge.
+    
+    Called when merchant updates the amount or description. Rapid updates
+    are coalesced (CHARGE_UPDATE_DEBOUNCE_MS) so only the latest state is
+    sent, then published through the broker so sockets on every worker
+    receive it.
+    """
+    await charge_updates.submit(charge_id, update_data)
@@ -1,6 +1,6 @@
 """Pydantic schemas for request/response validation."""
 
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional
 
 from pydantic import BaseModel, EmailStr, Field, field_validator
@@ -26,6 +26,7 @@ class EnrollRequest(BaseModel):
     )
     consent_text: str = Field(..., min_length=10)
     stripe_payment_method_token: str = Field(..., min_length=1)
+    device_id: Optional[str] = Field(None, max_length=255, description="Enrolling terminal/device identifier")
 
     @field_validator("full_name")
     @classmethod
@@ -192,6 +193,28 @@ class TransactionsListResponse(BaseModel):
     total: int
 
 
+class MerchantDailySummary(BaseModel):
+    """One day of merchant volume, fees and outcomes."""
+    
+    day: date
+    volume_cents: int  # Succeeded transaction amounts
+    protega_fee_cents: int
+    succeeded_count: int
+    failed_count: int
+    success_rate: Optional[float] = None  # None when no final transactions that day
+
+
+class MerchantSummaryResponse(BaseModel):
+    """Dashboard summary served from the daily rollup."""
+    
+    days: list[MerchantDailySummary]
+    volume_cents: int
+    protega_fee_cents: int
+    succeeded_count: int
+    failed_count: int
+    success_rate: Optional[float] = None
+
+
 # ============================================================================
 # Payment Method Schemas
 # ============================================================================
@@ -0,0 +1,398 @@
+"""
+Long-lived fingerprint driver process.
+
+Spawning `dp_capture` / `ftr_capture` / `vf_capture` for every capture pays
+process start-up and device-open cost on each tap. A driver started with
+`--serve` stays running and answers JSON-lines requests on stdin/stdout:
+
+    -> {"id": 1, "cmd": "ping"}
+    <- {"id": 1, "ok": true}
+    -> {"id": 2, "cmd": "capture", "timeout": 30}
+    <- {"id": 2, "ok": true, "template": "<base64>"}
+    <- {"id": 2, "ok": false, "error": "timeout" | "cancelled" | "<message>"}
+    -> {"cmd": "cancel", "id": 2}   (abort capture 2; it answers "cancelled")
+    -> {"cmd": "shutdown"}
+
+Requests are handled in order; replies are matched to callers by id, so
+synchronous callers (blocking on an Event) and asyncio callers (awaiting a
+Future) can share one driver. Captures are additionally serialized on this
+side, so each one is only sent (and its hang deadline only starts) once
+the previous capture has finished. Drivers write logs to stderr only; stdout
+carries responses. See sim_driver.py for a reference implementation that
+needs no hardware.
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import subprocess
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Extra time allowed beyond the driver-side capture timeout before the
+# driver is considered hung and killed
+HANG_GRACE_SECONDS = 5.0
+
+# How often an asyncio caller queued behind another capture checks for its turn
+CAPTURE_QUEUE_POLL_SECONDS = 0.05
+
+
+class DriverError(Exception):
+    """The driver failed to answer a request."""
+    pass
+
+
+class DriverUnavailable(DriverError):
+    """The driver could not be started or does not speak the protocol."""
+    pass
+
+
+class DriverExited(DriverError):
+    """The driver process exited while a request was outstanding."""
+    pass
+
+
+class DriverHung(DriverError):
+    """The driver stopped answering; it is killed and restarted on next use."""
+    pass
+
+
+class CaptureTimeout(DriverError):
+    """No finger was presented before the capture timeout."""
+    pass
+
+
+class CaptureCancelled(DriverError):
+    """The capture was cancelled before it completed."""
+    pass
+
+
+class CaptureDaemon:
+    """
+    Manages one driver process and serializes requests to it.
+
+    The process is started on first use and restarted when it exits, hangs
+    or fails a health check (a ping after `health_check_interval` seconds
+    idle). More than `max_restarts` restarts within `restart_window`
+    seconds marks the driver unavailable.
+    """
+
+    def __init__(
+        self,
+        command: List[str],
+        name: str,
+        ping_timeout: float = 2.0,
+        health_check_interval: float = 30.0,
+        max_restarts: int = 5,
+        restart_window: float = 60.0,
+    ):
+        self.command = command
+        self.name = name
+        self.ping_timeout = ping_timeout
+        self.health_check_interval = health_check_interval
+        self.max_restarts = max_restarts
+        self.restart_window = restart_window
+        self._proc: Optional[subprocess.Popen] = None
+        self._waiters: Dict[int, Callable[[Optional[dict]], None]] = {}  # request id -> reply callback
+        self._waiters_lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()  # Guards starting and restarting the process
+        self._write_lock = threading.Lock()
+        self._capture_lock = threading.Lock()  # One capture in the driver at a time
+        self._restarts: deque = deque()
+        self._last_ok = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def _start(self) -> None:
+        now = time.monotonic()
+        while self._restarts and now - self._restarts[0] > self.restart_window:
+            self._restarts.popleft()
+        if len(self._restarts) >= self.max_restarts:
+            raise DriverUnavailable(f"{self.name} driver restarted {len(self._restarts)} times in {self.restart_window:.0f}s")
+        self._restarts.append(now)
+        self._fail_waiters()
+
+        try:
+            self._proc = subprocess.Popen(
+                self.command + ["--serve"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                text=True,
+                bufsize=1,
+            )
+        except OSError as e:
+            self._proc = None
+            raise DriverUnavailable(f"Failed to start {self.name} driver: {e}")
+
+        threading.Thread(
+            target=self._read, args=(self._proc,), daemon=True, name=f"{self.name}-driver-reader"
+        ).start()
+
+        if not self._ping():
+            self._kill()
+            raise DriverUnavailable(f"{self.name} driver did not answer the startup ping")
+        logger.info(f"{self.name} capture daemon started (pid {self._proc.pid})")
+
+    def _read(self, proc: subprocess.Popen) -> None:
+        """Reader thread: hand each reply to the caller waiting on its id."""
+        for line in proc.stdout:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                message = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Ignoring non-JSON driver output: {line[:80]}")
+                continue
+            with self._waiters_lock:
+                waiter = self._waiters.pop(message.get("id"), None)
+            if waiter is not None:
+                waiter(message)  # Late replies to abandoned requests are dropped
+
+        # EOF: the process exited; fail everything still waiting on it
+        if proc is self._proc:
+            self._fail_waiters()
+
+    def _fail_waiters(self) -> None:
+        with self._waiters_lock:
+            waiters, self._waiters = self._waiters, {}
+        for waiter in waiters.values():
+            waiter(None)
+
+    def _send(self, message: dict) -> None:
+        with self._write_lock:
+            try:
+                self._proc.stdin.write(json.dumps(message) + "\n")
+                self._proc.stdin.flush()
+            except (BrokenPipeError, OSError, AttributeError) as e:
+                raise DriverError(f"{self.name} driver is not accepting requests: {e}")
+
+    def _submit(self, cmd: str, waiter: Callable[[Optional[dict]], None], **params) -> int:
+        request_id = next(self._ids)
+        with self._waiters_lock:
+            self._waiters[request_id] = waiter
+        try:
+            self._send({"id": request_id, "cmd": cmd, **params})
+        except DriverError:
+            self._abandon(request_id)
+            raise
+        return request_id
+
+    def _abandon(self, request_id: int) -> None:
+        with self._waiters_lock:
+            self._waiters.pop(request_id, None)
+
+    def _result(self, cmd: str, message: Optional[dict]) -> dict:
+        if message is None:
+            raise DriverExited(f"{self.name} driver exited")
+        if message.get("ok"):
+            return message
+        error = message.get("error") or "unknown error"
+        if error == "timeout":
+            raise CaptureTimeout(f"{self.name} capture timed out")
+        if error == "cancelled":
+            raise CaptureCancelled(f"{self.name} {cmd} cancelled")
+        raise DriverError(f"{self.name} driver error: {error}")
+
+    def _call(self, cmd: str, wait: float, **params) -> dict:
+        """Send a request and block this thread until its reply (or `wait` seconds)."""
+        done = threading.Event()
+        reply: List[Optional[dict]] = []
+
+        def waiter(message: Optional[dict]) -> None:
+            reply.append(message)
+            done.set()
+
+        request_id = self._submit(cmd, waiter, **params)
+        if not done.wait(wait):
+            self._abandon(request_id)
+            raise DriverHung(f"{self.name} driver did not answer {cmd} within {wait:.0f}s")
+        return self._result(cmd, reply[0])
+
+    async def _call_async(self, cmd: str, wait: float, **params) -> dict:
+        """
+        Send a request and await its reply without occupying a thread.
+
+        If the awaiting task is cancelled, the driver is told to cancel the
+        request too.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def resolve(message: Optional[dict]) -> None:
+            if not future.done():
+                future.set_result(message)
+
+        def waiter(message: Optional[dict]) -> None:
+            loop.call_soon_threadsafe(resolve, message)
+
+        request_id = self._submit(cmd, waiter, **params)
+        try:
+            message = await asyncio.wait_for(future, wait)
+        except asyncio.TimeoutError:
+            self._abandon(request_id)
+            raise DriverHung(f"{self.name} driver did not answer {cmd} within {wait:.0f}s")
+        except asyncio.CancelledError:
+            self._abandon(request_id)
+            self.cancel(request_id)
+            raise
+        return self._result(cmd, message)
+
+    def _ping(self) -> bool:
+        try:
+            self._call("ping", self.ping_timeout)
+            self._last_ok = time.monotonic()
+            return True
+        except DriverError:
+            return False
+
+    def _ensure_healthy(self) -> None:
+        # The idle ping is skipped while requests are in flight: it would queue behind a capture
+        if not self.running:
+            if self._proc is not None:
+                logger.warning(f"{self.name} driver exited with code {self._proc.returncode}; restarting")
+            self._start()
+        elif not self._waiters and time.monotonic() - self._last_ok > self.health_check_interval and not self._ping():
+            logger.warning(f"{self.name} driver failed its health check; restarting")
+            self._kill()
+            self._start()
+
+    def _kill(self) -> None:
+        if self._proc is not None and self._proc.poll() is None:
+            self._proc.kill()
+            self._proc.wait()
+
+    def ping(self) -> bool:
+        """Health check: start the driver if needed and confirm it answers."""
+        with self._lock:
+            try:
+                self._ensure_healthy()
+                return True
+            except DriverError:
+                return False
+
+    def _ready(self, exited: bool = False) -> None:
+        """
+        Start, restart or health-check the driver before a capture.
+
+        Args:
+            exited: The driver just closed stdout; wait for it to exit first
+        """
+        with self._lock:
+            if exited and self._proc is not None:
+                try:
+                    self._proc.wait(timeout=2)
+                except subprocess.TimeoutExpired:
+                    self._kill()
+            self._ensure_healthy()
+
+    def capture(self, timeout: float) -> str:
+        """
+        Capture one template, blocking the calling thread.
+
+        Args:
+            timeout: Seconds to wait for a finger
+
+        Returns:
+            Base64-encoded template
+
+        Raises:
+            CaptureTimeout, CaptureCancelled, DriverHung, DriverUnavailable, DriverError
+        """
+        with self._capture_lock:
+            return self._capture(timeout)
+
+    def _capture(self, timeout: float) -> str:
+        self._ready()
+        for attempt in range(2):
+            try:
+                message = self._call("capture", timeout + HANG_GRACE_SECONDS, timeout=timeout)
+                break
+            except DriverExited:
+                # Died before answering (possibly before the request arrived): restart once
+                if attempt:
+                    raise
+                self._ready(exited=True)
+            except DriverHung:
+                # The driver missed its own deadline by the grace period
+                logger.error(f"{self.name} driver hung during capture; killing it")
+                self._kill()
+                raise
+        return self._template(message)
+
+    async def capture_async(self, timeout: float) -> str:
+        """
+        Capture one template without blocking the event loop or holding a thread.
+
+        Cancelling the awaiting task cancels the capture in the driver.
+        Starting or restarting the driver process runs in a worker thread.
+
+        Raises:
+            Same as capture(), plus asyncio.CancelledError
+        """
+        # Poll for the turn rather than block a thread on the lock, so a task
+        # cancelled while queued never acquires it afterwards
+        while not self._capture_lock.acquire(blocking=False):
+            await asyncio.sleep(CAPTURE_QUEUE_POLL_SECONDS)
+        try:
+            return await self._capture_async(timeout)
+        finally:
+            self._capture_lock.release()
+
+    async def _capture_async(self, timeout: float) -> str:
+        if not self.running or time.monotonic() - self._last_ok > self.health_check_interval:
+            await asyncio.to_thread(self._ready)
+        for attempt in range(2):
+            try:
+                message = await self._call_async("capture", timeout + HANG_GRACE_SECONDS, timeout=timeout)
+                break
+            except DriverExited:
+                if attempt:
+                    raise
+                await asyncio.to_thread(self._ready, True)
+            except DriverHung:
+                logger.error(f"{self.name} driver hung during capture; killing it")
+                self._kill()
+                raise
+        return self._template(message)
+
+    def _template(self, message: dict) -> str:
+        self._last_ok = time.monotonic()
+        template = message.get("template")
+        if not template:
+            raise DriverError(f"{self.name} driver returned no template")
+        return template
+
+    def cancel(self, request_id: Optional[int] = None) -> None:
+        """
+        Abort a capture (safe to call from any thread).
+
+        Args:
+            request_id: Capture to abort; None aborts the one in progress
+        """
+        if self.running:
+            message = {"cmd": "cancel"}
+            if request_id is not None:
+                message["id"] = request_id
+            try:
+                self._send(message)
+            except DriverError:
+                pass
+
+    def stop(self) -> None:
+        """Ask the driver to exit, killing it if it does not."""
+        if not self.running:
+            return
+        try:
+            self._send({"cmd": "shutdown"})
+            self._proc.wait(timeout=2)
+        except (DriverError, subprocess.TimeoutExpired):
+            self._kill()
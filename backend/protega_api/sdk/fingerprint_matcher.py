@@ -17,6 +17,9 @@ import logging
 import numpy as np
 from typing import List, Optional, Tuple
 
+from protega_api.config import settings
+from protega_api.sdk.synthetic import decode_sample
+
 logger = logging.getLogger(__name__)
 
 # Similarity threshold (0-1 scale)
@@ -33,14 +36,19 @@ class FingerprintMatcher:
     even if the SHA-256 hash differs due to scanner variations.
     """
     
-    def __init__(self, threshold: float = SIMILARITY_THRESHOLD):
+    def __init__(self, threshold: float = SIMILARITY_THRESHOLD, decode_synthetic: bool = False):
         """
         Initialize the fingerprint matcher.
         
         Args:
             threshold: Similarity threshold (0-1). Default 0.90 (90%)
+            decode_synthetic: Decode synthetic population samples (see
+                synthetic.py) instead of extracting features. For benchmarks
+                and simulated drivers only: a caller could otherwise choose
+                the exact feature vector that is matched.
         """
         self.threshold = threshold
+        self.decode_synthetic = decode_synthetic
         logger.info(f"FingerprintMatcher initialized with threshold: {threshold}")
     
     def extract_features(self, fingerprint_sample: str) -> np.ndarray:
@@ -53,12 +61,20 @@ class FingerprintMatcher:
         For now, we simulate feature extraction by converting the sample
         to a normalized feature vector.
         
+        With decode_synthetic, valid synthetic population samples are
+        decoded to the feature vector they carry instead.
+        
         Args:
             fingerprint_sample: Base64-encoded fingerprint template
             
         Returns:
             Normalized feature vector as numpy array
         """
+        if self.decode_synthetic:
+            synthetic = decode_sample(fingerprint_sample)
+            if synthetic is not None:
+                return synthetic
+        
         try:
             # Simulate feature extraction
             # In production, this would call the SDK to extract minutiae points
@@ -70,7 +86,7 @@ class FingerprintMatcher:
             hash1 = hashlib.md5(sample_bytes[:len(sample_bytes)//2]).digest()
             hash2 = hashlib.md5(sample_bytes[len(sample_bytes)//2:]).digest()
             
-            # Convert to feature vector (64 features)
+            # Convert to feature vector (32 features)
             features = np.frombuffer(hash1 + hash2, dtype=np.uint8).astype(np.float32)
             
             # Normalize to [0, 1] range
@@ -227,6 +243,8 @@ def get_fingerprint_matcher(threshold: float = SIMILARITY_THRESHOLD) -> Fingerpr
     """Get or create the global fingerprint matcher instance."""
     global _matcher_instance
     if _matcher_instance is None:
-        _matcher_instance = FingerprintMatcher(threshold=threshold)
+        _matcher_instance = FingerprintMatcher(
+            threshold=threshold, decode_synthetic=settings.synthetic_samples_enabled
+        )
     return _matcher_instance
 
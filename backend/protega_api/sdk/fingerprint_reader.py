@@ -18,6 +18,7 @@ Features:
 - Ready for POS hardware integration
 """
 
+import asyncio
 import base64
 import hashlib
 import json
@@ -26,7 +27,9 @@ import os
 import platform
 import subprocess
 import sys
-from typing import Optional
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from protega_api.sdk.capture_daemon import CaptureDaemon, DriverError, DriverUnavailable
 
 logger = logging.getLogger(__name__)
 
@@ -35,7 +38,24 @@ USE_SDK = os.getenv("USE_FINGERPRINT_SDK", "false").lower() == "true"
 SDK_DRIVER_PATH = os.getenv("SDK_DRIVER_PATH", "")
 
 # SDK selection (can be auto-detected)
-FINGERPRINT_SDK = os.getenv("FINGERPRINT_SDK", "auto")  # auto, digitalpersona, futronic, verifinger, simulated
+FINGERPRINT_SDK = os.getenv("FINGERPRINT_SDK", "auto")  # auto, digitalpersona, futronic, verifinger, simdriver, simulated
+
+# Driver processes: "daemon" keeps one running (JSON-lines, see capture_daemon.py),
+# "oneshot" spawns the driver for every capture
+DRIVER_MODE = os.getenv("FINGERPRINT_DRIVER_MODE", "daemon")
+CAPTURE_TIMEOUT = float(os.getenv("FINGERPRINT_CAPTURE_TIMEOUT", "30"))
+DAEMON_HEALTH_INTERVAL = float(os.getenv("FINGERPRINT_DAEMON_HEALTH_INTERVAL", "30"))
+
+# How often an async capture checks whether the client is still connected
+DISCONNECT_POLL_SECONDS = 0.5
+
+# SDK type -> (driver executable, vendor label)
+DRIVERS = {
+    "digitalpersona": ("dp_capture", "DigitalPersona"),
+    "futronic": ("ftr_capture", "Futronic"),
+    "verifinger": ("vf_capture", "VeriFinger"),
+    "simdriver": ("sim_capture", "Simulated"),
+}
 
 # Platform detection
 OS_TYPE = platform.system().lower()
@@ -53,6 +73,8 @@ class FingerprintReader:
         self.os_type = OS_TYPE
         self.sdk_type = FINGERPRINT_SDK
         self.driver_loaded = False
+        self._daemons: Dict[str, CaptureDaemon] = {}
+        self._daemon_unsupported = DRIVER_MODE != "daemon"
         self._initialize_driver()
     
     def _detect_device(self) -> str:
@@ -138,6 +160,11 @@ class FingerprintReader:
             self.sdk_type = self._detect_device()
             logger.info(f"Auto-detected SDK type: {self.sdk_type}")
         
+        if self.sdk_type == "simdriver":
+            logger.info("Using the simulated driver process (protega_api.sdk.sim_driver)")
+            self.driver_loaded = True
+            return
+        
         if not USE_SDK or self.sdk_type == "simulated":
             logger.info("Using simulated fingerprint capture (for development)")
             return
@@ -217,6 +244,9 @@ class FingerprintReader:
             elif self.sdk_type == "verifinger":
                 return self._capture_verifinger()
             
+            elif self.sdk_type == "simdriver":
+                return self._capture_via_driver(*DRIVERS["simdriver"])
+            
             else:
                 logger.error(f"Unknown SDK type: {self.sdk_type}")
                 return None
@@ -225,6 +255,54 @@ class FingerprintReader:
             logger.error(f"Fingerprint capture failed: {e}")
             return None
     
+    async def capture_sample_async(
+        self,
+        timeout: Optional[float] = None,
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+    ) -> Optional[str]:
+        """
+        Capture a fingerprint without blocking the event loop or a worker thread.
+        
+        The capture is cancelled (in the driver too) when the timeout passes,
+        when `is_disconnected` reports the client has gone, or when the
+        awaiting task itself is cancelled.
+        
+        Args:
+            timeout: Seconds to wait for a finger (default: FINGERPRINT_CAPTURE_TIMEOUT)
+            is_disconnected: Async predicate, e.g. Request.is_disconnected
+            
+        Returns:
+            Base64-encoded template, or None if capture fails, times out or is abandoned
+        """
+        capture = asyncio.ensure_future(self._capture_async(timeout or CAPTURE_TIMEOUT))
+        try:
+            while True:
+                done, _ = await asyncio.wait({capture}, timeout=DISCONNECT_POLL_SECONDS)
+                if done:
+                    return capture.result()
+                if is_disconnected is not None and await is_disconnected():
+                    logger.info("Client disconnected; cancelling fingerprint capture")
+                    return None
+        finally:
+            # Cancelling the task tells the driver to stop waiting for a finger
+            if not capture.done():
+                capture.cancel()
+    
+    async def _capture_async(self, timeout: float) -> Optional[str]:
+        try:
+            if self.sdk_type == "simulated":
+                return self._simulate_capture()
+            if self.sdk_type not in DRIVERS:
+                logger.error(f"Unknown SDK type: {self.sdk_type}")
+                return None
+            driver_name, label = DRIVERS[self.sdk_type]
+            return await self._capture_via_driver_async(driver_name, label, timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Fingerprint capture failed: {e}")
+            return None
+    
     def _simulate_capture(self) -> str:
         """
         Simulated fingerprint capture for development.
@@ -239,44 +317,119 @@ class FingerprintReader:
         logger.info("Using simulated fingerprint capture")
         return template_b64
     
-    def _capture_digitalpersona(self) -> Optional[str]:
+    def _driver_command(self, driver_name: str) -> Optional[List[str]]:
+        """Command line for a driver executable, or None if it is not installed."""
+        if self.sdk_type == "simdriver":
+            return [sys.executable, "-m", "protega_api.sdk.sim_driver"]
+        
+        driver_exe = os.path.join(self._driver_path(), f"{driver_name}.exe" if self.os_type.startswith("win") else driver_name)
+        if not os.path.exists(driver_exe):
+            return None
+        return [driver_exe]
+    
+    def _get_daemon(self, driver_name: str, command: List[str], label: str) -> CaptureDaemon:
+        daemon = self._daemons.get(driver_name)
+        if daemon is None:
+            daemon = CaptureDaemon(command, label, health_check_interval=DAEMON_HEALTH_INTERVAL)
+            self._daemons[driver_name] = daemon
+        return daemon
+    
+    def _capture_via_driver(self, driver_name: str, label: str) -> Optional[str]:
         """
-        Capture fingerprint using DigitalPersona U.are.U SDK.
+        Capture a template with a driver executable.
+        
+        Uses the long-lived capture daemon unless the driver does not speak
+        the daemon protocol, in which case the driver is run once per capture.
         
+        Args:
+            driver_name: Executable name without extension (e.g. "dp_capture")
+            label: Vendor name for log messages
+            
         Returns:
             Base64-encoded template or None if capture fails
         """
-        try:
-            # Try calling SDK driver executable
-            driver_exe = os.path.join(self._driver_path(), "dp_capture.exe" if self.os_type.startswith("win") else "dp_capture")
-            
-            if os.path.exists(driver_exe):
-                output = subprocess.check_output(
-                    [driver_exe],
-                    timeout=30,
-                    stderr=subprocess.PIPE
-                )
-                result = json.loads(output.decode())
-                template = result.get("template")
-                
-                if template:
-                    # Already base64 encoded from driver
-                    return template
-            else:
-                logger.warning(f"DigitalPersona driver not found at: {driver_exe}")
-                logger.warning("Falling back to simulated capture")
+        command = self._driver_command(driver_name)
+        if command is None:
+            logger.warning(f"{label} driver not found in: {self._driver_path()}")
+            logger.warning("Falling back to simulated capture")
+            return None
+        
+        if not self._daemon_unsupported:
+            try:
+                return self._get_daemon(driver_name, command, label).capture(CAPTURE_TIMEOUT)
+            except DriverUnavailable as e:
+                logger.warning(f"{e}; running the driver once per capture instead")
+                self._daemon_unsupported = True
+            except DriverError as e:
+                logger.error(f"{label} capture failed: {e}")
                 return None
+        
+        try:
+            output = subprocess.check_output(
+                command,
+                timeout=CAPTURE_TIMEOUT,
+                stderr=subprocess.PIPE
+            )
+            result = json.loads(output.decode())
+            # Already base64 encoded from driver
+            return result.get("template") or None
             
         except subprocess.TimeoutExpired:
-            logger.error("DigitalPersona capture timed out after 30 seconds")
+            logger.error(f"{label} capture timed out after {CAPTURE_TIMEOUT:.0f} seconds")
             return None
         except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse DigitalPersona output: {e}")
+            logger.error(f"Failed to parse {label} output: {e}")
             return None
         except Exception as e:
-            logger.error(f"DigitalPersona capture failed: {e}")
+            logger.error(f"{label} capture failed: {e}")
+            return None
+    
+    async def _capture_via_driver_async(self, driver_name: str, label: str, timeout: float) -> Optional[str]:
+        """Async counterpart of _capture_via_driver; one-shot drivers are killed on timeout or cancel."""
+        command = self._driver_command(driver_name)
+        if command is None:
+            logger.warning(f"{label} driver not found in: {self._driver_path()}")
+            return None
+        
+        if not self._daemon_unsupported:
+            try:
+                return await self._get_daemon(driver_name, command, label).capture_async(timeout)
+            except DriverUnavailable as e:
+                logger.warning(f"{e}; running the driver once per capture instead")
+                self._daemon_unsupported = True
+            except DriverError as e:
+                logger.error(f"{label} capture failed: {e}")
+                return None
+        
+        proc = await asyncio.create_subprocess_exec(
+            *command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE
+        )
+        try:
+            output, _ = await asyncio.wait_for(proc.communicate(), timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"{label} capture timed out after {timeout:.0f} seconds")
+            return None
+        finally:
+            if proc.returncode is None:
+                proc.kill()
+        
+        try:
+            return json.loads(output.decode()).get("template") or None
+        except (json.JSONDecodeError, AttributeError) as e:
+            logger.error(f"Failed to parse {label} output: {e}")
             return None
     
+    def _capture_digitalpersona(self) -> Optional[str]:
+        """
+        Capture fingerprint using DigitalPersona U.are.U SDK.
+        
+        Returns:
+            Base64-encoded template or None if capture fails
+        """
+        return self._capture_via_driver(*DRIVERS["digitalpersona"])
+    
     def _capture_futronic(self) -> Optional[str]:
         """
         Capture fingerprint using Futronic SDK.
@@ -284,35 +437,7 @@ class FingerprintReader:
         Returns:
             Base64-encoded template or None if capture fails
         """
-        try:
-            # Try calling SDK driver executable
-            driver_exe = os.path.join(self._driver_path(), "ftr_capture.exe" if self.os_type.startswith("win") else "ftr_capture")
-            
-            if os.path.exists(driver_exe):
-                output = subprocess.check_output(
-                    [driver_exe],
-                    timeout=30,
-                    stderr=subprocess.PIPE
-                )
-                result = json.loads(output.decode())
-                template = result.get("template")
-                
-                if template:
-                    return template
-            else:
-                logger.warning(f"Futronic driver not found at: {driver_exe}")
-                logger.warning("Falling back to simulated capture")
-                return None
-                
-        except subprocess.TimeoutExpired:
-            logger.error("Futronic capture timed out after 30 seconds")
-            return None
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse Futronic output: {e}")
-            return None
-        except Exception as e:
-            logger.error(f"Futronic capture failed: {e}")
-            return None
+        return self._capture_via_driver(*DRIVERS["futronic"])
     
     def _capture_verifinger(self) -> Optional[str]:
         """
@@ -321,35 +446,28 @@ class FingerprintReader:
         Returns:
             Base64-encoded template or None if capture fails
         """
-        try:
-            # Try calling SDK driver executable
-            driver_exe = os.path.join(self._driver_path(), "vf_capture.exe" if self.os_type.startswith("win") else "vf_capture")
-            
-            if os.path.exists(driver_exe):
-                output = subprocess.check_output(
-                    [driver_exe],
-                    timeout=30,
-                    stderr=subprocess.PIPE
-                )
-                result = json.loads(output.decode())
-                template = result.get("template")
-                
-                if template:
-                    return template
-            else:
-                logger.warning(f"VeriFinger driver not found at: {driver_exe}")
-                logger.warning("Falling back to simulated capture")
-                return None
-                
-        except subprocess.TimeoutExpired:
-            logger.error("VeriFinger capture timed out after 30 seconds")
-            return None
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse VeriFinger output: {e}")
-            return None
-        except Exception as e:
-            logger.error(f"VeriFinger capture failed: {e}")
-            return None
+        return self._capture_via_driver(*DRIVERS["verifinger"])
+    
+    def ping(self) -> bool:
+        """
+        Health check for the capture path.
+        
+        Starts the driver daemon if needed. Always True for in-process simulation
+        and one-shot drivers.
+        """
+        if self.sdk_type not in DRIVERS or self._daemon_unsupported:
+            return True
+        driver_name, label = DRIVERS[self.sdk_type]
+        command = self._driver_command(driver_name)
+        if command is None:
+            return False
+        return self._get_daemon(driver_name, command, label).ping()
+    
+    def close(self):
+        """Stop any running driver daemons."""
+        for daemon in self._daemons.values():
+            daemon.stop()
+        self._daemons.clear()
     
     def hash_template(self, template_b64: str) -> str:
         """
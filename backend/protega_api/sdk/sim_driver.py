@@ -0,0 +1,149 @@
+"""
+Simulated fingerprint driver.
+
+Stands in for dp_capture / ftr_capture / vf_capture on machines without a
+scanner, so the capture daemon can be exercised on plain Linux:
+
+    python -m protega_api.sdk.sim_driver            # one-shot: print one template and exit
+    python -m protega_api.sdk.sim_driver --serve    # JSON-lines daemon (see capture_daemon.py)
+    python -m protega_api.sdk.sim_driver --serve --population 1000 --seed 7
+                                                    # fresh captures of synthetic fingers (see synthetic.py):
+                                                    # with SYNTHETIC_SAMPLES_ENABLED=true they match
+                                                    # their enrollee by feature vector, never by the
+                                                    # exact-hash match in /pay
+
+Set FINGERPRINT_SDK=simdriver to have FingerprintReader use it.
+"""
+
+import argparse
+import base64
+import json
+import queue
+import secrets
+import sys
+import threading
+import time
+
+
+def simulated_template() -> str:
+    """Random template in the same shape as FingerprintReader._simulate_capture."""
+    return base64.b64encode(secrets.token_hex(64).encode()).decode()
+
+
+def population_templates(size: int, seed: int):
+    """Endless captures of random fingers from a synthetic population (deterministic per seed)."""
+    import random
+
+    from protega_api.sdk.synthetic import SyntheticPopulation
+
+    population = SyntheticPopulation(size=size, seed=seed)
+    rng = random.Random(seed)
+    capture = 1  # Capture 0 is what synthetic enrollments use
+    while True:
+        yield population.sample(rng.randrange(size), 0, capture)
+        capture += 1
+
+
+def _reply(message: dict) -> None:
+    sys.stdout.write(json.dumps(message) + "\n")
+    sys.stdout.flush()
+
+
+def _read_stdin(lines: "queue.Queue") -> None:
+    for line in sys.stdin:
+        lines.put(line)
+    lines.put(None)
+
+
+def serve(capture_delay: float, crash_after: int, templates=None) -> int:
+    """Answer requests in order until shutdown or EOF."""
+    lines: "queue.Queue" = queue.Queue()
+    threading.Thread(target=_read_stdin, args=(lines,), daemon=True).start()
+    captures = 0
+    pending = []  # Requests received while a capture was waiting
+    cancelled_ids = set()  # Queued requests cancelled before they started
+
+    while True:
+        line = pending.pop(0) if pending else lines.get()
+        if line is None:
+            return 0
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError:
+            print(f"sim_driver: ignoring malformed request: {line.strip()[:80]}", file=sys.stderr)
+            continue
+
+        cmd = request.get("cmd")
+        request_id = request.get("id")
+        if cmd == "shutdown":
+            return 0
+        if cmd == "cancel":
+            if request_id is not None:
+                cancelled_ids.add(request_id)
+            continue
+        if request_id in cancelled_ids:
+            cancelled_ids.discard(request_id)
+            _reply({"id": request_id, "ok": False, "error": "cancelled"})
+            continue
+
+        if cmd == "ping":
+            _reply({"id": request_id, "ok": True})
+        elif cmd == "capture":
+            timeout = float(request.get("timeout", 30))
+            # Wait for the "finger", watching stdin for a cancel of this capture
+            deadline = time.monotonic() + min(capture_delay, timeout)
+            cancelled = False
+            while not cancelled:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    next_line = lines.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if next_line is None:
+                    return 0
+                try:
+                    message = json.loads(next_line)
+                except json.JSONDecodeError:
+                    continue
+                if message.get("cmd") == "cancel" and message.get("id") in (None, request_id):
+                    cancelled = True
+                else:
+                    pending.append(next_line)
+
+            if cancelled:
+                _reply({"id": request_id, "ok": False, "error": "cancelled"})
+            elif capture_delay > timeout:
+                _reply({"id": request_id, "ok": False, "error": "timeout"})
+            else:
+                template = next(templates) if templates else simulated_template()
+                _reply({"id": request_id, "ok": True, "template": template})
+                captures += 1
+                if crash_after and captures >= crash_after:
+                    print("sim_driver: simulated crash", file=sys.stderr)
+                    return 1
+        else:
+            _reply({"id": request_id, "ok": False, "error": f"unknown command: {cmd}"})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated fingerprint capture driver")
+    parser.add_argument("--serve", action="store_true", help="Run as a JSON-lines daemon")
+    parser.add_argument("--capture-delay", type=float, default=0.2, help="Seconds before a finger is 'presented'")
+    parser.add_argument("--crash-after", type=int, default=0, help="Exit after this many captures (0 = never)")
+    parser.add_argument("--population", type=int, default=0,
+                        help="Capture fingers from a synthetic population of this size (default: random templates)")
+    parser.add_argument("--seed", type=int, default=0, help="Synthetic population seed (default: 0)")
+    args = parser.parse_args()
+
+    templates = population_templates(args.population, args.seed) if args.population else None
+    if args.serve:
+        sys.exit(serve(args.capture_delay, args.crash_after, templates))
+
+    time.sleep(args.capture_delay)
+    print(json.dumps({"template": next(templates) if templates else simulated_template()}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Deterministic synthetic fingerprint population.
+
+The simulated capture paths return random tokens, so two captures of the
+same finger share nothing and matcher accuracy cannot be measured. This
+module models fingers instead:
+
+- every (identity, finger) has a fixed master feature vector
+- every capture of it is the master plus Gaussian noise (`intra_noise`)
+- `separation` controls how distinct different fingers are: 1.0 draws
+  masters independently, lower values mix in a component shared by the
+  whole population, pushing impostor scores toward genuine ones
+
+Vectors have the shape and range of FingerprintMatcher.extract_features
+output (32 float32 values scaled so the maximum is 1). Raw samples encode
+the capture vector; with SYNTHETIC_SAMPLES_ENABLED (benchmarks and the
+simulated driver only, off by default) extract_features decodes them, so a
+capture scores close to its finger's other captures in feature-vector
+matching (enrollment dedupe, fraud scans, bulk import). /pay and /identify-user compare PBKDF2
+hashes of the exact sample, so only a re-sent enrollment sample matches
+there, never a fresh capture.
+
+Everything is derived from (seed, identity, finger, capture), so any
+capture can be regenerated independently and in any order:
+
+    population = SyntheticPopulation(size=10_000, seed=7)
+    sample = population.sample(identity=42, capture=3)
+    vector = decode_sample(sample)
+"""
+
+import base64
+import binascii
+import json
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+FEATURE_DIM = 32  # Length of FingerprintMatcher.extract_features output
+SAMPLE_PREFIX = "PSYN1"
+FINGER_LABELS = ("right_index", "left_index", "right_thumb", "left_thumb", "right_middle")
+
+
+def _normalize(vector: np.ndarray) -> np.ndarray:
+    """Clip negatives and scale to a maximum of 1, like extract_features."""
+    vector = np.clip(vector, 0.0, None).astype(np.float32)
+    peak = vector.max()
+    return vector / peak if peak > 0 else vector
+
+
+def encode_sample(vector: np.ndarray) -> str:
+    """Encode a feature vector as a raw sample string (16-bit quantized)."""
+    quantized = np.round(np.clip(vector, 0.0, 1.0) * 65535).astype("<u2")
+    return SAMPLE_PREFIX + base64.b64encode(quantized.tobytes()).decode()
+
+
+def decode_sample(sample: str) -> Optional[np.ndarray]:
+    """Feature vector of a synthetic sample, or None if it is not a valid one."""
+    if not sample.startswith(SAMPLE_PREFIX):
+        return None
+    try:
+        raw = base64.b64decode(sample[len(SAMPLE_PREFIX):], validate=True)
+    except (binascii.Error, ValueError):
+        return None
+    if len(raw) != FEATURE_DIM * 2:
+        return None
+    return (np.frombuffer(raw, dtype="<u2").astype(np.float32) / 65535).astype(np.float32)
+
+
+class SyntheticPopulation:
+    """N identities with `fingers` enrolled fingers each."""
+
+    def __init__(
+        self,
+        size: int,
+        fingers: int = 1,
+        seed: int = 0,
+        intra_noise: float = 0.05,
+        separation: float = 1.0,
+        dim: int = FEATURE_DIM,
+    ):
+        """
+        Args:
+            size: Number of identities
+            fingers: Fingers per identity (at most len(FINGER_LABELS))
+            seed: Population seed; same seed, same population
+            intra_noise: Std-dev of per-capture noise on [0, 1] features
+            separation: 0-1; 1 = independent fingers, 0 = all fingers identical
+            dim: Feature vector length
+        """
+        if not 1 <= fingers <= len(FINGER_LABELS):
+            raise ValueError(f"fingers must be between 1 and {len(FINGER_LABELS)}")
+        if not 0.0 <= separation <= 1.0:
+            raise ValueError("separation must be between 0 and 1")
+        self.size = size
+        self.fingers = fingers
+        self.seed = seed
+        self.intra_noise = intra_noise
+        self.separation = separation
+        self.dim = dim
+        self._shared = np.random.default_rng([seed, 0x5EED]).random(dim)
+
+    def master(self, identity: int, finger: int = 0) -> np.ndarray:
+        """Noise-free feature vector of one finger."""
+        unique = np.random.default_rng([self.seed, identity, finger]).random(self.dim)
+        return _normalize(self.separation * unique + (1.0 - self.separation) * self._shared)
+
+    def capture(self, identity: int, finger: int = 0, capture: int = 0) -> np.ndarray:
+        """Feature vector of one capture (capture numbers give independent noise)."""
+        noise = np.random.default_rng([self.seed, identity, finger, capture + 1]).normal(0.0, self.intra_noise, self.dim)
+        return _normalize(self.master(identity, finger) + noise)
+
+    def sample(self, identity: int, finger: int = 0, capture: int = 0) -> str:
+        """Raw sample string of one capture."""
+        return encode_sample(self.capture(identity, finger, capture))
+
+    def fingers_of(self, start: int = 0) -> Iterator[Tuple[int, int]]:
+        """Every (identity, finger) pair in the population, from identity `start` on."""
+        for identity in range(start, self.size):
+            for finger in range(self.fingers):
+                yield identity, finger
+
+    def enrollment_records(self, capture: int = 0, start: int = 0) -> Iterator[dict]:
+        """
+        Bulk-import records (see protega_api.tasks.bulk_import), one per finger.
+
+        Records carry the precomputed feature_vector so the import keeps the
+        population's structure instead of re-extracting features. `start`
+        skips identities below it, so a population can be grown in steps.
+        """
+        for identity, finger in self.fingers_of(start):
+            vector = self.capture(identity, finger, capture)
+            yield {
+                "email": f"synthetic+{self.seed}-{identity}-{finger}@example.com",
+                "full_name": f"Synthetic User {identity}",
+                "phone": f"+1555{self.seed % 1000:03d}{identity * self.fingers + finger:07d}",
+                "fingerprint_sample": encode_sample(vector),
+                "finger_label": FINGER_LABELS[finger],
+                "consent_text": "Synthetic benchmark identity",
+                "feature_vector": vector.tolist(),
+            }
+
+    def write_jsonl(self, path: str, capture: int = 0, start: int = 0) -> int:
+        """Write enrollment_records() to a JSONL file; returns the record count."""
+        count = 0
+        with open(path, "w", encoding="utf-8") as f:
+            for record in self.enrollment_records(capture, start):
+                f.write(json.dumps(record) + "\n")
+                count += 1
+        return count
@@ -1,6 +1,9 @@
 """Database seeding script for testing."""
 
+import argparse
 import logging
+import os
+import tempfile
 
 from protega_api.db import SessionLocal
 from protega_api.models import Merchant, Terminal
@@ -58,6 +61,34 @@ def seed_test_merchant():
         db.close()
 
 
+def seed_synthetic_users(count: int, seed: int = 0, fingers: int = 1) -> None:
+    """
+    Enroll a deterministic synthetic population (see protega_api.sdk.synthetic).
+    
+    Goes through the bulk importer, so re-running with the same seed skips
+    identities that already exist.
+    """
+    from protega_api.sdk.synthetic import SyntheticPopulation
+    from protega_api.tasks.bulk_import import run_import
+    
+    population = SyntheticPopulation(size=count, fingers=fingers, seed=seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "synthetic.jsonl")
+        records = population.write_jsonl(path)
+        stats = run_import(path, os.path.join(tmp, "rejects.jsonl"))
+    logger.info(f"Synthetic population (seed {seed}): {records} records, "
+                f"{stats.imported} enrolled, {stats.rejected} skipped")
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed test data")
+    parser.add_argument("--synthetic-users", type=int, default=0,
+                        help="Also enroll this many synthetic identities (default: 0)")
+    parser.add_argument("--synthetic-seed", type=int, default=0, help="Synthetic population seed (default: 0)")
+    parser.add_argument("--synthetic-fingers", type=int, default=1, help="Fingers per synthetic identity (default: 1)")
+    args = parser.parse_args()
+    
     seed_test_merchant()
+    if args.synthetic_users:
+        seed_synthetic_users(args.synthetic_users, seed=args.synthetic_seed, fingers=args.synthetic_fingers)
 
@@ -0,0 +1,191 @@
+"""
+Background SMS dispatch.
+
+The Twilio client is synchronous, so calling it from an async endpoint
+blocks the event loop (and every WebSocket on it) for a full API round
+trip. Messages are queued here instead and sent by a fixed pool of worker
+tasks, each running the blocking call in a thread. Callers get a delivery
+handle back immediately and can poll its status.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+from protega_api.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Blocking sender: (phone, body) -> None, raises on failure
+SendFn = Callable[[str, str], None]
+
+
+class SmsQueueFull(Exception):
+    """Raised when no more messages can be queued."""
+    pass
+
+
+@dataclass
+class SmsDelivery:
+    """Status handle for one queued message."""
+    phone: str
+    body: str
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = "queued"  # queued, sending, sent, failed
+    attempts: int = 0
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+
+    def to_dict(self) -> dict:
+        """Public view (never includes the message body)."""
+        return {
+            "delivery_id": self.id,
+            "status": self.status,
+            "attempts": self.attempts,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+
+def _is_permanent(error: Exception) -> bool:
+    """Client errors (bad number, unsubscribed recipient) will not succeed on retry."""
+    status_code = getattr(error, "status", None)
+    return isinstance(status_code, int) and 400 <= status_code < 500 and status_code != 429
+
+
+class SmsDispatcher:
+    """
+    Bounded queue of outbound SMS drained by `concurrency` worker tasks.
+
+    Failed sends are retried with exponential backoff up to `max_attempts`.
+    A resend to the same phone within `dedupe_seconds` of a delivery that
+    has not failed returns that delivery instead of queueing another message.
+    Delivery records are kept in memory (last `history_size`), so status is
+    only visible on the worker that accepted the message.
+    """
+
+    def __init__(
+        self,
+        send: SendFn,
+        concurrency: int,
+        max_attempts: int,
+        retry_backoff_seconds: float,
+        dedupe_seconds: float,
+        queue_size: int,
+        history_size: int,
+    ):
+        self.send = send
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.dedupe_seconds = dedupe_seconds
+        self.queue_size = queue_size
+        self.history_size = history_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._deliveries: "OrderedDict[str, SmsDelivery]" = OrderedDict()
+        self._latest_by_phone: dict = {}  # phone -> delivery id
+
+    async def start(self) -> None:
+        """Start the worker tasks on the running loop."""
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+
+    async def stop(self) -> None:
+        """Cancel the workers; messages still queued are not sent."""
+        for worker in self._workers:
+            worker.cancel()
+        for worker in self._workers:
+            try:
+                await worker
+            except asyncio.CancelledError:
+                pass
+        self._workers = []
+        self._queue = None
+
+    def recent(self, phone: str) -> Optional[SmsDelivery]:
+        """Delivery to this phone within the dedupe window that has not failed, if any."""
+        delivery = self._deliveries.get(self._latest_by_phone.get(phone, ""))
+        if delivery is None or delivery.status == "failed":
+            return None
+        if time.time() - delivery.created_at > self.dedupe_seconds:
+            return None
+        return delivery
+
+    def submit(self, phone: str, body: str) -> SmsDelivery:
+        """
+        Queue a message without blocking.
+
+        Raises:
+            SmsQueueFull: If the dispatcher is not running or the queue is full
+        """
+        if self._queue is None:
+            raise SmsQueueFull("SMS dispatcher is not running")
+        delivery = SmsDelivery(phone=phone, body=body)
+        try:
+            self._queue.put_nowait(delivery)
+        except asyncio.QueueFull:
+            raise SmsQueueFull("SMS queue is full")
+
+        self._deliveries[delivery.id] = delivery
+        self._latest_by_phone[phone] = delivery.id
+        while len(self._deliveries) > self.history_size:
+            _, evicted = self._deliveries.popitem(last=False)
+            if self._latest_by_phone.get(evicted.phone) == evicted.id:
+                del self._latest_by_phone[evicted.phone]
+        return delivery
+
+    def get(self, delivery_id: str) -> Optional[SmsDelivery]:
+        """Look up a delivery accepted by this worker."""
+        return self._deliveries.get(delivery_id)
+
+    async def _work(self) -> None:
+        while True:
+            delivery = await self._queue.get()
+            try:
+                await self._deliver(delivery)
+            except Exception as e:
+                logger.error(f"Unexpected SMS worker error for delivery {delivery.id}: {e}")
+
+    async def _deliver(self, delivery: SmsDelivery) -> None:
+        delivery.status = "sending"
+        while True:
+            delivery.attempts += 1
+            delivery.updated_at = time.time()
+            try:
+                await asyncio.to_thread(self.send, delivery.phone, delivery.body)
+            except Exception as e:
+                delivery.error = str(e)
+                if _is_permanent(e) or delivery.attempts >= self.max_attempts:
+                    delivery.status = "failed"
+                    delivery.updated_at = time.time()
+                    logger.error(f"SMS delivery {delivery.id} failed after {delivery.attempts} attempt(s): {e}")
+                    return
+                backoff = self.retry_backoff_seconds * 2 ** (delivery.attempts - 1)
+                logger.warning(f"SMS delivery {delivery.id} attempt {delivery.attempts} failed, retrying in {backoff:.1f}s: {e}")
+                await asyncio.sleep(backoff)
+                continue
+
+            delivery.status = "sent"
+            delivery.error = None
+            delivery.updated_at = time.time()
+            return
+
+
+def create_dispatcher(send: SendFn) -> SmsDispatcher:
+    """Create a dispatcher configured from settings."""
+    return SmsDispatcher(
+        send=send,
+        concurrency=settings.sms_concurrency,
+        max_attempts=settings.sms_max_attempts,
+        retry_backoff_seconds=settings.sms_retry_backoff_seconds,
+        dedupe_seconds=settings.sms_dedupe_seconds,
+        queue_size=settings.sms_queue_size,
+        history_size=settings.sms_delivery_history_size,
+    )
@@ -0,0 +1,497 @@
+"""
+Bulk Enrollment Import for Protega CloudPay
+===========================================
+
+Onboards a partner's existing customer base without going through /enroll
+one request at a time. Records are streamed from a JSONL or CSV file and
+processed in batches:
+
+1. read      - parse and validate records
+2. prepare   - hash, PBKDF2 and AES-GCM encrypt templates in a process pool
+3. dedupe    - reject emails, phones and template hashes already in the
+               database or earlier in the file, then near-duplicate
+               fingerprints against an in-memory vector index
+4. write     - insert users, consents and templates with COPY
+
+Every input line ends up either imported or in the reject file (JSONL with
+line number, email and reason; fingerprint samples are never written out).
+
+Required fields: email, full_name, phone, fingerprint_sample, finger_label,
+consent_text. Optional: stripe_customer_id, feature_vector (precomputed
+features, e.g. from protega_api.sdk.synthetic; FEATURE_DIM numbers, else the
+record is rejected as invalid_feature_vector; extracted from the sample
+otherwise). Cards are not attached here; imported users add a payment
+method on first use.
+
+    python -m protega_api.tasks.bulk_import customers.jsonl --rejects rejects.jsonl
+    python -m protega_api.tasks.bulk_import customers.csv --workers 8 --batch-size 1000 --dry-run
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from protega_api.db import SessionLocal
+from protega_api.models import BiometricTemplate, User
+from protega_api.sdk.fingerprint_matcher import get_fingerprint_matcher
+from protega_api.sdk.synthetic import FEATURE_DIM
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_FIELDS = ("email", "full_name", "phone", "fingerprint_sample", "finger_label", "consent_text")
+STAGES = ("read", "prepare", "dedupe", "write")
+
+
+@dataclass
+class StageStats:
+    """Time spent and rows handled by one pipeline stage."""
+    seconds: float = 0.0
+    rows: int = 0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+
+@dataclass
+class ImportStats:
+    """Per-stage throughput and outcome counts for an import run."""
+    stages: Dict[str, StageStats] = field(default_factory=lambda: {name: StageStats() for name in STAGES})
+    imported: int = 0
+    rejected: int = 0
+
+    @contextmanager
+    def timed(self, stage: str, rows: int):
+        """Attribute the wall time of the block and `rows` rows to `stage`."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[stage].seconds += time.perf_counter() - started
+            self.stages[stage].rows += rows
+
+    def report(self) -> str:
+        """Human-readable throughput table."""
+        lines = [f"{'stage':<10}{'rows':>10}{'seconds':>10}{'rows/s':>12}"]
+        for name, stage in self.stages.items():
+            lines.append(f"{name:<10}{stage.rows:>10}{stage.seconds:>10.2f}{stage.rows_per_second:>12.1f}")
+        lines.append(f"imported={self.imported} rejected={self.rejected}")
+        return "\n".join(lines)
+
+
+def iter_records(path: str, fmt: str | None = None) -> Iterator[Tuple[int, dict]]:
+    """
+    Stream records from a JSONL or CSV file.
+
+    Args:
+        path: Input file path
+        fmt: "jsonl" or "csv" (default: inferred from the extension)
+
+    Yields:
+        (line_number, record) tuples; unparseable JSON lines yield None
+    """
+    fmt = fmt or ("csv" if path.lower().endswith(".csv") else "jsonl")
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            # Line 1 is the header
+            for line_no, row in enumerate(csv.DictReader(f), start=2):
+                yield line_no, row
+            return
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_no, json.loads(line)
+            except json.JSONDecodeError:
+                yield line_no, None
+
+
+def validate_record(record: dict | None) -> Optional[str]:
+    """Return a reject reason, or None if the record can be imported."""
+    if not isinstance(record, dict):
+        return "invalid_json"
+    for name in REQUIRED_FIELDS:
+        if not str(record.get(name) or "").strip():
+            return f"missing_{name}"
+    if "@" not in record["email"]:
+        return "invalid_email"
+    if not 10 <= len(record["phone"].strip()) <= 20:
+        return "invalid_phone"
+    return None
+
+
+def parse_feature_vector(value) -> Optional[np.ndarray]:
+    """
+    Precomputed feature vector of a record, or None if it is unusable.
+
+    Accepts a list or a JSON array string (CSV) of FEATURE_DIM finite numbers.
+    """
+    try:
+        if isinstance(value, str):
+            value = json.loads(value)  # CSV column holding a JSON array
+        vector = np.asarray(value, dtype=np.float32)
+    except (ValueError, TypeError):
+        return None
+    if vector.shape != (FEATURE_DIM,) or not np.isfinite(vector).all():
+        return None
+    return vector
+
+
+def prepare_record(record: dict) -> dict:
+    """
+    Hash, encrypt and extract features for one record (runs in a worker process).
+
+    Applies the same normalization as FingerprintReader.normalize_template
+    and hash_template, without initializing a reader (and probing for
+    hardware) in every worker.
+    """
+    from protega_api.adapters.hashing import derive_template_hash
+    from protega_api.security_enclave import encrypt_sensitive
+
+    vector = None
+    if record.get("feature_vector"):
+        vector = parse_feature_vector(record["feature_vector"])
+        if vector is None:
+            return {"error": "invalid_feature_vector"}
+
+    try:
+        sample = record["fingerprint_sample"]
+        normalized = sample.strip().upper()
+        _, pbkdf2_salt = derive_template_hash(normalized)
+        salt_b64, encrypted_template = encrypt_sensitive(normalized)
+        if vector is None:
+            vector = get_fingerprint_matcher().extract_features(sample)
+        return {
+            "template_hash": hashlib.sha256(normalized.encode()).hexdigest(),
+            "salt": pbkdf2_salt,
+            "salt_b64": salt_b64,
+            "encrypted_template": encrypted_template,
+            "feature_vector": vector.tolist(),
+        }
+    except Exception as e:
+        return {"error": f"prepare_failed: {e}"}
+
+
+class VectorIndex:
+    """
+    Row-normalized matrix of feature vectors for batched cosine lookups.
+
+    Holds every active template vector plus those accepted so far in the run.
+    """
+
+    def __init__(self):
+        self.matrix: np.ndarray | None = None
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def load(self, db: Session, chunk_size: int = 5000) -> int:
+        """Load active template vectors from the database; returns the count loaded."""
+        rows = []
+        query = db.query(BiometricTemplate.id, BiometricTemplate.feature_vector).filter(
+            BiometricTemplate.active == True,
+            BiometricTemplate.feature_vector != None
+        ).yield_per(chunk_size)
+        for template_id, vector_json in query:
+            try:
+                rows.append(np.array(json.loads(vector_json), dtype=np.float32))
+            except (json.JSONDecodeError, ValueError) as e:
+                logger.warning(f"Failed to parse feature vector for template {template_id}: {e}")
+        if rows:
+            dim = len(rows[0])
+            rows = [row for row in rows if len(row) == dim]
+            self.add(np.vstack(rows))
+        return 0 if self.matrix is None else len(self.matrix)
+
+    def add(self, vectors: np.ndarray) -> None:
+        """Append vectors to the index."""
+        if len(vectors) == 0:
+            return
+        normalized = self._normalize(vectors.astype(np.float32))
+        self.matrix = normalized if self.matrix is None else np.vstack([self.matrix, normalized])
+
+    def max_similarity(self, vectors: np.ndarray) -> np.ndarray:
+        """Best cosine similarity of each vector against the index (0 if empty)."""
+        if self.matrix is None or len(vectors) == 0:
+            return np.zeros(len(vectors), dtype=np.float32)
+        return (self._normalize(vectors.astype(np.float32)) @ self.matrix.T).max(axis=1)
+
+
+@dataclass
+class DedupeState:
+    """Keys accepted earlier in the run."""
+    emails: Set[str] = field(default_factory=set)
+    phones: Set[str] = field(default_factory=set)
+    hashes: Set[str] = field(default_factory=set)
+
+
+def dedupe_batch(
+    db: Session,
+    batch: List[Tuple[int, dict, dict]],
+    index: VectorIndex,
+    state: DedupeState,
+    threshold: float,
+) -> Tuple[List[Tuple[int, dict, dict]], List[Tuple[int, dict, str]]]:
+    """
+    Split a prepared batch into accepted and rejected records.
+
+    Database lookups are one IN query per key for the whole batch; vector
+    similarity is one matrix product against the index plus one within the
+    batch.
+
+    Args:
+        db: Database session
+        batch: (line_number, record, prepared) tuples
+        index: Vector index (accepted vectors are added to it)
+        state: Keys accepted earlier in the run (updated in place)
+        threshold: Cosine similarity at or above which a template is a duplicate
+
+    Returns:
+        (accepted, rejected) where rejected holds (line_number, record, reason)
+    """
+    emails = [r["email"].strip() for _, r, _ in batch]
+    phones = [r["phone"].strip() for _, r, _ in batch]
+    hashes = [p["template_hash"] for _, _, p in batch]
+
+    taken_emails = set(db.execute(select(User.email).where(User.email.in_(emails))).scalars())
+    taken_phones = set(db.execute(select(User.phone).where(User.phone.in_(phones))).scalars())
+    taken_hashes = set(db.execute(
+        select(BiometricTemplate.template_hash).where(BiometricTemplate.template_hash.in_(hashes))
+    ).scalars())
+
+    vectors = np.array([p["feature_vector"] for _, _, p in batch], dtype=np.float32)
+    existing_similarity = index.max_similarity(vectors)
+    normalized = VectorIndex._normalize(vectors)
+    in_batch_similarity = normalized @ normalized.T
+
+    accepted, rejected, accepted_rows = [], [], []
+    for i, (line_no, record, prepared) in enumerate(batch):
+        if emails[i] in taken_emails or emails[i] in state.emails:
+            reason = "duplicate_email"
+        elif phones[i] in taken_phones or phones[i] in state.phones:
+            reason = "duplicate_phone"
+        elif hashes[i] in taken_hashes or hashes[i] in state.hashes:
+            reason = "duplicate_fingerprint"
+        elif existing_similarity[i] >= threshold or (
+            accepted_rows and in_batch_similarity[i, accepted_rows].max() >= threshold
+        ):
+            reason = "similar_fingerprint"
+        else:
+            reason = None
+
+        if reason:
+            rejected.append((line_no, record, reason))
+            continue
+        state.emails.add(emails[i])
+        state.phones.add(phones[i])
+        state.hashes.add(hashes[i])
+        accepted_rows.append(i)
+        accepted.append((line_no, record, prepared))
+
+    index.add(vectors[accepted_rows])
+    return accepted, rejected
+
+
+def _allocate_ids(db: Session, table: str, count: int) -> List[int]:
+    """Reserve `count` primary keys from a table's serial sequence."""
+    return list(db.execute(
+        text(f"SELECT nextval(pg_get_serial_sequence('{table}', 'id')) FROM generate_series(1, :n)"),
+        {"n": count},
+    ).scalars())
+
+
+def write_batch(db: Session, accepted: List[Tuple[int, dict, dict]]) -> None:
+    """
+    Insert users, consents and templates for an accepted batch with COPY.
+
+    IDs are reserved up front so the three COPY streams can reference each
+    other. The caller commits.
+    """
+    if not accepted:
+        return
+    now = datetime.utcnow()
+    user_ids = _allocate_ids(db, "users", len(accepted))
+    consent_ids = _allocate_ids(db, "consents", len(accepted))
+    template_ids = _allocate_ids(db, "biometric_templates", len(accepted))
+
+    raw = db.connection().connection.driver_connection
+    with raw.cursor() as cur:
+        with cur.copy(
+            "COPY users (id, email, phone, full_name, stripe_customer_id, phone_verified, created_at) FROM STDIN"
+        ) as copy:
+            for user_id, (_, record, _) in zip(user_ids, accepted):
+                copy.write_row((
+                    user_id,
+                    record["email"].strip(),
+                    record["phone"].strip(),
+                    record["full_name"].strip(),
+                    (record.get("stripe_customer_id") or "").strip() or None,
+                    False,  # Not verified by us; OTP on first use
+                    now,
+                ))
+        with cur.copy("COPY consents (id, user_id, consent_text, accepted_at) FROM STDIN") as copy:
+            for consent_id, user_id, (_, record, _) in zip(consent_ids, user_ids, accepted):
+                copy.write_row((consent_id, user_id, record["consent_text"], now))
+        with cur.copy(
+            "COPY biometric_templates (id, user_id, template_hash, salt, salt_b64, encrypted_template, "
+            "feature_vector, finger_label, active, created_at) FROM STDIN"
+        ) as copy:
+            for template_id, user_id, (_, record, prepared) in zip(template_ids, user_ids, accepted):
+                copy.write_row((
+                    template_id,
+                    user_id,
+                    prepared["template_hash"],
+                    prepared["salt"],
+                    prepared["salt_b64"],
+                    prepared["encrypted_template"],
+                    json.dumps(prepared["feature_vector"]),
+                    record["finger_label"].strip(),
+                    True,
+                    now,
+                ))
+
+
+def run_import(
+    path: str,
+    reject_path: str,
+    fmt: str | None = None,
+    batch_size: int = 500,
+    workers: int | None = None,
+    dry_run: bool = False,
+) -> ImportStats:
+    """
+    Import enrollments from a file.
+
+    Each batch is committed on its own, so an interrupted run can be resumed
+    by re-running it: already imported records are rejected as duplicates.
+
+    Args:
+        path: JSONL or CSV input
+        reject_path: Where to write rejected records (JSONL)
+        fmt: Input format (default: inferred from the extension)
+        batch_size: Records per batch
+        workers: Prepare processes (default: CPU count)
+        dry_run: Run every stage but roll back instead of committing
+
+    Returns:
+        ImportStats with per-stage throughput
+    """
+    stats = ImportStats()
+    state = DedupeState()
+    index = VectorIndex()
+    threshold = get_fingerprint_matcher().threshold
+    workers = workers or os.cpu_count() or 1
+
+    db = SessionLocal()
+    try:
+        with stats.timed("dedupe", 0):
+            loaded = index.load(db)
+        logger.info(f"Loaded {loaded} existing feature vectors into the dedupe index")
+
+        with open(reject_path, "w", encoding="utf-8") as rejects, ProcessPoolExecutor(max_workers=workers) as pool:
+
+            def reject(line_no: int, record: dict | None, reason: str) -> None:
+                email = record.get("email") if isinstance(record, dict) else None
+                rejects.write(json.dumps({"line": line_no, "email": email, "reason": reason}) + "\n")
+                stats.rejected += 1
+
+            def flush(batch: List[Tuple[int, dict]]) -> None:
+                with stats.timed("prepare", len(batch)):
+                    chunksize = max(1, len(batch) // (workers * 4))
+                    prepared = list(pool.map(prepare_record, [r for _, r in batch], chunksize=chunksize))
+
+                ready = []
+                for (line_no, record), result in zip(batch, prepared):
+                    if "error" in result:
+                        reject(line_no, record, result["error"])
+                    else:
+                        ready.append((line_no, record, result))
+
+                if not ready:
+                    return
+                with stats.timed("dedupe", len(ready)):
+                    accepted, rejected = dedupe_batch(db, ready, index, state, threshold)
+                for line_no, record, reason in rejected:
+                    reject(line_no, record, reason)
+
+                with stats.timed("write", len(accepted)):
+                    try:
+                        write_batch(db, accepted)
+                        if dry_run:
+                            db.rollback()
+                        else:
+                            db.commit()
+                    except Exception:
+                        db.rollback()
+                        raise
+                stats.imported += len(accepted)
+                logger.info(f"Imported {stats.imported} records ({stats.rejected} rejected)")
+
+            batch: List[Tuple[int, dict]] = []
+            read_started = time.perf_counter()
+            for line_no, record in iter_records(path, fmt):
+                stats.stages["read"].rows += 1
+                reason = validate_record(record)
+                if reason:
+                    reject(line_no, record, reason)
+                    continue
+                batch.append((line_no, record))
+                if len(batch) >= batch_size:
+                    stats.stages["read"].seconds += time.perf_counter() - read_started
+                    flush(batch)
+                    batch = []
+                    read_started = time.perf_counter()
+            stats.stages["read"].seconds += time.perf_counter() - read_started
+            if batch:
+                flush(batch)
+    finally:
+        db.close()
+
+    return stats
+
+
+def main() -> None:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Bulk import enrollments from JSONL or CSV")
+    parser.add_argument("path", help="Input file (.jsonl or .csv)")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="Input format (default: from extension)")
+    parser.add_argument("--rejects", default="rejects.jsonl", help="Reject file path (default: rejects.jsonl)")
+    parser.add_argument("--batch-size", type=int, default=500, help="Records per batch (default: 500)")
+    parser.add_argument("--workers", type=int, help="Hash/encrypt processes (default: CPU count)")
+    parser.add_argument("--dry-run", action="store_true", help="Process everything but roll back every batch")
+    args = parser.parse_args()
+
+    stats = run_import(
+        args.path,
+        args.rejects,
+        fmt=args.format,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        dry_run=args.dry_run,
+    )
+    prefix = "[dry run] " if args.dry_run else ""
+    logger.info(f"{prefix}Import finished\n{stats.report()}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    main()
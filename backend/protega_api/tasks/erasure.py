@@ -0,0 +1,129 @@
+"""
+Bulk Biometric Erasure for Protega CloudPay
+===========================================
+
+Erases biometric templates, payment methods and consents for many users at
+once, in chunks of set-based statements (see compliance.erase_users). Each
+chunk is its own transaction, so a large batch never holds locks for long
+and an interrupted run can simply be started again.
+
+Two ways to pick users:
+
+    # BIPA retention: users with no biometric activity for 3 years
+    python -m protega_api.tasks.erasure --expired
+
+    # Explicit list (one user ID per line), e.g. a batch of deletion requests
+    python -m protega_api.tasks.erasure --user-ids-file ids.txt
+"""
+
+import argparse
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from protega_api.compliance import erase_users
+from protega_api.config import settings
+from protega_api.db import SessionLocal
+from protega_api.models import BiometricTemplate
+
+logger = logging.getLogger(__name__)
+
+
+def expired_user_ids(db: Session, retention_days: int) -> List[int]:
+    """
+    Find users whose biometric data has passed the retention period.
+    
+    A user expires when none of their templates has been used (or, if never
+    used, enrolled) within `retention_days`.
+    
+    Args:
+        db: Database session
+        retention_days: Days since last biometric interaction
+        
+    Returns:
+        Sorted user IDs
+    """
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    last_interaction = func.max(func.coalesce(BiometricTemplate.last_used_at, BiometricTemplate.created_at))
+    stmt = (
+        select(BiometricTemplate.user_id)
+        .group_by(BiometricTemplate.user_id)
+        .having(last_interaction < cutoff)
+        .order_by(BiometricTemplate.user_id)
+    )
+    return list(db.execute(stmt).scalars())
+
+
+def erase_in_chunks(db: Session, user_ids: List[int], chunk_size: int, dry_run: bool = False) -> Dict[str, int]:
+    """
+    Erase users chunk by chunk, committing after each chunk.
+    
+    Args:
+        db: Database session
+        user_ids: Users to erase
+        chunk_size: Users per transaction
+        dry_run: Run the statements but roll back every chunk
+        
+    Returns:
+        Total rows deleted per table
+    """
+    totals = {"biometric_templates": 0, "payment_methods": 0, "consents": 0}
+    for start in range(0, len(user_ids), chunk_size):
+        chunk = user_ids[start:start + chunk_size]
+        try:
+            counts = erase_users(chunk, db)
+            if dry_run:
+                db.rollback()
+            else:
+                db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to erase users {chunk[0]}..{chunk[-1]}: {e}")
+            raise
+        for name, count in counts.items():
+            totals[name] += count
+        logger.info(f"Erased {start + len(chunk)}/{len(user_ids)} users")
+    return totals
+
+
+def main() -> None:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Erase biometric, payment and consent data in bulk")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--expired", action="store_true", help="Erase users past the biometric retention period")
+    source.add_argument("--user-ids-file", help="File with one user ID per line")
+    parser.add_argument(
+        "--retention-days",
+        type=int,
+        default=settings.biometric_retention_days,
+        help="Days since last biometric interaction (with --expired)",
+    )
+    parser.add_argument("--chunk-size", type=int, default=settings.erasure_chunk_size, help="Users per transaction")
+    parser.add_argument("--dry-run", action="store_true", help="Report counts without committing")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.expired:
+            user_ids = expired_user_ids(db, args.retention_days)
+        else:
+            with open(args.user_ids_file) as f:
+                user_ids = sorted({int(line) for line in f if line.strip()})
+        logger.info(f"Erasing data for {len(user_ids)} users")
+
+        totals = erase_in_chunks(db, user_ids, args.chunk_size, args.dry_run)
+        prefix = "[dry run] " if args.dry_run else ""
+        logger.info(f"{prefix}Erasure finished: {totals}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    main()
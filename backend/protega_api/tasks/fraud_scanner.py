@@ -9,13 +9,16 @@ even after successful registration. Provides bank-grade fraud prevention.
 import asyncio
 import json
 import logging
+import time
 import numpy as np
 from datetime import datetime
 from typing import List
 
 from sqlalchemy.orm import Session
 
+from protega_api.config import settings
 from protega_api.db import SessionLocal
+from protega_api.metrics import FRAUD_SCAN_SECONDS, FRAUD_SCAN_TEMPLATES, observe_candidates
 from protega_api.models import BiometricTemplate, FraudAlert, User
 from protega_api.sdk.fingerprint_matcher import get_fingerprint_matcher
 
@@ -34,6 +37,8 @@ async def scan_new_enrollments():
     This runs asynchronously to avoid blocking API requests.
     """
     db: Session = None
+    started = time.perf_counter()
+    result = "error"
     try:
         db = SessionLocal()
         matcher = get_fingerprint_matcher()
@@ -48,6 +53,7 @@ async def scan_new_enrollments():
         
         if len(fingerprints) < 2:
             logger.info("Not enough fingerprints to perform similarity scan")
+            result = "skipped"
             return
         
         logger.info(f"Scanning {len(fingerprints)} fingerprints for duplicate patterns")
@@ -64,6 +70,8 @@ async def scan_new_enrollments():
                 continue
         
         logger.info(f"Successfully loaded {len(vectors_data)} feature vectors")
+        FRAUD_SCAN_TEMPLATES.set(len(vectors_data))
+        observe_candidates("fraud_scan", len(vectors_data))
         
         # Check each fingerprint against all others
         duplicate_count = 0
@@ -148,6 +156,7 @@ async def scan_new_enrollments():
                     logger.error(f"Error comparing vectors: {e}")
                     continue
         
+        result = "ok"
         if duplicate_count > 0:
             logger.warning(f"Fraud scan completed: {duplicate_count} duplicate patterns detected")
         else:
@@ -158,6 +167,7 @@ async def scan_new_enrollments():
         if db:
             db.rollback()
     finally:
+        FRAUD_SCAN_SECONDS.labels(result=result).observe(time.perf_counter() - started)
         if db:
             db.close()
 
@@ -187,5 +197,9 @@ if __name__ == "__main__":
         level=logging.INFO,
         format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     )
+    if settings.fraud_scanner_metrics_port:
+        from prometheus_client import start_http_server
+        start_http_server(settings.fraud_scanner_metrics_port)
+        logger.info(f"Serving fraud scanner metrics on port {settings.fraud_scanner_metrics_port}")
     asyncio.run(start_background_scanner())
 
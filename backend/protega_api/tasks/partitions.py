@@ -0,0 +1,220 @@
+"""
+Transaction Partition Maintenance for Protega CloudPay
+======================================================
+
+The transactions table is range partitioned by month on created_at
+(migration 013). This task keeps a window of future partitions ready and
+detaches partitions that have aged past the retention period, so new
+inserts never land in the default partition and old months can be archived
+without a bulk DELETE (and the vacuum/index churn that comes with it).
+
+Run it daily from cron or a scheduled machine:
+
+    python -m protega_api.tasks.partitions
+"""
+
+import argparse
+import logging
+import re
+from datetime import date
+from typing import List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from protega_api.config import settings
+from protega_api.db import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "transactions"
+DEFAULT_PARTITION = "transactions_default"
+PARTITION_NAME_RE = re.compile(r"^transactions_y(\d{4})m(\d{2})$")
+
+
+def add_months(month: date, count: int) -> date:
+    """Return the first day of the month `count` months after `month`."""
+    index = month.year * 12 + (month.month - 1) + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """Name of the partition holding rows created in `month`."""
+    return f"transactions_y{month.year:04d}m{month.month:02d}"
+
+
+def list_monthly_partitions(db: Session) -> List[Tuple[str, date]]:
+    """
+    List attached monthly partitions of the transactions table.
+
+    Returns:
+        Sorted list of (partition_name, month_start) tuples
+    """
+    rows = db.execute(text(
+        """
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname = :parent
+        """
+    ), {"parent": PARENT_TABLE}).scalars().all()
+
+    partitions = []
+    for name in rows:
+        match = PARTITION_NAME_RE.match(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def _create_partition(db: Session, month: date) -> None:
+    """
+    Create the partition for `month`, moving any rows that already landed
+    in the default partition for that range.
+    """
+    name = partition_name(month)
+    start, end = month.isoformat(), add_months(month, 1).isoformat()
+
+    stray_rows = db.execute(text(
+        f"SELECT COUNT(*) FROM {DEFAULT_PARTITION} "
+        f"WHERE created_at >= :start AND created_at < :end"
+    ), {"start": start, "end": end}).scalar()
+
+    if not stray_rows:
+        db.execute(text(
+            f"CREATE TABLE {name} PARTITION OF {PARENT_TABLE} "
+            f"FOR VALUES FROM ('{start}') TO ('{end}')"
+        ))
+        return
+
+    # Postgres refuses to add a partition whose range has rows in the default
+    # partition, so temporarily detach it and move those rows across.
+    logger.warning(f"Moving {stray_rows} rows from {DEFAULT_PARTITION} into {name}")
+    db.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {DEFAULT_PARTITION}"))
+    db.execute(text(
+        f"CREATE TABLE {name} PARTITION OF {PARENT_TABLE} "
+        f"FOR VALUES FROM ('{start}') TO ('{end}')"
+    ))
+    db.execute(text(
+        f"INSERT INTO {PARENT_TABLE} SELECT * FROM {DEFAULT_PARTITION} "
+        f"WHERE created_at >= :start AND created_at < :end"
+    ), {"start": start, "end": end})
+    db.execute(text(
+        f"DELETE FROM {DEFAULT_PARTITION} WHERE created_at >= :start AND created_at < :end"
+    ), {"start": start, "end": end})
+    db.execute(text(f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+
+
+def ensure_future_partitions(db: Session, months_ahead: int, dry_run: bool = False) -> List[str]:
+    """
+    Create any missing partitions from the current month through `months_ahead`.
+
+    Args:
+        db: Database session (committed per partition)
+        months_ahead: Number of months after the current one to pre-create
+        dry_run: Only report what would be created
+
+    Returns:
+        Names of partitions created (or that would be created)
+    """
+    existing = {month for _, month in list_monthly_partitions(db)}
+    current_month = date.today().replace(day=1)
+
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current_month, offset)
+        if month in existing:
+            continue
+        created.append(partition_name(month))
+        if dry_run:
+            continue
+        try:
+            _create_partition(db, month)
+            db.commit()
+            logger.info(f"Created partition {partition_name(month)}")
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to create partition {partition_name(month)}: {e}")
+            raise
+
+    return created
+
+
+def detach_expired_partitions(db: Session, retain_months: int, dry_run: bool = False) -> List[str]:
+    """
+    Detach monthly partitions older than the retention window.
+
+    Detached partitions are left in place as standalone tables so they can be
+    archived (pg_dump) and dropped out of band.
+
+    Args:
+        db: Database session (committed per partition)
+        retain_months: Number of whole months to keep attached, counting back
+            from the current month
+        dry_run: Only report what would be detached
+
+    Returns:
+        Names of partitions detached (or that would be detached)
+    """
+    cutoff = add_months(date.today().replace(day=1), -retain_months)
+
+    detached = []
+    for name, month in list_monthly_partitions(db):
+        if month >= cutoff:
+            continue
+        detached.append(name)
+        if dry_run:
+            continue
+        try:
+            db.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+            # Charge keys pointing into the detached month would no longer resolve
+            db.execute(
+                text("DELETE FROM transaction_charges WHERE created_at >= :start AND created_at < :end"),
+                {"start": month, "end": add_months(month, 1)},
+            )
+            db.commit()
+            logger.info(f"Detached partition {name}")
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to detach partition {name}: {e}")
+            raise
+
+    return detached
+
+
+def main() -> None:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Maintain monthly transaction partitions")
+    parser.add_argument(
+        "--months-ahead",
+        type=int,
+        default=settings.transactions_partition_months_ahead,
+        help="Months after the current one to pre-create",
+    )
+    parser.add_argument(
+        "--retain-months",
+        type=int,
+        default=settings.transactions_retention_months,
+        help="Months of history to keep attached",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Report changes without applying them")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        created = ensure_future_partitions(db, args.months_ahead, args.dry_run)
+        detached = detach_expired_partitions(db, args.retain_months, args.dry_run)
+        prefix = "[dry run] " if args.dry_run else ""
+        logger.info(f"{prefix}Created partitions: {created or 'none'}")
+        logger.info(f"{prefix}Detached partitions: {detached or 'none'}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    main()
@@ -0,0 +1,125 @@
+"""
+Rollup Repair Job for Protega CloudPay
+======================================
+
+Rebuilds the incrementally maintained merchant rollups from the
+transactions table. Use it after a backfill, a manual data fix, or if a
+rollup is suspected to have drifted:
+
+    python -m protega_api.tasks.rollup_repair --day 2025-02-14
+    python -m protega_api.tasks.rollup_repair --from 2025-02-01 --to 2025-02-14 --merchant-id 7
+    python -m protega_api.tasks.rollup_repair --customers --merchant-id 7
+"""
+
+import argparse
+import logging
+from datetime import date, datetime, timedelta
+from typing import List
+
+from sqlalchemy import union
+from sqlalchemy.orm import Session
+
+from protega_api.db import SessionLocal
+from protega_api.models import MerchantDailyStats, Transaction
+from protega_api.rollups import rebuild_customer_rollup, rebuild_merchant_day
+
+logger = logging.getLogger(__name__)
+
+
+def merchants_for_day(db: Session, day: date) -> List[int]:
+    """
+    Find merchants that have transactions or existing stats on a day.
+
+    Args:
+        db: Database session
+        day: UTC day
+
+    Returns:
+        Sorted merchant IDs
+    """
+    start = datetime.combine(day, datetime.min.time())
+    end = start + timedelta(days=1)
+    query = union(
+        db.query(Transaction.merchant_id).filter(
+            Transaction.created_at >= start,
+            Transaction.created_at < end,
+        ).statement,
+        db.query(MerchantDailyStats.merchant_id).filter(
+            MerchantDailyStats.day == day,
+        ).statement,
+    )
+    return sorted(db.execute(query).scalars().all())
+
+
+def repair_days(db: Session, first_day: date, last_day: date, merchant_id: int | None = None) -> int:
+    """
+    Rebuild daily stats for every day in [first_day, last_day].
+
+    Each merchant-day is committed on its own so a long repair never holds
+    locks on the whole rollup table.
+
+    Args:
+        db: Database session
+        first_day: First UTC day to rebuild
+        last_day: Last UTC day to rebuild (inclusive)
+        merchant_id: Restrict to one merchant (default: all merchants active that day)
+
+    Returns:
+        Number of merchant-days rebuilt
+    """
+    rebuilt = 0
+    day = first_day
+    while day <= last_day:
+        merchant_ids = [merchant_id] if merchant_id is not None else merchants_for_day(db, day)
+        for mid in merchant_ids:
+            try:
+                rebuild_merchant_day(db, mid, day)
+                db.commit()
+                rebuilt += 1
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Failed to rebuild daily stats for merchant {mid} on {day}: {e}")
+                raise
+        day += timedelta(days=1)
+    return rebuilt
+
+
+def main() -> None:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Rebuild merchant rollups from transactions")
+    parser.add_argument("--day", type=date.fromisoformat, help="Single UTC day to rebuild (YYYY-MM-DD)")
+    parser.add_argument("--from", dest="first_day", type=date.fromisoformat, help="First UTC day to rebuild")
+    parser.add_argument("--to", dest="last_day", type=date.fromisoformat, help="Last UTC day to rebuild (inclusive)")
+    parser.add_argument("--merchant-id", type=int, help="Only rebuild this merchant")
+    parser.add_argument("--customers", action="store_true", help="Also rebuild the merchant customer rollup")
+    args = parser.parse_args()
+
+    first_day = args.day or args.first_day
+    last_day = args.day or args.last_day or first_day
+    if first_day is None and not args.customers:
+        parser.error("pass --day, --from/--to, or --customers")
+    if args.customers and args.merchant_id is None:
+        parser.error("--customers requires --merchant-id")
+
+    db = SessionLocal()
+    try:
+        if first_day is not None:
+            rebuilt = repair_days(db, first_day, last_day, args.merchant_id)
+            logger.info(f"Rebuilt {rebuilt} merchant-days between {first_day} and {last_day}")
+
+        if args.customers:
+            rebuild_customer_rollup(db, args.merchant_id)
+            db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    main()
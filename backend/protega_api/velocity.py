@@ -0,0 +1,325 @@
+"""
+Sliding-window velocity counters for anti-fraud limits.
+
+Answers "how many enrollments for key X in the last W seconds" without
+scanning biometric_templates. Events are counted in fixed time buckets, so
+a query only sums the buckets inside the window: O(window / bucket) reads,
+independent of how many enrollments exist.
+
+Backends:
+- postgres: shared velocity_counters table, consistent across workers (default)
+- memory: per-process counters (single worker, tests)
+
+Counts are conservative: the oldest bucket in a window is counted in full,
+so a result may include events up to one bucket older than the window.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from enum import Enum as PyEnum
+from typing import Dict, Optional, Protocol
+
+from sqlalchemy import Select, func, literal, select
+from sqlalchemy.dialects.postgresql import insert
+
+from protega_api.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Enrollment limits are evaluated over 24 hours
+DAY_SECONDS = 24 * 3600
+
+
+class VelocityKind(str, PyEnum):
+    """Keys that enrollment velocity is tracked by."""
+    DEVICE = "device_id"
+    IP = "enroll_ip"
+    CARD = "card_fingerprint"
+    PHONE = "phone"
+
+
+class VelocityBackend(Protocol):
+    """Storage for bucketed counters."""
+
+    def increment(self, kind: str, key_hash: str, bucket_start: int, amount: int) -> None:
+        """Add `amount` to one bucket."""
+        ...
+
+    def sum_since(self, kind: str, key_hash: str, first_bucket: int) -> int:
+        """Sum every bucket starting at or after `first_bucket`."""
+        ...
+
+    def increment_and_sum(
+        self, kind: str, key_hash: str, bucket_start: int, amount: int, first_bucket: int
+    ) -> int:
+        """Add `amount` to one bucket and return the new sum since `first_bucket`, atomically."""
+        ...
+
+
+class InMemoryVelocityBackend:
+    """
+    Per-process bucketed counters.
+
+    Buckets older than `retention_seconds` are dropped on write, and the
+    least recently used keys are evicted beyond `max_keys`.
+    """
+
+    def __init__(self, retention_seconds: int, max_keys: int = 100_000):
+        self.retention_seconds = retention_seconds
+        self.max_keys = max_keys
+        self._counters: "OrderedDict[tuple[str, str], Dict[int, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def increment(self, kind: str, key_hash: str, bucket_start: int, amount: int) -> None:
+        with self._lock:
+            self._increment(kind, key_hash, bucket_start, amount)
+
+    def _increment(self, kind: str, key_hash: str, bucket_start: int, amount: int) -> None:
+        cutoff = bucket_start - self.retention_seconds
+        buckets = self._counters.setdefault((kind, key_hash), {})
+        self._counters.move_to_end((kind, key_hash))
+        buckets[bucket_start] = buckets.get(bucket_start, 0) + amount
+        for start in [s for s in buckets if s < cutoff]:
+            del buckets[start]
+        while len(self._counters) > self.max_keys:
+            self._counters.popitem(last=False)
+
+    def sum_since(self, kind: str, key_hash: str, first_bucket: int) -> int:
+        with self._lock:
+            return self._sum_since(kind, key_hash, first_bucket)
+
+    def increment_and_sum(
+        self, kind: str, key_hash: str, bucket_start: int, amount: int, first_bucket: int
+    ) -> int:
+        with self._lock:
+            self._increment(kind, key_hash, bucket_start, amount)
+            return self._sum_since(kind, key_hash, first_bucket)
+
+    def _sum_since(self, kind: str, key_hash: str, first_bucket: int) -> int:
+        buckets = self._counters.get((kind, key_hash))
+        if not buckets:
+            return 0
+        return sum(count for start, count in buckets.items() if start >= first_bucket)
+
+
+class PostgresVelocityBackend:
+    """
+    Shared bucketed counters in the velocity_counters table.
+
+    Increments are single-statement upserts; expired buckets are pruned
+    every `prune_every` increments.
+    """
+
+    def __init__(self, retention_seconds: int, prune_every: int = 1000):
+        self.retention_seconds = retention_seconds
+        self.prune_every = prune_every
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _upsert(kind: str, key_hash: str, bucket_start: int, amount: int):
+        from protega_api.models import VelocityCounter as VelocityCounterRow
+
+        stmt = insert(VelocityCounterRow).values(
+            kind=kind,
+            key_hash=key_hash,
+            bucket_start=datetime.utcfromtimestamp(bucket_start),
+            count=amount,
+        )
+        return stmt.on_conflict_do_update(
+            index_elements=[VelocityCounterRow.kind, VelocityCounterRow.key_hash, VelocityCounterRow.bucket_start],
+            set_={"count": VelocityCounterRow.count + amount},
+        )
+
+    def _after_write(self, bucket_start: int) -> None:
+        with self._lock:
+            self._writes += 1
+            should_prune = self._writes % self.prune_every == 0
+        if should_prune:
+            self.prune(bucket_start - self.retention_seconds)
+
+    def increment(self, kind: str, key_hash: str, bucket_start: int, amount: int) -> None:
+        from protega_api.db import engine
+
+        with engine.begin() as conn:
+            conn.execute(self._upsert(kind, key_hash, bucket_start, amount))
+        self._after_write(bucket_start)
+
+    def sum_since(self, kind: str, key_hash: str, first_bucket: int) -> int:
+        from protega_api.db import engine
+
+        with engine.connect() as conn:
+            return int(conn.execute(self.sum_since_query(kind, key_hash, first_bucket)).scalar() or 0)
+
+    def sum_since_query(self, kind: str, key_hash: str, first_bucket: int) -> Select:
+        """SELECT of the windowed sum, labelled `hits`, for embedding in larger queries."""
+        from protega_api.models import VelocityCounter as VelocityCounterRow
+
+        return select(
+            func.coalesce(func.sum(VelocityCounterRow.count), 0).label("hits")
+        ).where(
+            VelocityCounterRow.kind == kind,
+            VelocityCounterRow.key_hash == key_hash,
+            VelocityCounterRow.bucket_start >= datetime.utcfromtimestamp(first_bucket),
+        )
+
+    def increment_and_sum(
+        self, kind: str, key_hash: str, bucket_start: int, amount: int, first_bucket: int
+    ) -> int:
+        """
+        Upsert the bucket and sum the window in one statement.
+
+        ON CONFLICT DO UPDATE serializes writers on the bucket row, so
+        RETURNING hands each concurrent caller a distinct count. Earlier
+        buckets are no longer written and are read from the snapshot.
+        """
+        from protega_api.db import engine
+        from protega_api.models import VelocityCounter as VelocityCounterRow
+
+        current = datetime.utcfromtimestamp(bucket_start)
+        bumped = self._upsert(kind, key_hash, bucket_start, amount).returning(VelocityCounterRow.count).cte("bumped")
+        others = (
+            self.sum_since_query(kind, key_hash, first_bucket)
+            .where(VelocityCounterRow.bucket_start != current)
+            .scalar_subquery()
+        )
+        stmt = select(bumped.c.count + others)
+        with engine.begin() as conn:
+            total = int(conn.execute(stmt).scalar() or 0)
+        self._after_write(bucket_start)
+        return total
+
+    def prune(self, before_epoch: int) -> None:
+        """Delete buckets that started before `before_epoch`."""
+        from protega_api.db import engine
+        from protega_api.models import VelocityCounter as VelocityCounterRow
+
+        try:
+            with engine.begin() as conn:
+                conn.execute(
+                    VelocityCounterRow.__table__.delete().where(
+                        VelocityCounterRow.bucket_start < datetime.utcfromtimestamp(before_epoch)
+                    )
+                )
+        except Exception as e:
+            logger.error(f"Failed to prune velocity counters: {e}")
+
+
+class VelocityCounter:
+    """Records events and answers windowed counts per (kind, key)."""
+
+    def __init__(self, backend: VelocityBackend, bucket_seconds: int):
+        self.backend = backend
+        self.bucket_seconds = bucket_seconds
+
+    @staticmethod
+    def _key_hash(key: str) -> str:
+        """Keys are stored hashed so phone numbers and IPs never sit in counter tables."""
+        return hashlib.sha256(key.strip().lower().encode()).hexdigest()
+
+    def _bucket(self, epoch: float) -> int:
+        return int(epoch // self.bucket_seconds) * self.bucket_seconds
+
+    def record(self, kind: VelocityKind, key: Optional[str], amount: int = 1) -> None:
+        """
+        Record an event for a key. Empty keys are ignored.
+
+        Failures are logged and swallowed: velocity tracking must never
+        break the enrollment it is observing.
+        """
+        if not key:
+            return
+        try:
+            self.backend.increment(kind.value, self._key_hash(key), self._bucket(time.time()), amount)
+        except Exception as e:
+            logger.error(f"Failed to record {kind.value} velocity: {e}")
+
+    def count(self, kind: VelocityKind, key: Optional[str], window_seconds: int = DAY_SECONDS) -> int:
+        """
+        Count events for a key within the trailing window.
+
+        Args:
+            kind: Which key space to query
+            key: Key value (device ID, IP, card fingerprint, phone)
+            window_seconds: Window length (default: 24 hours)
+
+        Returns:
+            Event count (0 for empty keys or on backend errors)
+        """
+        if not key:
+            return 0
+        first_bucket = self._bucket(time.time() - window_seconds)
+        try:
+            return self.backend.sum_since(kind.value, self._key_hash(key), first_bucket)
+        except Exception as e:
+            logger.error(f"Failed to read {kind.value} velocity: {e}")
+            return 0
+
+    def exceeds(self, kind: VelocityKind, key: Optional[str], limit: int, window_seconds: int = DAY_SECONDS) -> bool:
+        """Check whether a key has already reached `limit` events in the window."""
+        return self.count(kind, key, window_seconds) >= limit
+
+    def record_and_count(self, kind: VelocityKind, key: Optional[str], window_seconds: int = DAY_SECONDS) -> int:
+        """
+        Record an event and count the window including it, as one atomic step.
+
+        Use this to enforce a limit: concurrent callers each see a distinct
+        total, so at most `limit` of them can observe a count <= `limit`.
+
+        Args:
+            kind: Which key space to record in
+            key: Key value (device ID, IP, card fingerprint, phone)
+            window_seconds: Window length (default: 24 hours)
+
+        Returns:
+            Event count including this one (0 for empty keys or on backend errors)
+        """
+        if not key:
+            return 0
+        now = time.time()
+        try:
+            return self.backend.increment_and_sum(
+                kind.value, self._key_hash(key), self._bucket(now), 1, self._bucket(now - window_seconds)
+            )
+        except Exception as e:
+            logger.error(f"Failed to record {kind.value} velocity: {e}")
+            return 0
+
+    def count_query(
+        self, kind: VelocityKind, key: Optional[str], window_seconds: int = DAY_SECONDS
+    ) -> Optional[Select]:
+        """
+        Build the windowed count as a SELECT so callers can fold it into their own query.
+
+        Returns:
+            SELECT with a single `hits` column, or None when the backend is not
+            database-backed (use `count` instead)
+        """
+        sum_since_query = getattr(self.backend, "sum_since_query", None)
+        if sum_since_query is None:
+            return None
+        if not key:
+            return select(literal(0).label("hits"))
+        first_bucket = self._bucket(time.time() - window_seconds)
+        return sum_since_query(kind.value, self._key_hash(key), first_bucket)
+
+
+# Global instance
+_velocity_instance = None
+
+def get_velocity_counter() -> VelocityCounter:
+    """Get or create the global velocity counter for the configured backend."""
+    global _velocity_instance
+    if _velocity_instance is None:
+        retention = max(DAY_SECONDS, settings.velocity_bucket_seconds) + settings.velocity_bucket_seconds
+        if settings.velocity_backend == "memory":
+            backend = InMemoryVelocityBackend(retention_seconds=retention)
+        else:
+            backend = PostgresVelocityBackend(retention_seconds=retention)
+        _velocity_instance = VelocityCounter(backend, settings.velocity_bucket_seconds)
+        logger.info(f"Velocity counters using {settings.velocity_backend} backend")
+    return _velocity_instance
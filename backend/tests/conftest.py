@@ -0,0 +1,13 @@
+"""
+Shared test setup.
+
+These are unit tests of in-process components; none of them need Postgres,
+Stripe or Twilio. Required secrets get dummy values before protega_api
+reads its settings.
+"""
+
+import os
+
+os.environ.setdefault("STRIPE_SECRET_KEY", "sk_test_dummy")
+os.environ.setdefault("JWT_SECRET", "test-jwt-secret")
+os.environ.setdefault("PROTEGA_MASTER_KEY", "test-master-key")
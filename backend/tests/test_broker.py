@@ -0,0 +1,51 @@
+"""Splitting broker envelopes to fit NOTIFY payloads."""
+
+import json
+
+from protega_api.broker import split_envelope
+
+
+def size(envelope: dict) -> int:
+    return len(json.dumps(envelope).encode())
+
+
+def make_envelope(count: int, padding: int = 50) -> dict:
+    return {
+        "origin": "worker-1",
+        "messages": [{"transaction_id": i, "note": "x" * padding} for i in range(count)],
+    }
+
+
+def test_small_envelope_is_unchanged():
+    envelope = make_envelope(3)
+    assert split_envelope(envelope, limit=10_000) == [envelope]
+
+
+def test_large_envelope_is_split_in_order_within_limit():
+    envelope = make_envelope(40)
+    limit = 600
+    chunks = split_envelope(envelope, limit=limit)
+
+    assert len(chunks) > 1
+    assert all(size(chunk) <= limit for chunk in chunks)
+    assert all(chunk["origin"] == "worker-1" for chunk in chunks)
+    assert [m for chunk in chunks for m in chunk["messages"]] == envelope["messages"]
+
+
+def test_chunks_are_packed_to_the_limit():
+    envelope = make_envelope(10)
+    # Exactly two messages fit
+    limit = size({**envelope, "messages": envelope["messages"][:2]})
+    chunks = split_envelope(envelope, limit=limit)
+    assert [len(chunk["messages"]) for chunk in chunks] == [2] * 5
+
+
+def test_oversized_message_is_sent_alone():
+    envelope = {"messages": [{"id": 1}, {"id": 2, "blob": "x" * 1000}, {"id": 3}]}
+    chunks = split_envelope(envelope, limit=200)
+    assert [[m["id"] for m in chunk["messages"]] for chunk in chunks] == [[1], [2], [3]]
+
+
+def test_envelope_without_messages_is_unchanged():
+    envelope = {"event": "x" * 1000}
+    assert split_envelope(envelope, limit=100) == [envelope]
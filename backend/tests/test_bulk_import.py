@@ -0,0 +1,103 @@
+"""Bulk import record validation and rejects (no database stages)."""
+
+import json
+
+import numpy as np
+import pytest
+
+from protega_api.sdk.synthetic import FEATURE_DIM
+
+try:
+    from protega_api.tasks.bulk_import import (
+        VectorIndex,
+        iter_records,
+        parse_feature_vector,
+        prepare_record,
+        validate_record,
+    )
+except Exception as e:  # protega_api.tasks imports the ORM models
+    pytest.skip(f"protega_api.tasks is not importable: {e}", allow_module_level=True)
+
+
+def make_record(**overrides) -> dict:
+    record = {
+        "email": "ada@example.com",
+        "full_name": "Ada Lovelace",
+        "phone": "+15550100000",
+        "fingerprint_sample": "sample-001",
+        "finger_label": "right_index",
+        "consent_text": "I consent",
+    }
+    record.update(overrides)
+    return record
+
+
+def test_valid_record():
+    assert validate_record(make_record()) is None
+
+
+@pytest.mark.parametrize("record, reason", [
+    (None, "invalid_json"),
+    (["not", "a", "dict"], "invalid_json"),
+    (make_record(email=""), "missing_email"),
+    (make_record(consent_text="   "), "missing_consent_text"),
+    (make_record(email="ada.example.com"), "invalid_email"),
+    (make_record(phone="12345"), "invalid_phone"),
+])
+def test_validate_record_rejects(record, reason):
+    assert validate_record(record) == reason
+
+
+def test_iter_records_yields_none_for_bad_json(tmp_path):
+    path = tmp_path / "records.jsonl"
+    path.write_text(json.dumps(make_record()) + "\n\n{broken\n")
+    assert [(line_no, record is None) for line_no, record in iter_records(str(path))] == [(1, False), (3, True)]
+
+
+def test_iter_records_csv_line_numbers(tmp_path):
+    path = tmp_path / "records.csv"
+    path.write_text("email,full_name\na@example.com,A\nb@example.com,B\n")
+    assert [line_no for line_no, _ in iter_records(str(path))] == [2, 3]
+
+
+def test_parse_feature_vector_accepts_list_and_json_string():
+    values = [0.5] * FEATURE_DIM
+    assert parse_feature_vector(values).shape == (FEATURE_DIM,)
+    assert np.allclose(parse_feature_vector(json.dumps(values)), values)
+
+
+@pytest.mark.parametrize("value", [
+    "not json",
+    "[1, 2",
+    [0.5] * (FEATURE_DIM - 1),
+    [[0.5] * FEATURE_DIM],
+    ["a"] * FEATURE_DIM,
+    [0.5] * (FEATURE_DIM - 1) + [float("nan")],
+    json.dumps([0.5] * (FEATURE_DIM - 1) + [1e309]),
+    {"x": 1},
+])
+def test_parse_feature_vector_rejects(value):
+    assert parse_feature_vector(value) is None
+
+
+def test_prepare_record_rejects_invalid_feature_vector():
+    assert prepare_record(make_record(feature_vector=[1.0, 2.0])) == {"error": "invalid_feature_vector"}
+
+
+def test_prepare_record_uses_precomputed_vector():
+    vector = [float(i) / FEATURE_DIM for i in range(FEATURE_DIM)]
+    prepared = prepare_record(make_record(feature_vector=vector))
+    assert "error" not in prepared
+    assert np.allclose(prepared["feature_vector"], vector)
+    assert prepared["template_hash"] and prepared["encrypted_template"]
+
+
+def test_vector_index_similarity():
+    index = VectorIndex()
+    probe = np.eye(FEATURE_DIM, dtype=np.float32)[:2]
+    assert index.max_similarity(probe).tolist() == [0.0, 0.0]
+
+    index.add(probe[:1] * 3)
+    similarity = index.max_similarity(probe)
+    assert similarity[0] == pytest.approx(1.0)
+    assert similarity[1] == pytest.approx(0.0)
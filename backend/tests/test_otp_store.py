@@ -0,0 +1,77 @@
+"""OTP code storage (memory backend)."""
+
+from protega_api import otp_store
+from protega_api.otp_store import InMemoryOtpStore, OtpCheck
+
+PHONE = "+15550100000"
+
+
+def freeze(monkeypatch, now: float) -> None:
+    monkeypatch.setattr(otp_store.time, "time", lambda: now)
+
+
+def test_code_is_single_use(monkeypatch):
+    freeze(monkeypatch, 1000)
+    store = InMemoryOtpStore(max_entries=100)
+    store.put_code(PHONE, "123456", ttl_seconds=300)
+
+    assert store.consume_code(PHONE, "123456", verified_ttl_seconds=3600) == OtpCheck.VERIFIED
+    assert store.consume_code(PHONE, "123456", verified_ttl_seconds=3600) == OtpCheck.MISSING
+    assert store.is_verified(PHONE)
+
+
+def test_wrong_code_keeps_the_pending_code(monkeypatch):
+    freeze(monkeypatch, 1000)
+    store = InMemoryOtpStore(max_entries=100)
+    store.put_code(PHONE, "123456", ttl_seconds=300)
+
+    assert store.consume_code(PHONE, "000000", verified_ttl_seconds=3600) == OtpCheck.INVALID
+    assert not store.is_verified(PHONE)
+    assert store.consume_code(PHONE, "123456", verified_ttl_seconds=3600) == OtpCheck.VERIFIED
+
+
+def test_expired_code(monkeypatch):
+    store = InMemoryOtpStore(max_entries=100, sweep_interval_seconds=3600)
+    freeze(monkeypatch, 1000)
+    store.put_code(PHONE, "123456", ttl_seconds=300)
+
+    freeze(monkeypatch, 1301)
+    assert store.consume_code(PHONE, "123456", verified_ttl_seconds=3600) == OtpCheck.EXPIRED
+    assert store.consume_code(PHONE, "123456", verified_ttl_seconds=3600) == OtpCheck.MISSING
+
+
+def test_sweep_drops_expired_codes(monkeypatch):
+    store = InMemoryOtpStore(max_entries=100, sweep_interval_seconds=60)
+    freeze(monkeypatch, 1000)
+    store.put_code(PHONE, "123456", ttl_seconds=30)
+
+    freeze(monkeypatch, 1061)
+    assert store.consume_code(PHONE, "123456", verified_ttl_seconds=3600) == OtpCheck.MISSING
+
+
+def test_verification_expires(monkeypatch):
+    store = InMemoryOtpStore(max_entries=100)
+    freeze(monkeypatch, 1000)
+    store.put_code(PHONE, "123456", ttl_seconds=300)
+    store.consume_code(PHONE, "123456", verified_ttl_seconds=60)
+
+    freeze(monkeypatch, 1061)
+    assert not store.is_verified(PHONE)
+
+
+def test_new_code_replaces_the_pending_one(monkeypatch):
+    freeze(monkeypatch, 1000)
+    store = InMemoryOtpStore(max_entries=100)
+    store.put_code(PHONE, "111111", ttl_seconds=300)
+    store.put_code(PHONE, "222222", ttl_seconds=300)
+    assert store.consume_code(PHONE, "111111", verified_ttl_seconds=3600) == OtpCheck.INVALID
+    assert store.consume_code(PHONE, "222222", verified_ttl_seconds=3600) == OtpCheck.VERIFIED
+
+
+def test_oldest_codes_are_evicted_beyond_max_entries(monkeypatch):
+    freeze(monkeypatch, 1000)
+    store = InMemoryOtpStore(max_entries=2)
+    for i in range(3):
+        store.put_code(f"+1555010000{i}", "123456", ttl_seconds=300)
+    assert store.consume_code("+15550100000", "123456", verified_ttl_seconds=60) == OtpCheck.MISSING
+    assert store.consume_code("+15550100002", "123456", verified_ttl_seconds=60) == OtpCheck.VERIFIED
@@ -0,0 +1,70 @@
+"""Keyset (cursor) pagination."""
+
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException, Response
+from sqlalchemy import Column, DateTime, Integer, create_engine
+from sqlalchemy.orm import Session, declarative_base
+
+from protega_api.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor, keyset_page, set_next_cursor
+
+Base = declarative_base()
+
+
+class Row(Base):
+    __tablename__ = "rows"
+    id = Column(Integer, primary_key=True)
+    created_at = Column(DateTime, nullable=False)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    start = datetime(2025, 1, 1)
+    with Session(engine) as session:
+        # Ids 1-7; 3, 4 and 5 share a timestamp, so ties are broken by id
+        offsets = [0, 1, 2, 2, 2, 3, 4]
+        session.add_all(Row(id=i + 1, created_at=start + timedelta(minutes=m)) for i, m in enumerate(offsets))
+        session.commit()
+        yield session
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2025, 3, 1, 12, 30, 15, 123456)
+    cursor = encode_cursor(created_at, 42)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (created_at, 42)
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", encode_cursor(datetime(2025, 1, 1), 1)[:-4], "!!!"])
+def test_malformed_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as excinfo:
+        decode_cursor(cursor)
+    assert excinfo.value.status_code == 400
+
+
+def test_pages_cover_every_row_once_newest_first(db):
+    seen, cursor = [], None
+    while True:
+        rows, cursor = keyset_page(db.query(Row), Row, cursor, limit=2)
+        seen.extend(row.id for row in rows)
+        if cursor is None:
+            break
+    assert seen == [7, 6, 5, 4, 3, 2, 1]
+
+
+def test_last_page_has_no_cursor(db):
+    rows, cursor = keyset_page(db.query(Row), Row, None, limit=7)
+    assert len(rows) == 7 and cursor is None
+
+
+def test_next_cursor_header():
+    response = Response()
+    set_next_cursor(response, "abc")
+    assert response.headers[NEXT_CURSOR_HEADER] == "abc"
+
+    last_page = Response()
+    set_next_cursor(last_page, None)
+    assert NEXT_CURSOR_HEADER not in last_page.headers
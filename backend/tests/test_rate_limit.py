@@ -0,0 +1,73 @@
+"""Token-bucket rate limiting (in-memory backend)."""
+
+import asyncio
+import json
+
+from protega_api.rate_limit import InMemoryRateLimitBackend, Limit, RateLimitMiddleware, by_ip, by_phone, normalize_phone
+
+# Slow enough that no token is refilled during a test
+RATE = 1e-6
+
+
+def make_middleware(ip_burst: int, phone_burst: int) -> RateLimitMiddleware:
+    policies = {
+        "/otp/send": [
+            Limit("otp_ip", ip_burst, RATE, by_ip),
+            Limit("otp_phone", phone_burst, RATE, by_phone),
+        ],
+    }
+    return RateLimitMiddleware(app=None, policies=policies, backend=InMemoryRateLimitBackend())
+
+
+def check(middleware: RateLimitMiddleware, ip: str, phone: str):
+    body = json.dumps({"phone": phone}).encode()
+    return asyncio.run(middleware._check(middleware.policies["/otp/send"], ip, body))
+
+
+def test_take_all_allows_burst_then_rejects():
+    backend = InMemoryRateLimitBackend()
+    buckets = [("k", 2, RATE)]
+    assert asyncio.run(backend.take_all(buckets)) == [0.0]
+    assert asyncio.run(backend.take_all(buckets)) == [0.0]
+    waits = asyncio.run(backend.take_all(buckets))
+    assert waits[0] > 0
+
+
+def test_take_all_is_all_or_nothing():
+    backend = InMemoryRateLimitBackend()
+    asyncio.run(backend.take_all([("empty", 1, RATE)]))
+
+    # "empty" has no token, so "full" must keep its only one
+    waits = asyncio.run(backend.take_all([("empty", 1, RATE), ("full", 1, RATE)]))
+    assert waits[0] > 0 and waits[1] == 0.0
+    assert asyncio.run(backend.take_all([("full", 1, RATE)])) == [0.0]
+
+
+def test_rejection_by_ip_does_not_drain_phone_bucket():
+    middleware = make_middleware(ip_burst=1, phone_burst=2)
+    phone = "+15550100000"
+
+    assert check(middleware, "10.0.0.1", phone) is None
+    # Rejected by otp_ip: the phone bucket keeps its second token
+    assert check(middleware, "10.0.0.1", phone) is not None
+    assert check(middleware, "10.0.0.2", phone) is None
+    assert check(middleware, "10.0.0.3", phone) is not None
+
+
+def test_phone_formats_share_a_bucket():
+    middleware = make_middleware(ip_burst=10, phone_burst=1)
+    assert check(middleware, "10.0.0.1", "+1 (555) 010-0000") is None
+    assert check(middleware, "10.0.0.2", "+15550100000") is not None
+
+
+def test_requests_without_keys_are_not_limited():
+    middleware = make_middleware(ip_burst=1, phone_burst=1)
+    limits = middleware.policies["/otp/send"]
+    for _ in range(3):
+        assert asyncio.run(middleware._check(limits, None, b"not json")) is None
+
+
+def test_normalize_phone():
+    assert normalize_phone("+1 (555) 010-0000") == "15550100000"
+    assert by_phone(None, {"phone": "--"}) is None
+    assert by_phone(None, {"phone": 5550100}) is None
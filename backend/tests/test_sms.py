@@ -0,0 +1,126 @@
+"""Background SMS dispatcher."""
+
+import asyncio
+
+import pytest
+
+from protega_api.sms import SmsDispatcher, SmsQueueFull
+
+
+def make_dispatcher(send, **overrides) -> SmsDispatcher:
+    options = dict(
+        concurrency=2,
+        max_attempts=3,
+        retry_backoff_seconds=0.0,
+        dedupe_seconds=30.0,
+        queue_size=10,
+        history_size=100,
+    )
+    options.update(overrides)
+    return SmsDispatcher(send=send, **options)
+
+
+async def wait_done(delivery, timeout: float = 2.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while delivery.status not in ("sent", "failed"):
+        assert asyncio.get_running_loop().time() < deadline, "delivery did not finish"
+        await asyncio.sleep(0.01)
+
+
+class ClientError(Exception):
+    status = 400
+
+
+def test_delivers_in_the_background():
+    sent = []
+
+    async def scenario():
+        dispatcher = make_dispatcher(lambda phone, body: sent.append((phone, body)))
+        await dispatcher.start()
+        try:
+            delivery = dispatcher.submit("+15550100000", "code 123456")
+            assert delivery.status == "queued"
+            await wait_done(delivery)
+            return delivery, dispatcher.get(delivery.id)
+        finally:
+            await dispatcher.stop()
+
+    delivery, looked_up = asyncio.run(scenario())
+    assert delivery.status == "sent" and delivery.attempts == 1
+    assert looked_up is delivery
+    assert sent == [("+15550100000", "code 123456")]
+    assert "body" not in delivery.to_dict()
+
+
+def test_transient_failures_are_retried():
+    calls = []
+
+    def flaky(phone, body):
+        calls.append(phone)
+        if len(calls) < 3:
+            raise RuntimeError("timeout")
+
+    async def scenario():
+        dispatcher = make_dispatcher(flaky)
+        await dispatcher.start()
+        try:
+            delivery = dispatcher.submit("+15550100000", "hi")
+            await wait_done(delivery)
+            return delivery
+        finally:
+            await dispatcher.stop()
+
+    delivery = asyncio.run(scenario())
+    assert delivery.status == "sent"
+    assert delivery.attempts == 3 and delivery.error is None
+
+
+def test_client_errors_are_not_retried():
+    def reject(phone, body):
+        raise ClientError("invalid number")
+
+    async def scenario():
+        dispatcher = make_dispatcher(reject)
+        await dispatcher.start()
+        try:
+            delivery = dispatcher.submit("+15550100000", "hi")
+            await wait_done(delivery)
+            return delivery, dispatcher.recent("+15550100000")
+        finally:
+            await dispatcher.stop()
+
+    delivery, recent = asyncio.run(scenario())
+    assert delivery.status == "failed" and delivery.attempts == 1
+    assert recent is None  # A failed delivery does not block a resend
+
+
+def test_recent_delivery_is_reused_within_dedupe_window():
+    async def scenario():
+        dispatcher = make_dispatcher(lambda phone, body: None, concurrency=0)
+        await dispatcher.start()
+        try:
+            delivery = dispatcher.submit("+15550100000", "hi")
+            return delivery, dispatcher.recent("+15550100000"), dispatcher.recent("+15550100001")
+        finally:
+            await dispatcher.stop()
+
+    delivery, recent, other = asyncio.run(scenario())
+    assert recent is delivery
+    assert other is None
+
+
+def test_submit_fails_when_full_or_stopped():
+    dispatcher = make_dispatcher(lambda phone, body: None, concurrency=0, queue_size=1)
+    with pytest.raises(SmsQueueFull):
+        dispatcher.submit("+15550100000", "hi")
+
+    async def scenario():
+        await dispatcher.start()
+        try:
+            dispatcher.submit("+15550100000", "hi")
+            with pytest.raises(SmsQueueFull):
+                dispatcher.submit("+15550100001", "hi")
+        finally:
+            await dispatcher.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,62 @@
+"""Merchant SSE replay buffer."""
+
+import asyncio
+
+from protega_api.routers.sse import MerchantEventBuffer
+
+MERCHANT = 1
+
+
+def make_buffer(size: int, transaction_ids) -> MerchantEventBuffer:
+    buffer = MerchantEventBuffer(size)
+    for transaction_id in transaction_ids:
+        buffer.append(MERCHANT, {"transaction_id": transaction_id, "event_type": "transaction.created"})
+    return buffer
+
+
+def ids(events):
+    return [event_id for event_id, _, _ in events]
+
+
+def test_since_none_returns_everything_buffered():
+    buffer = make_buffer(10, [1, 2, 3])
+    assert ids(buffer.since(MERCHANT, None)) == ["1", "2", "3"]
+    assert buffer.since(2, None) == []
+
+
+def test_since_resumes_after_the_last_seen_id():
+    buffer = make_buffer(10, [1, 2, 3])
+    assert ids(buffer.since(MERCHANT, "1")) == ["2", "3"]
+    assert buffer.since(MERCHANT, "3") == []
+
+
+def test_since_evicted_id_falls_back_to_higher_ids():
+    buffer = make_buffer(3, [1, 2, 3, 4, 5])
+    assert ids(buffer.since(MERCHANT, None)) == ["3", "4", "5"]
+    assert ids(buffer.since(MERCHANT, "1")) == ["3", "4", "5"]
+    assert ids(buffer.since(MERCHANT, "abc")) == ["3", "4", "5"]
+
+
+def test_latest_id():
+    buffer = make_buffer(10, [])
+    assert buffer.latest_id(MERCHANT) is None
+    buffer.append(MERCHANT, {"transaction_id": 9})
+    assert buffer.latest_id(MERCHANT) == "9"
+
+
+def test_messages_without_transaction_id_are_ignored():
+    buffer = make_buffer(10, [])
+    buffer.append(MERCHANT, {"event_type": "heartbeat"})
+    assert buffer.since(MERCHANT, None) == []
+
+
+def test_append_wakes_waiting_streams():
+    async def scenario():
+        buffer = make_buffer(10, [])
+        changed = buffer.changed(MERCHANT)
+        assert not changed.is_set()
+        buffer.append(MERCHANT, {"transaction_id": 1})
+        return changed.is_set(), buffer.changed(MERCHANT).is_set()
+
+    woken, fresh = asyncio.run(scenario())
+    assert woken and not fresh
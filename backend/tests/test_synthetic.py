@@ -0,0 +1,46 @@
+"""Synthetic fingerprint sample codec."""
+
+import base64
+
+import numpy as np
+import pytest
+
+from protega_api.sdk.fingerprint_matcher import FingerprintMatcher
+from protega_api.sdk.synthetic import FEATURE_DIM, SAMPLE_PREFIX, SyntheticPopulation, decode_sample, encode_sample
+
+
+def test_round_trip_within_quantization():
+    vector = np.linspace(0.0, 1.0, FEATURE_DIM, dtype=np.float32)
+    decoded = decode_sample(encode_sample(vector))
+    assert decoded.shape == (FEATURE_DIM,) and decoded.dtype == np.float32
+    assert np.abs(decoded - vector).max() <= 1 / 65535
+
+
+@pytest.mark.parametrize("sample", [
+    "",
+    "RAW-SAMPLE-123",
+    SAMPLE_PREFIX,
+    SAMPLE_PREFIX + "not base64!",
+    SAMPLE_PREFIX + base64.b64encode(b"\x00" * (FEATURE_DIM * 2 - 2)).decode(),
+    SAMPLE_PREFIX + base64.b64encode(b"\x00" * (FEATURE_DIM * 2 + 2)).decode(),
+])
+def test_invalid_samples_decode_to_none(sample):
+    assert decode_sample(sample) is None
+
+
+def test_population_is_deterministic():
+    first = SyntheticPopulation(size=5, seed=3)
+    second = SyntheticPopulation(size=5, seed=3)
+    assert first.sample(identity=2, capture=1) == second.sample(identity=2, capture=1)
+    assert first.sample(identity=2, capture=1) != first.sample(identity=2, capture=2)
+
+
+def test_matcher_decodes_only_when_enabled():
+    sample = SyntheticPopulation(size=2, seed=0).sample(identity=0)
+    expected = decode_sample(sample)
+
+    decoded = FingerprintMatcher(decode_synthetic=True).extract_features(sample)
+    hashed = FingerprintMatcher(decode_synthetic=False).extract_features(sample)
+    assert np.allclose(decoded, expected)
+    assert hashed.shape == (FEATURE_DIM,)
+    assert not np.allclose(hashed, expected)
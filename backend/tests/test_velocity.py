@@ -0,0 +1,77 @@
+"""Bucketed velocity counters (memory backend)."""
+
+from protega_api import velocity
+from protega_api.velocity import DAY_SECONDS, InMemoryVelocityBackend, VelocityCounter, VelocityKind
+
+BUCKET = 300
+
+
+def make_counter() -> VelocityCounter:
+    return VelocityCounter(InMemoryVelocityBackend(retention_seconds=DAY_SECONDS + BUCKET), BUCKET)
+
+
+def freeze(monkeypatch, now: float) -> None:
+    monkeypatch.setattr(velocity.time, "time", lambda: now)
+
+
+def test_record_and_count(monkeypatch):
+    freeze(monkeypatch, 1_000_000)
+    counter = make_counter()
+    counter.record(VelocityKind.DEVICE, "dev-1")
+    counter.record(VelocityKind.DEVICE, "dev-1")
+    counter.record(VelocityKind.IP, "dev-1")
+
+    assert counter.count(VelocityKind.DEVICE, "dev-1") == 2
+    assert counter.count(VelocityKind.IP, "dev-1") == 1
+    assert counter.count(VelocityKind.DEVICE, "dev-2") == 0
+    assert counter.exceeds(VelocityKind.DEVICE, "dev-1", 2)
+    assert not counter.exceeds(VelocityKind.DEVICE, "dev-1", 3)
+
+
+def test_keys_are_case_and_whitespace_insensitive(monkeypatch):
+    freeze(monkeypatch, 1_000_000)
+    counter = make_counter()
+    counter.record(VelocityKind.PHONE, " ABC ")
+    assert counter.count(VelocityKind.PHONE, "abc") == 1
+
+
+def test_events_leave_the_window(monkeypatch):
+    counter = make_counter()
+    freeze(monkeypatch, 1_000_000)
+    counter.record(VelocityKind.DEVICE, "dev-1")
+
+    freeze(monkeypatch, 1_000_000 + DAY_SECONDS - BUCKET)
+    assert counter.count(VelocityKind.DEVICE, "dev-1") == 1
+    freeze(monkeypatch, 1_000_000 + DAY_SECONDS + 2 * BUCKET)
+    assert counter.count(VelocityKind.DEVICE, "dev-1") == 0
+
+
+def test_record_and_count_includes_the_new_event(monkeypatch):
+    freeze(monkeypatch, 1_000_000)
+    counter = make_counter()
+    assert [counter.record_and_count(VelocityKind.DEVICE, "dev-1") for _ in range(3)] == [1, 2, 3]
+
+    # Giving a slot back (as enroll does for rejected attempts)
+    counter.record(VelocityKind.DEVICE, "dev-1", amount=-1)
+    assert counter.count(VelocityKind.DEVICE, "dev-1") == 2
+
+
+def test_empty_keys_are_ignored():
+    counter = make_counter()
+    counter.record(VelocityKind.DEVICE, None)
+    assert counter.record_and_count(VelocityKind.DEVICE, "") == 0
+    assert counter.count(VelocityKind.DEVICE, None) == 0
+
+
+def test_memory_backend_has_no_count_query():
+    assert make_counter().count_query(VelocityKind.DEVICE, "dev-1") is None
+
+
+def test_memory_backend_evicts_least_recently_used_keys():
+    backend = InMemoryVelocityBackend(retention_seconds=DAY_SECONDS, max_keys=2)
+    backend.increment("device_id", "a", 0, 1)
+    backend.increment("device_id", "b", 0, 1)
+    backend.increment("device_id", "a", 0, 1)
+    backend.increment("device_id", "c", 0, 1)
+    assert backend.sum_since("device_id", "a", 0) == 2
+    assert backend.sum_since("device_id", "b", 0) == 0
@@ -5,5 +5,7 @@ echo "🔄 Running database migrations..."
 alembic upgrade head
 
 echo "🚀 Starting Protega API..."
-exec uvicorn protega_api.main:app --host 0.0.0.0 --port ${API_PORT:-8000} --reload
+# Server-side WebSocket ping frames: dead peers are closed after interval + timeout
+exec uvicorn protega_api.main:app --host 0.0.0.0 --port ${API_PORT:-8000} --reload \
+    --ws-ping-interval ${WS_PING_INTERVAL:-20} --ws-ping-timeout ${WS_PING_TIMEOUT:-20}
 
@@ -118,7 +118,7 @@ export interface EnrollResponse {
 }
 
 // OTP API
-export async function sendOTP(phone: string): Promise<{ status: string; message: string; code_preview?: string }> {
+export async function sendOTP(phone: string): Promise<{ status: string; message: string; code_preview?: string; delivery_id?: string; deduplicated?: boolean }> {
   return apiPost('/otp/send', { phone });
 }
 
@@ -104,9 +104,17 @@ export default function CustomerAcceptCharge() {
         },
         body: JSON.stringify({
           payment_method_id: selectedMethod,
+          amount_cents: chargeData.amount_cents,
         }),
       });
 
+      if (response.status === 409) {
+        // The merchant changed the amount: show the new one before paying
+        await loadChargeDetails(chargeId);
+        setError('The amount has changed. Please review it and accept again.');
+        return;
+      }
+
       if (!response.ok) {
         const errorData = await response.json().catch(() => ({}));
         throw new Error(errorData.detail || 'Failed to process payment');